@@ -8,7 +8,8 @@ from sqlalchemy.orm import Session
 
 from . import models
 from .database import SessionLocal
-from .services.insight_engine import generate_mock_payload
+from .services.insight_engine import generate_payload
+from .services.run_results import save_run_results
 
 
 def _create_sources(session: Session, project: models.Project) -> Sequence[models.Source]:
@@ -48,7 +49,7 @@ def _create_sources(session: Session, project: models.Project) -> Sequence[model
 
 def _create_insight_run(session: Session, project: models.Project, sources: Iterable[models.Source]) -> models.InsightRun:
     sources_list = list(sources)
-    payload = generate_mock_payload(project, sources_list)
+    payload = generate_payload(project, sources_list)
     run = models.InsightRun(
         project_id=project.id,
         status="completed",
@@ -57,43 +58,7 @@ def _create_insight_run(session: Session, project: models.Project, sources: Iter
     )
     session.add(run)
     session.flush()
-
-    for theme_entry in payload.get("themes", []):
-        theme = models.Theme(
-            id=theme_entry["id"],
-            insight_run_id=run.id,
-            title=theme_entry["title"],
-            summary=theme_entry.get("summary"),
-            confidence=theme_entry.get("confidence", 0.0),
-        )
-        session.add(theme)
-        session.flush()
-
-        for claim_entry in theme_entry.get("claims", []):
-            claim = models.Claim(
-                id=claim_entry["id"],
-                theme_id=theme.id,
-                statement=claim_entry["statement"],
-                confidence=claim_entry.get("confidence", 0.0),
-            )
-            session.add(claim)
-            session.flush()
-
-            for citation_entry in claim_entry.get("citations", []):
-                source_id = citation_entry.get("source_id")
-                if not source_id:
-                    continue
-                session.add(
-                    models.Citation(
-                        id=citation_entry["id"],
-                        claim_id=claim.id,
-                        source_id=source_id,
-                        quote=citation_entry.get("quote"),
-                        location=citation_entry.get("location"),
-                    )
-                )
-
-    session.flush()
+    save_run_results(session, run, payload)
     return run
 
 
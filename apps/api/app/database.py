@@ -2,7 +2,8 @@ import os
 from pathlib import Path
 from typing import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import MetaData, create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
 DATA_DIR = Path(os.getenv("INSIGHTFLOW_DATA_DIR", Path(__file__).resolve().parents[3] / "data"))
@@ -18,6 +19,42 @@ engine = create_engine(
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
 
+def add_missing_columns(engine: Engine, metadata: MetaData) -> None:
+    """Add columns declared on the models but missing from existing tables.
+
+    Only nullable columns and columns with a ``server_default`` can be added
+    this way; existing rows get NULL or the default.
+
+    ``create_all`` only creates whole tables, so databases created by an older
+    version would otherwise lack newly added columns.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or (not column.nullable and column.server_default is None):
+                    continue
+                definition = column.type.compile(dialect=engine.dialect)
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    definition += f" NOT NULL DEFAULT '{default}'" if not column.nullable else f" DEFAULT '{default}'"
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {definition}'))
+                if column.index:
+                    index_name = f"ix_{table.name}_{column.name}"
+                    conn.execute(text(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table.name}" ("{column.name}")'))
+
+
+def add_missing_indexes(engine: Engine, metadata: MetaData) -> None:
+    """Create indexes declared on the models but missing from existing tables."""
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
 def get_db() -> Generator:
     db = SessionLocal()
     try:
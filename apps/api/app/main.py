@@ -1,27 +1,58 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 
-from .database import engine
+from .database import add_missing_columns, add_missing_indexes, engine
+from .middleware import BodySizeLimitMiddleware
 from . import models
 from .routers import api_router
 from .bootstrap import ensure_demo_data
+from .services.cleanup import cleanup_queue
 from .services.embedding_store import embedding_store
+from .services.sentence_index import sentence_store
+from .services.ingestion import ingestion_queue
+from .services.insight_runner import PENDING_STATUSES as RUN_PENDING_STATUSES, insight_runner
+from .services import blob_store, search_index
 
 models.Base.metadata.create_all(bind=engine)
-
-with Session(engine) as session:
-    sources = session.query(models.Source).all()
-    embedding_store.rebuild(sources)
-
-app = FastAPI(title="InsightFlow API")
-
+add_missing_columns(engine, models.Base.metadata)
+add_missing_indexes(engine, models.Base.metadata)
+search_index.ensure_schema(engine)
+blob_store.ensure_refcounts(engine)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    with Session(engine) as session:
+        sources = session.query(models.Source).all()
+        embedding_store.sync(sources)
+        sentence_store.sweep(project_id for project_id, in session.query(models.Project.id))
+        ingestion_queue.resume(sources)
+        cleanup_queue.resume(session)
+        insight_runner.resume(
+            session.query(models.InsightRun).filter(models.InsightRun.status.in_(RUN_PENDING_STATUSES))
+        )
+    yield
+    ingestion_queue.shutdown()
+    cleanup_queue.shutdown()
+    insight_runner.shutdown()
+    if embedding_store.dirty:
+        embedding_store.save()
+
+
+app = FastAPI(title="InsightFlow API", lifespan=lifespan)
+
+# Added first so it sits inside CORS and its 413s still carry CORS headers.
+app.add_middleware(BodySizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Range", "X-Text-Offset", "X-Text-Total"],
 )
 
 app.include_router(api_router)
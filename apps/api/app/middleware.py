@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .services.uploads import MAX_BATCH_UPLOAD_BYTES, MAX_UPLOAD_BYTES, too_large
+
+# Room for multipart boundaries and form fields around the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies over the upload limit before they are read in full.
+
+    A declared ``Content-Length`` above the limit is refused up front; bodies
+    without one (chunked transfer) are counted as they stream in and aborted
+    with a 413 as soon as they cross it.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+        path_limits: dict[str, int] | None = None,
+    ):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = (
+            path_limits if path_limits is not None else {"/sources/batch": MAX_BATCH_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES}
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        max_bytes = self.path_limits.get(scope["path"].rstrip("/"), self.max_bytes)
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > max_bytes:
+            error = too_large(max_bytes)
+            body = json.dumps({"detail": error.detail}).encode()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 413,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Raised while FastAPI parses the body, so it becomes a 413 response.
+                    raise too_large(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, JSON, String, Text
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, JSON, String, Text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
 
@@ -38,10 +38,16 @@ class Source(Base):
     title: Mapped[str] = mapped_column(String(255))
     tags: Mapped[List[str]] = mapped_column(JSON, default=list)
     content_ptr: Mapped[str] = mapped_column(String(512))
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="ready", server_default="ready")
+    error: Mapped[Optional[str]] = mapped_column(Text)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
     project: Mapped["Project"] = relationship("Project", back_populates="sources")
     citations: Mapped[List["Citation"]] = relationship("Citation", back_populates="source")
+    vault_notes: Mapped[List["VaultNote"]] = relationship(
+        "VaultNote", back_populates="source", cascade="all, delete-orphan"
+    )
 
 
 class InsightRun(Base):
@@ -51,7 +57,18 @@ class InsightRun(Base):
     project_id: Mapped[str] = mapped_column(ForeignKey("projects.id"), nullable=False)
     status: Mapped[str] = mapped_column(String(50), default="pending")
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    # Copy of the theme/claim/citation rows; left NULL when INSIGHTFLOW_STORE_RUN_PAYLOAD is off.
     payload: Mapped[Optional[dict]] = mapped_column(JSON)
+    # Progress written by ``services.insight_runner`` while the run executes.
+    stage: Mapped[Optional[str]] = mapped_column(String(20))
+    sources_total: Mapped[Optional[int]] = mapped_column(Integer)
+    sources_processed: Mapped[Optional[int]] = mapped_column(Integer)
+    # How many sources' analyses came from the cache versus were computed.
+    sources_reused: Mapped[Optional[int]] = mapped_column(Integer)
+    sources_recomputed: Mapped[Optional[int]] = mapped_column(Integer)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
 
     project: Mapped["Project"] = relationship("Project", back_populates="insight_runs")
     themes: Mapped[List["Theme"]] = relationship("Theme", back_populates="insight_run", cascade="all, delete-orphan")
@@ -61,7 +78,7 @@ class Theme(Base):
     __tablename__ = "themes"
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
-    insight_run_id: Mapped[str] = mapped_column(ForeignKey("insight_runs.id"), nullable=False)
+    insight_run_id: Mapped[str] = mapped_column(ForeignKey("insight_runs.id"), nullable=False, index=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     summary: Mapped[Optional[str]] = mapped_column(Text())
     confidence: Mapped[float] = mapped_column(Float, default=0.0)
@@ -74,7 +91,7 @@ class Claim(Base):
     __tablename__ = "claims"
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
-    theme_id: Mapped[str] = mapped_column(ForeignKey("themes.id"), nullable=False)
+    theme_id: Mapped[str] = mapped_column(ForeignKey("themes.id"), nullable=False, index=True)
     statement: Mapped[str] = mapped_column(Text(), nullable=False)
     confidence: Mapped[float] = mapped_column(Float, default=0.0)
 
@@ -86,7 +103,7 @@ class Citation(Base):
     __tablename__ = "citations"
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
-    claim_id: Mapped[str] = mapped_column(ForeignKey("claims.id"), nullable=False)
+    claim_id: Mapped[str] = mapped_column(ForeignKey("claims.id"), nullable=False, index=True)
     source_id: Mapped[str] = mapped_column(ForeignKey("sources.id"), nullable=False)
     quote: Mapped[Optional[str]] = mapped_column(Text())
     location: Mapped[Optional[str]] = mapped_column(String(255))
@@ -140,3 +157,78 @@ class Task(Base):
 
     project: Mapped["Project"] = relationship("Project", back_populates="tasks")
     decision: Mapped[Optional["Decision"]] = relationship("Decision", back_populates="tasks")
+
+
+class SearchPassage(Base):
+    """Searchable text unit; mirrored into the ``search_fts`` FTS5 table by triggers."""
+
+    __tablename__ = "search_passages"
+    __table_args__ = (Index("ix_search_passages_ref_start", "ref_id", "char_start"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    project_id: Mapped[str] = mapped_column(String(36), nullable=False, index=True)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    ref_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    char_start: Mapped[int] = mapped_column(Integer, default=0)
+    char_end: Mapped[int] = mapped_column(Integer, default=0)
+    title: Mapped[Optional[str]] = mapped_column(String(255))
+    body: Mapped[str] = mapped_column(Text(), nullable=False)
+
+
+class VaultNote(Base):
+    """Sync manifest entry: the file state a vault note's source was last built from."""
+
+    __tablename__ = "vault_notes"
+    __table_args__ = (Index("ix_vault_notes_vault_path", "project_id", "vault", "path", unique=True),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    project_id: Mapped[str] = mapped_column(ForeignKey("projects.id"), nullable=False)
+    vault: Mapped[str] = mapped_column(String(1024), nullable=False)
+    path: Mapped[str] = mapped_column(String(1024), nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(Integer, nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    source_id: Mapped[str] = mapped_column(ForeignKey("sources.id"), nullable=False, index=True)
+
+    source: Mapped["Source"] = relationship("Source", back_populates="vault_notes")
+
+
+class Blob(Base):
+    """Reference count of a stored file (upload or text snapshot) shared by any number of sources."""
+
+    __tablename__ = "blobs"
+
+    pointer: Mapped[str] = mapped_column(String(512), primary_key=True)
+    refs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Requests about to reference the file (``blob_store.Claim``); it is not deleted while any remain.
+    claims: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+
+class SourceAnalysis(Base):
+    """Per-source insight-engine output, shared by every source with the same content."""
+
+    __tablename__ = "source_analyses"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    analyzer: Mapped[str] = mapped_column(String(50), primary_key=True)
+    result: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+class CleanupJob(Base):
+    """Files freed by a delete, unlinked in the background by ``services.cleanup``."""
+
+    __tablename__ = "cleanup_jobs"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)
+    target_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="queued")
+    # Files still to remove; shrinks as attempts succeed.
+    pointers: Mapped[List[str]] = mapped_column(JSON, default=list)
+    total: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    removed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from . import claims, decisions, digest, export, insight_runs, projects, sources, tasks, themes
+from . import claims, decisions, digest, export, insight_runs, jobs, projects, search, sources, tasks, themes
 
 api_router = APIRouter()
 api_router.include_router(projects.router, prefix="/projects", tags=["projects"])
@@ -12,3 +12,5 @@ api_router.include_router(decisions.router, prefix="/decisions", tags=["decision
 api_router.include_router(tasks.router, prefix="/tasks", tags=["tasks"])
 api_router.include_router(export.router, prefix="/export", tags=["export"])
 api_router.include_router(digest.router, prefix="/digest", tags=["digest"])
+api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
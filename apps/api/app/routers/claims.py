@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
 from ..database import get_db
+from ..services.embedding_store import embed_texts
+from ..services.sentence_index import location, sentence_store, sentence_text
 
 router = APIRouter()
 
@@ -21,3 +24,51 @@ def get_claim(claim_id: str, db: Session = Depends(get_db)) -> models.Claim:
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
     return claim
+
+
+@router.get("/{claim_id}/evidence", response_model=list[schemas.Evidence])
+def get_claim_evidence(
+    claim_id: str,
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db),
+) -> list[dict]:
+    """Sentences across the claim's project that best support its statement.
+
+    Searches the sentence index as the project's last insight run left it;
+    matches from sources deleted or changed since then are skipped.
+    """
+    claim = db.get(models.Claim, claim_id)
+    if not claim:
+        raise HTTPException(status_code=404, detail="Claim not found")
+    project_id = claim.theme.insight_run.project_id
+    query = embed_texts([claim.statement])
+    candidates = limit
+    with sentence_store.lease(project_id) as partition:
+        while True:
+            [matches] = partition.search(query, candidates)
+            by_id = {
+                source.id: source
+                for source in db.scalars(
+                    select(models.Source).where(
+                        models.Source.id.in_({source_id for source_id, _, _, _ in matches}),
+                        models.Source.status == "ready",
+                    )
+                )
+                if partition.indexed(source)
+            }
+            current = [match for match in matches if match[0] in by_id]
+            if len(current) >= limit or len(matches) < candidates:
+                break
+            candidates *= 4
+    return [
+        {
+            "source_id": source_id,
+            "source_title": by_id[source_id].title,
+            "quote": sentence_text(by_id[source_id], start, end),
+            "start": start,
+            "end": end,
+            "score": round(score, 4),
+            "location": location(by_id[source_id], start, end),
+        }
+        for source_id, start, end, score in current[:limit]
+    ]
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 
 from .. import models, schemas
 from ..database import get_db
+from ..services import search_index
 
 router = APIRouter()
 
@@ -61,6 +62,7 @@ def create_decision(payload: schemas.DecisionCreate, db: Session = Depends(get_d
                 )
             )
 
+    search_index.index_decision(db, decision)
     db.commit()
     db.refresh(decision)
     return decision
@@ -100,6 +102,7 @@ def update_decision(decision_id: str, payload: schemas.DecisionCreate, db: Sessi
             )
         )
 
+    search_index.index_decision(db, decision)
     db.commit()
     db.refresh(decision)
     return decision
@@ -120,5 +123,6 @@ def delete_decision(decision_id: str, db: Session = Depends(get_db)) -> None:
         task.decision_id = None
         db.add(task)
 
+    search_index.remove(db, [decision_id])
     db.delete(decision)
     db.commit()
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from .. import models
 from ..database import get_db
+from ..services.run_results import load_payload
 
 router = APIRouter()
 
@@ -77,8 +78,9 @@ def daily_digest(project_id: str, date: str | None = None, db: Session = Depends
     if insight_runs:
         run = insight_runs[0]
         lines.append(f"- Run {run.id} completed with status **{run.status}**")
-        if run.payload and isinstance(run.payload, dict):
-            themes = run.payload.get("themes", [])
+        payload = load_payload(db, run)
+        if payload and isinstance(payload, dict):
+            themes = payload.get("themes", [])
             for theme in themes[:3]:
                 title = theme.get("title", "Theme")
                 summary = theme.get("summary", "")
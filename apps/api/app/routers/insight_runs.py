@@ -1,97 +1,116 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from .. import models, schemas
-from ..database import get_db
-from ..services.insight_engine import generate_mock_payload
+from ..database import SessionLocal, get_db
+from ..services.insight_runner import FINISHED_STATUSES, insight_runner, progress_event
+from ..services import search_index
+from ..services.run_results import clear_run_results, load_payload, run_summaries, save_run_results
 
 router = APIRouter()
 
+EVENT_POLL_SECONDS = 0.5
+KEEPALIVE_SECONDS = 15
+
+
+def _with_payload(db: Session, run: models.InsightRun) -> dict:
+    # A plain dict validated against ``response_model`` works with either pydantic major version.
+    result = {column.key: getattr(run, column.key) for column in models.InsightRun.__table__.columns}
+    result["payload"] = load_payload(db, run)
+    return result
+
 
-@router.get("/", response_model=list[schemas.InsightRun])
-def list_runs(project_id: str | None = None, db: Session = Depends(get_db)) -> list[models.InsightRun]:
-    query = db.query(models.InsightRun)
-    if project_id:
-        query = query.filter(models.InsightRun.project_id == project_id)
-    return query.order_by(models.InsightRun.created_at.desc()).all()
+@router.get("/", response_model=list[schemas.InsightRunSummary])
+def list_runs(project_id: str | None = None, db: Session = Depends(get_db)) -> list[dict]:
+    return run_summaries(db, project_id)
 
 
 @router.get("/{run_id}", response_model=schemas.InsightRun)
-def get_run(run_id: str, db: Session = Depends(get_db)) -> models.InsightRun:
+def get_run(run_id: str, db: Session = Depends(get_db)) -> dict:
     run = db.get(models.InsightRun, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Insight run not found")
-    return run
+    return _with_payload(db, run)
 
 
-@router.post("/", response_model=schemas.InsightRun, status_code=201)
+@router.post("/", response_model=schemas.InsightRun, status_code=202)
 def create_run(payload: schemas.InsightRunCreate, db: Session = Depends(get_db)) -> models.InsightRun:
     project = db.get(models.Project, payload.project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    run = models.InsightRun(project_id=payload.project_id, status="processing")
+    run = models.InsightRun(project_id=payload.project_id, status="pending")
     db.add(run)
     db.commit()
     db.refresh(run)
+    insight_runner.submit(run.id)
+    return run
+
+
+def _progress(run_id: str) -> dict | None:
+    with SessionLocal() as db:
+        run = db.get(models.InsightRun, run_id)
+        return progress_event(run) if run else None
 
-    sources = (
-        db.query(models.Source)
-        .filter(models.Source.project_id == payload.project_id)
-        .order_by(models.Source.created_at.asc())
-        .all()
+
+@router.get("/{run_id}/events")
+async def stream_run_events(run_id: str, request: Request) -> StreamingResponse:
+    """Server-Sent Events: a ``progress`` event whenever the run changes, then ``done``."""
+    first = await run_in_threadpool(_progress, run_id)
+    if first is None:
+        raise HTTPException(status_code=404, detail="Insight run not found")
+
+    async def events():
+        event, last, idle = first, None, 0
+        while event is not None:
+            # The ETA drifts on every poll; only real progress is worth an event.
+            state = {key: value for key, value in event.items() if key != "eta_seconds"}
+            if state != last:
+                kind = "done" if event["status"] in FINISHED_STATUSES else "progress"
+                yield f"event: {kind}\ndata: {json.dumps(event)}\n\n"
+                if kind == "done":
+                    return
+                last, idle = state, 0
+            else:
+                idle += 1
+                if idle * EVENT_POLL_SECONDS >= KEEPALIVE_SECONDS:
+                    yield ": keep-alive\n\n"
+                    idle = 0
+            await asyncio.sleep(EVENT_POLL_SECONDS)
+            if await request.is_disconnected():
+                return
+            event = await run_in_threadpool(_progress, run_id)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    payload_data = generate_mock_payload(project, sources)
-
-    for theme_payload in payload_data["themes"]:
-        theme = models.Theme(
-            id=theme_payload["id"],
-            insight_run_id=run.id,
-            title=theme_payload["title"],
-            summary=theme_payload.get("summary"),
-            confidence=theme_payload.get("confidence", 0.0),
-        )
-        db.add(theme)
-        for claim_payload in theme_payload["claims"]:
-            claim = models.Claim(
-                id=claim_payload["id"],
-                theme=theme,
-                statement=claim_payload["statement"],
-                confidence=claim_payload.get("confidence", 0.0),
-            )
-            db.add(claim)
-            for citation_payload in claim_payload["citations"]:
-                if not citation_payload.get("source_id"):
-                    continue
-                citation = models.Citation(
-                    id=citation_payload["id"],
-                    claim=claim,
-                    source_id=citation_payload["source_id"],
-                    quote=citation_payload.get("quote"),
-                    location=citation_payload.get("location"),
-                )
-                db.add(citation)
-
-    run.status = "completed"
-    run.payload = payload_data
-    db.add(run)
-    db.commit()
-    db.refresh(run)
-    return run
 
 
 @router.patch("/{run_id}", response_model=schemas.InsightRun)
-def update_run(run_id: str, payload: schemas.InsightRunUpdate, db: Session = Depends(get_db)) -> models.InsightRun:
+def update_run(run_id: str, payload: schemas.InsightRunUpdate, db: Session = Depends(get_db)) -> dict:
     run = db.get(models.InsightRun, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Insight run not found")
     update_data = payload.dict(exclude_unset=True)
+    if "payload" in update_data:
+        # Reads rebuild the payload from the result rows, so rewrite them.
+        results = update_data.pop("payload")
+        if results is None:
+            clear_run_results(db, run)
+            run.payload = None
+        else:
+            save_run_results(db, run, results)
     for key, value in update_data.items():
         setattr(run, key, value)
     db.add(run)
     db.commit()
     db.refresh(run)
-    return run
+    return _with_payload(db, run)
 
 
 @router.delete("/{run_id}", status_code=204)
@@ -99,5 +118,6 @@ def delete_run(run_id: str, db: Session = Depends(get_db)) -> None:
     run = db.get(models.InsightRun, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Insight run not found")
+    search_index.remove_run(db, run)
     db.delete(run)
     db.commit()
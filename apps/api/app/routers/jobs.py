@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..database import get_db
+
+router = APIRouter()
+
+
+@router.get("/", response_model=list[schemas.CleanupJob])
+def list_jobs(status: str | None = None, limit: int = 50, db: Session = Depends(get_db)) -> list[models.CleanupJob]:
+    query = db.query(models.CleanupJob)
+    if status:
+        query = query.filter(models.CleanupJob.status == status)
+    return query.order_by(models.CleanupJob.created_at.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=schemas.CleanupJob)
+def get_job(job_id: str, db: Session = Depends(get_db)) -> models.CleanupJob:
+    job = db.get(models.CleanupJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
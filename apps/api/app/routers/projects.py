@@ -1,10 +1,13 @@
-from pathlib import Path
-
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
-from ..database import get_db, DATA_DIR
+from ..database import get_db
+from ..services.cleanup import cleanup_queue
+from ..services.embedding_store import embedding_store
+from ..services.sentence_index import sentence_store
+from ..services import blob_store, search_index
 
 router = APIRouter()
 
@@ -45,22 +48,53 @@ def update_project(project_id: str, payload: schemas.ProjectUpdate, db: Session
     return project
 
 
-@router.delete("/{project_id}", status_code=204)
-def delete_project(project_id: str, db: Session = Depends(get_db)) -> None:
+def _delete_rows(db: Session, project_id: str) -> None:
+    """Delete the project and everything under it with one statement per table.
+
+    Equivalent to the ORM cascade, which would load every source, claim and
+    citation just to delete it again.
+    """
+    runs = select(models.InsightRun.id).where(models.InsightRun.project_id == project_id)
+    themes = select(models.Theme.id).where(models.Theme.insight_run_id.in_(runs))
+    claims = select(models.Claim.id).where(models.Claim.theme_id.in_(themes))
+    sources = select(models.Source.id).where(models.Source.project_id == project_id)
+    decisions = select(models.Decision.id).where(models.Decision.project_id == project_id)
+    statements = [
+        delete(models.Citation).where(models.Citation.claim_id.in_(claims) | models.Citation.source_id.in_(sources)),
+        delete(models.Claim).where(models.Claim.id.in_(claims)),
+        delete(models.Theme).where(models.Theme.id.in_(themes)),
+        delete(models.InsightRun).where(models.InsightRun.project_id == project_id),
+        delete(models.DecisionCitation).where(
+            models.DecisionCitation.decision_id.in_(decisions) | models.DecisionCitation.source_id.in_(sources)
+        ),
+        update(models.Task).where(models.Task.decision_id.in_(decisions)).values(decision_id=None),
+        delete(models.Task).where(models.Task.project_id == project_id),
+        delete(models.Decision).where(models.Decision.project_id == project_id),
+        delete(models.VaultNote).where(models.VaultNote.project_id == project_id),
+        delete(models.Source).where(models.Source.project_id == project_id),
+        delete(models.Project).where(models.Project.id == project_id),
+    ]
+    for statement in statements:
+        db.execute(statement.execution_options(synchronize_session=False))
+
+
+@router.delete("/{project_id}", response_model=schemas.CleanupJob, status_code=202)
+def delete_project(project_id: str, db: Session = Depends(get_db)) -> models.CleanupJob:
     project = db.get(models.Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    # Clean up associated source files before deletion
-    for source in project.sources:
-        if source.uri:
-            file_path = Path(DATA_DIR.parent, source.uri)
-            if file_path.exists():
-                file_path.unlink(missing_ok=True)
-        if source.content_ptr:
-            content_path = Path(DATA_DIR.parent, source.content_ptr)
-            if content_path.exists():
-                content_path.unlink(missing_ok=True)
-
-    db.delete(project)
+    # Files shared with other projects keep their remaining references.
+    stored = db.execute(
+        select(models.Source.uri, models.Source.content_ptr).where(models.Source.project_id == project_id)
+    )
+    freed = blob_store.release(db, [value for row in stored for value in row])
+    search_index.remove_project(db, project_id)
+    _delete_rows(db, project_id)
+    # Files go in the background; the returned job reports their removal.
+    job = cleanup_queue.enqueue(db, "project", project_id, freed)
     db.commit()
+    cleanup_queue.submit(job.id)
+    embedding_store.drop_project(project_id)
+    sentence_store.drop_project(project_id)
+    return job
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from ..database import get_db
+from ..services.search_index import hybrid_search
+
+router = APIRouter()
+
+
+@router.get("/", response_model=list[schemas.SearchResult])
+def search(
+    project_id: str,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+) -> list[dict]:
+    project = db.get(models.Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return hybrid_search(db, project_id, q, limit)
@@ -1,21 +1,24 @@
 import json
-import uuid
 from pathlib import Path
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Response, UploadFile
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
-from ..database import get_db, DATA_DIR
-from ..services.extractors import extract_text_from_upload
+from ..database import get_db
+from ..services.bulk_ingest import ingest_batch, stage_uploads
+from ..services.cleanup import cleanup_queue
+from ..services.content_cache import content_cache
+from ..services.extractors import ALLOWED_EXTENSIONS
 from ..services.embedding_store import embedding_store
+from ..services.ingestion import ingestion_queue
+from ..services.obsidian import import_notes, resolve_vault, sync_vault
+from ..services.uploads import save_upload
+from ..services import blob_store, search_index, text_store
 
 router = APIRouter()
 
-UPLOAD_DIR = DATA_DIR / "uploads"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-
 
 def _parse_tags(raw: Optional[str]) -> List[str]:
     if not raw:
@@ -43,7 +46,7 @@ def list_sources(project_id: Optional[str] = None, db: Session = Depends(get_db)
     return query.order_by(models.Source.created_at.desc()).all()
 
 
-@router.post("/", response_model=schemas.Source, status_code=201)
+@router.post("/", response_model=schemas.Source, status_code=202)
 async def upload_source(
     project_id: str = Form(...),
     file: UploadFile = File(...),
@@ -56,96 +59,202 @@ async def upload_source(
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    source_id = str(uuid.uuid4())
-    destination_name = f"{source_id}{Path(file.filename).suffix}"
-    file_path = UPLOAD_DIR / destination_name
+    if Path(file.filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Unsupported file type. Use PDF, Markdown, or TXT.")
 
-    raw_bytes = await file.read()
-    file_path.write_bytes(raw_bytes)
+    suffix = Path(file.filename).suffix
+    staged = blob_store.staging_path(suffix)
+    digest, _ = await save_upload(file, staged)
+    with blob_store.Claim() as claim:
+        uri = blob_store.store_file(staged, digest, suffix, claim)
 
-    try:
-        extracted_text = extract_text_from_upload(file.filename, raw_bytes)
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-
-    text_filename = f"{source_id}.txt"
-    text_path = UPLOAD_DIR / text_filename
-    text_path.write_text(extracted_text or "", encoding="utf-8")
-
-    source = models.Source(
-        id=source_id,
-        project_id=project_id,
-        kind=kind,
-        uri=str(Path("data/uploads") / destination_name),
-        title=title or file.filename,
-        tags=_parse_tags(tags),
-        content_ptr=str(Path("data/uploads") / text_filename),
-    )
-    db.add(source)
-    db.commit()
+        # Identical bytes were extracted before: share that text file. Otherwise
+        # the ingestion worker extracts into the digest's text blob.
+        content_ptr = content_cache.text_pointer(db, digest) or blob_store.text_pointer(digest)
+        claim.add(content_ptr)
+
+        source = models.Source(
+            project_id=project_id,
+            kind=kind,
+            uri=uri,
+            title=title or file.filename,
+            tags=_parse_tags(tags),
+            content_ptr=content_ptr,
+            content_hash=digest,
+            status="queued",
+        )
+        db.add(source)
+        blob_store.acquire(db, [uri, content_ptr])
+        db.commit()
     db.refresh(source)
-    embedding_store.add_source(source)
+    ingestion_queue.submit(source.id)
     return source
 
 
+@router.post("/batch", response_model=schemas.BatchUploadResponse)
+def upload_sources_batch(
+    project_id: str = Form(...),
+    files: List[UploadFile] = File(...),
+    kind: str = Form("document"),
+    tags: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+) -> dict:
+    project = db.get(models.Project, project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    with blob_store.Claim() as claim:
+        entries = stage_uploads([(file.filename or "upload", file.file) for file in files], claim)
+        ingest_batch(db, project_id, entries, claim, kind=kind, tags=_parse_tags(tags))
+    return {
+        "created": sum(entry.source is not None for entry in entries),
+        "failed": sum(entry.error is not None for entry in entries),
+        "results": [
+            {"filename": entry.filename, "source": entry.source, "error": entry.error} for entry in entries
+        ],
+    }
+
+
 @router.post("/import/obsidian", response_model=list[schemas.Source])
 def import_obsidian(
     payload: schemas.ObsidianImportRequest,
+    response: Response,
     db: Session = Depends(get_db),
 ) -> list[models.Source]:
     project = db.get(models.Project, payload.project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    base_dir = Path(payload.base_path or (DATA_DIR / "obsidian"))
-    import_dir = (base_dir / payload.folder).resolve()
     try:
-        base_dir_resolved = base_dir.resolve()
-    except FileNotFoundError:
-        base_dir.mkdir(parents=True, exist_ok=True)
-        base_dir_resolved = base_dir.resolve()
-    if import_dir != base_dir_resolved and base_dir_resolved not in import_dir.parents:
-        raise HTTPException(status_code=400, detail="Import folder must live within the configured Obsidian root")
-    if not import_dir.is_dir():
-        raise HTTPException(status_code=400, detail="Folder not found for Obsidian import")
-    limit = payload.limit or 100
-    imported: list[models.Source] = []
-
-    existing_uris = {
-        src.uri for src in db.query(models.Source).filter(models.Source.project_id == payload.project_id).all()
+        base_dir, import_dir = resolve_vault(payload.base_path, payload.folder)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    with blob_store.Claim() as claim:
+        imported, timings = import_notes(db, payload.project_id, base_dir, import_dir, payload.limit or 100, claim)
+    response.headers["Server-Timing"] = ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()
+    )
+    return imported
+
+
+@router.post("/sync/obsidian", response_model=schemas.ObsidianSyncResponse)
+def sync_obsidian(payload: schemas.ObsidianSyncRequest, db: Session = Depends(get_db)) -> dict:
+    """Apply only the notes added, edited or deleted since the vault folder was last synced."""
+    project = db.get(models.Project, payload.project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    try:
+        base_dir, import_dir = resolve_vault(payload.base_path, payload.folder)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    with blob_store.Claim() as claim:
+        result = sync_vault(db, payload.project_id, base_dir, import_dir, claim)
+    return {
+        "added": result.added,
+        "modified": result.modified,
+        "removed": result.removed,
+        "unchanged": result.unchanged,
     }
 
-    for path in sorted(import_dir.rglob("*.md"))[:limit]:
-        relative_uri = str(Path("obsidian") / path.relative_to(base_dir))
-        if relative_uri in existing_uris:
-            continue
-        source_id = str(uuid.uuid4())
-        destination_name = f"{source_id}{path.suffix}"
-        dest_path = UPLOAD_DIR / destination_name
-        dest_path.write_bytes(path.read_bytes())
-        text_filename = f"{source_id}.txt"
-        text_path = UPLOAD_DIR / text_filename
-        text_path.write_text(path.read_text(encoding="utf-8", errors="ignore"), encoding="utf-8")
 
-        source = models.Source(
-            id=source_id,
-            project_id=payload.project_id,
-            kind="obsidian",
-            uri=relative_uri,
-            title=path.stem,
-            tags=[],
-            content_ptr=str(Path("data/uploads") / text_filename),
+@router.get("/index/stats", response_model=schemas.IndexStats)
+def index_stats(project_id: Optional[str] = None) -> dict:
+    return embedding_store.stats(project_id)
+
+
+@router.get("/cache/stats", response_model=schemas.ContentCacheStats)
+def cache_stats() -> dict:
+    return content_cache.stats()
+
+
+@router.get("/ingestion/stats", response_model=schemas.IngestionStats)
+def ingestion_stats() -> dict:
+    return ingestion_queue.stats()
+
+
+@router.get("/{source_id}", response_model=schemas.Source)
+def get_source(source_id: str, db: Session = Depends(get_db)) -> models.Source:
+    source = db.get(models.Source, source_id)
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    return source
+
+
+def _byte_range(header: str, total: int) -> Optional[tuple[int, int]]:
+    """``(start, end)`` of a single ``bytes=`` range, ``None`` for anything else (served whole).
+
+    Raises 416 when the range lies entirely past the end of the text.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+        return None
+    if not first:
+        start, end = max(total - int(last), 0), total
+    else:
+        start, end = int(first), min(int(last) + 1, total) if last else total
+    if start >= total or start >= end:
+        raise HTTPException(
+            status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{total}"}
         )
-        db.add(source)
-        imported.append(source)
+    return start, end
 
-    db.commit()
 
-    for src in imported:
-        db.refresh(src)
-        embedding_store.add_source(src)
+@router.get("/{source_id}/text")
+def get_source_text(
+    source_id: str,
+    offset: int = Query(0, ge=0, description="First character of the window."),
+    length: Optional[int] = Query(None, ge=0, description="Characters to return; the rest of the text when omitted."),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+) -> Response:
+    """Extracted text of a source, or a window of it, read from the snapshot without loading the whole file.
 
-    return imported
+    ``offset``/``length`` select characters; a ``Range: bytes=...`` header
+    selects bytes of the UTF-8 text instead and is answered with ``206``.
+    """
+    source = db.get(models.Source, source_id)
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    if source.status != "ready" or not source.content_ptr:
+        raise HTTPException(status_code=409, detail="Source text is not ready")
+    path = blob_store.path(source.content_ptr)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Source text not found") from None
+    # The text is derived from the uploaded bytes, so their hash identifies it.
+    etag = f'"{source.content_hash}"' if source.content_hash else f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if if_none_match and etag in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=304, headers=headers)
+
+    if range_header and (if_range is None or if_range.strip() == etag):
+        if offset or length is not None:
+            raise HTTPException(status_code=400, detail="Use either offset/length or a Range header")
+        total = text_store.byte_length(path)
+        window = _byte_range(range_header, total)
+        if window is not None:
+            start, end = window
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{total}"
+            return Response(
+                content=text_store.read_bytes(path, start, end),
+                status_code=206,
+                media_type="text/plain; charset=utf-8",
+                headers=headers,
+            )
+
+    total = text_store.char_length(path)
+    end = total if length is None else min(offset + length, total)
+    headers["X-Text-Offset"] = str(min(offset, total))
+    headers["X-Text-Total"] = str(total)
+    return Response(
+        content=text_store.read_range(path, offset, end), media_type="text/plain; charset=utf-8", headers=headers
+    )
 
 
 @router.patch("/{source_id}", response_model=schemas.Source)
@@ -159,24 +268,24 @@ def update_source(source_id: str, payload: schemas.SourceUpdate, db: Session = D
     for key, value in update_data.items():
         setattr(source, key, value)
     db.add(source)
+    # Only metadata can change here, so the passages and vectors stay as they are.
+    search_index.retitle_source(db, source)
     db.commit()
     db.refresh(source)
-    embedding_store.add_source(source)
     return source
 
 
-@router.delete("/{source_id}", status_code=204)
-def delete_source(source_id: str, db: Session = Depends(get_db)) -> None:
+@router.delete("/{source_id}", response_model=schemas.CleanupJob, status_code=202)
+def delete_source(source_id: str, db: Session = Depends(get_db)) -> models.CleanupJob:
     source = db.get(models.Source, source_id)
     if not source:
         raise HTTPException(status_code=404, detail="Source not found")
-    if source.uri:
-        file_path = Path(DATA_DIR.parent, source.uri)
-        if file_path.exists():
-            file_path.unlink(missing_ok=True)
-    if source.content_ptr:
-        text_path = Path(DATA_DIR.parent, source.content_ptr)
-        if text_path.exists():
-            text_path.unlink(missing_ok=True)
+    project_id = source.project_id
+    freed = blob_store.release(db, [source.uri, source.content_ptr])
+    search_index.remove(db, [source_id])
     db.delete(source)
+    job = cleanup_queue.enqueue(db, "source", source_id, freed)
     db.commit()
+    cleanup_queue.submit(job.id)
+    embedding_store.remove(project_id, source_id)
+    return job
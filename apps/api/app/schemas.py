@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -43,6 +43,9 @@ class Source(SourceBase):
     id: str
     uri: str
     content_ptr: str
+    content_hash: Optional[str] = None
+    status: str = "ready"
+    error: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -55,6 +58,73 @@ class SourceUpdate(BaseModel):
     kind: Optional[str] = None
 
 
+class IndexStats(BaseModel):
+    project_id: Optional[str] = None
+    loaded_partitions: Optional[int] = None
+    sources: int
+    live_vectors: int
+    dead_vectors: int
+    capacity: int
+    bytes: int
+    ann_vectors: int = 0
+
+
+class ContentCacheStats(BaseModel):
+    entries: int
+    bytes: int
+    budget: int
+    text_hits: int
+    text_misses: int
+    vector_hits: int
+    vector_misses: int
+
+
+class IngestionStageStats(BaseModel):
+    active: int
+    count: int
+    total_seconds: float
+    avg_seconds: float
+    max_seconds: float
+
+
+class IngestionStats(BaseModel):
+    workers: int
+    pdf_workers: int
+    depth: int
+    in_flight: int
+    completed: int
+    failed: int
+    stages: Dict[str, IngestionStageStats]
+
+
+class BatchUploadResult(BaseModel):
+    filename: str
+    source: Optional[Source] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BatchUploadResult]
+
+
+class CleanupJob(BaseModel):
+    id: str
+    kind: str
+    target_id: str
+    status: str
+    total: int
+    removed: int
+    attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
 class ObsidianImportRequest(BaseModel):
     project_id: str
     folder: str = "."
@@ -62,6 +132,19 @@ class ObsidianImportRequest(BaseModel):
     limit: int | None = 100
 
 
+class ObsidianSyncRequest(BaseModel):
+    project_id: str
+    folder: str = "."
+    base_path: str | None = None
+
+
+class ObsidianSyncResponse(BaseModel):
+    added: List[Source]
+    modified: List[Source]
+    removed: List[str]
+    unchanged: int
+
+
 class InsightRunBase(BaseModel):
     project_id: str
 
@@ -98,11 +181,31 @@ class InsightRun(BaseModel):
     status: str
     created_at: datetime
     payload: Optional[dict] = None
+    stage: Optional[str] = None
+    sources_total: Optional[int] = None
+    sources_processed: Optional[int] = None
+    sources_reused: Optional[int] = None
+    sources_recomputed: Optional[int] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
 
 
+class InsightRunSummary(BaseModel):
+    id: str
+    project_id: str
+    status: str
+    stage: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    theme_count: int = 0
+    claim_count: int = 0
+    citation_count: int = 0
+
+
 class InsightRunUpdate(BaseModel):
     status: Optional[str] = None
     payload: Optional[dict] = None
@@ -140,6 +243,28 @@ class Citation(BaseModel):
         orm_mode = True
 
 
+class Evidence(BaseModel):
+    source_id: str
+    source_title: str
+    quote: str
+    start: int
+    end: int
+    score: float
+    location: str
+
+
+class SearchResult(BaseModel):
+    kind: str
+    ref_id: str
+    title: Optional[str] = None
+    snippet: Optional[str] = None
+    char_start: Optional[int] = None
+    char_end: Optional[int] = None
+    score: float
+    bm25_rank: Optional[int] = None
+    vector_rank: Optional[int] = None
+
+
 class DecisionBase(BaseModel):
     project_id: str
     title: str
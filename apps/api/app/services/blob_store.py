@@ -0,0 +1,299 @@
+"""Content-addressed, reference-counted storage for uploads and text snapshots.
+
+Files live at ``DATA_DIR/blobs/ab/cdef...<suffix>`` where ``abcdef...`` is the
+SHA-256 of the raw upload, so the same document uploaded into several projects
+is stored once. A source's extracted text is addressed by the same digest
+(``.txtz`` suffix, see :mod:`.text_store`) because it is derived from those bytes. ``Source.uri`` and
+``Source.content_ptr`` hold blob pointers relative to ``DATA_DIR.parent``,
+like every other stored path.
+
+Each stored pointer has a row in ``blobs`` counting the sources that use it.
+:func:`acquire` and :func:`release` run inside the caller's transaction;
+files whose count drops to zero are unlinked once that transaction has
+committed. Pointers without a row (fixtures, vault paths) are never deleted.
+
+Between writing (or reusing) a blob and committing the row that references
+it, a request holds the pointer in a :class:`Claim`, counted on the pointer's
+``blobs`` row and committed straight away so every worker process sees it.
+:func:`purge_unreferenced` takes SQLite's write lock before it checks
+references and claims and keeps it until the files are unlinked, so a file
+freed by a delete is never removed from under an upload that has just reused
+it, whichever process either runs in.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, delete, func, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import DATA_DIR, SessionLocal
+from . import text_store
+from .content_cache import content_cache
+from .extractors import remove_page_cache
+
+BLOB_DIR = DATA_DIR / "blobs"
+STAGING_DIR = BLOB_DIR / "staging"
+STAGING_DIR.mkdir(parents=True, exist_ok=True)
+_STORED_PREFIX = f"{DATA_DIR.name}/"
+_BLOB_PREFIX = f"{DATA_DIR.name}/blobs/"
+TEXT_SUFFIX = ".txtz"
+# Pointers per ``IN (...)`` query, well under SQLite's bound-variable limit.
+QUERY_CHUNK = 500
+
+
+
+class Claim:
+    """Pointers a request is about to reference, kept safe from cleanup until it exits.
+
+    Hold one from the moment a blob is written or reused until the
+    transaction that acquires its references has committed. Each pointer
+    adds one to its row's ``claims`` in a transaction of its own, so call
+    :meth:`add` while the request's session has no uncommitted writes.
+    Releasing unlinks claimed files that nothing ended up referencing. A
+    process that dies holding a claim leaves its count behind, which only
+    keeps those files on disk.
+    """
+
+    def __init__(self) -> None:
+        self.pointers: set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, *pointers: Optional[str]) -> None:
+        with self._lock:
+            new = [value for value in _counts(pointers) if value not in self.pointers]
+            if not new:
+                return
+            statement = sqlite_insert(models.Blob).values([{"pointer": value, "refs": 0, "claims": 1} for value in new])
+            with SessionLocal() as db:
+                db.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[models.Blob.pointer], set_={"claims": models.Blob.claims + 1}
+                    )
+                )
+                db.commit()
+            self.pointers.update(new)
+
+    def release(self) -> None:
+        with self._lock:
+            pointers = sorted(self.pointers)
+            self.pointers.clear()
+        if not pointers:
+            return
+        with SessionLocal() as db:
+            for first in range(0, len(pointers), QUERY_CHUNK):
+                chunk = pointers[first : first + QUERY_CHUNK]
+                db.execute(
+                    update(models.Blob)
+                    .where(models.Blob.pointer.in_(chunk))
+                    .values(claims=models.Blob.claims - 1)
+                    .execution_options(synchronize_session=False)
+                )
+                _sweep(db, chunk)
+                db.commit()
+
+    def __enter__(self) -> "Claim":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.release()
+
+
+def pointer(digest: str, suffix: str) -> str:
+    return str(Path(DATA_DIR.name, "blobs", digest[:2], f"{digest[2:]}{suffix.lower()}"))
+
+
+def text_pointer(digest: str) -> str:
+    """Pointer of the text snapshot extracted from the upload with ``digest``."""
+    return pointer(digest, TEXT_SUFFIX)
+
+
+def path(blob_pointer: str) -> Path:
+    return Path(DATA_DIR.parent, blob_pointer)
+
+
+def staging_path(suffix: str = "") -> Path:
+    """Scratch file for content whose digest is not known until it has been written."""
+    return STAGING_DIR / f"{uuid.uuid4().hex}{suffix}"
+
+
+def store_file(staged: Path, digest: str, suffix: str, claim: Optional[Claim] = None) -> str:
+    """Move a fully written staging file into place; an existing blob wins and the copy is dropped.
+
+    The pointer joins ``claim`` before the existing blob is trusted, so a
+    pending cleanup cannot unlink it once this returns.
+    """
+    blob_pointer = pointer(digest, suffix)
+    target = path(blob_pointer)
+    if claim is not None:
+        claim.add(blob_pointer)
+    if target.exists():
+        staged.unlink(missing_ok=True)
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged, target)
+    return blob_pointer
+
+
+def store_copy(source_path: Path, digest: str, suffix: str, claim: Optional[Claim] = None) -> str:
+    staged = staging_path(suffix)
+    shutil.copyfile(source_path, staged)
+    return store_file(staged, digest, suffix, claim)
+
+
+def write_text(blob_pointer: str, content: str, claim: Optional[Claim] = None) -> None:
+    """Write a compressed text snapshot unless it already exists; readers never see a partial file."""
+    if claim is not None:
+        claim.add(blob_pointer)
+    target = path(blob_pointer)
+    if target.exists():
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    text_store.write_text(target, content)
+
+
+def _counts(pointers: Iterable[Optional[str]]) -> Counter:
+    return Counter(value for value in pointers if value and value.startswith(_STORED_PREFIX))
+
+
+def acquire(db: Session, pointers: Iterable[Optional[str]]) -> None:
+    """Add one reference per occurrence of each stored pointer (a source counts its uri and text separately)."""
+    counts = _counts(pointers)
+    if not counts:
+        return
+    statement = sqlite_insert(models.Blob).values(
+        [{"pointer": value, "refs": count} for value, count in counts.items()]
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[models.Blob.pointer], set_={"refs": models.Blob.refs + statement.excluded.refs}
+        )
+    )
+
+
+def release(db: Session, pointers: Iterable[Optional[str]]) -> list[str]:
+    """Drop references and return the pointers nothing uses any more; pass them to :func:`purge` after commit."""
+    counts = _counts(pointers)
+    if not counts:
+        return []
+    table = models.Blob.__table__
+    # Core table statement: executemany with a WHERE bound per row.
+    db.execute(
+        update(table).where(table.c.pointer == bindparam("target")).values(refs=table.c.refs - bindparam("released")),
+        [{"target": value, "released": count} for value, count in counts.items()],
+    )
+    # A pointer some request has claimed stays; releasing the claim removes it.
+    freed = list(
+        db.scalars(
+            select(models.Blob.pointer).where(
+                models.Blob.pointer.in_(counts), models.Blob.refs <= 0, models.Blob.claims <= 0
+            )
+        )
+    )
+    if freed:
+        db.execute(delete(models.Blob).where(models.Blob.pointer.in_(freed)))
+    return freed
+
+
+def _sweep(db: Session, pointers: list[str], own: Iterable[str] = ()) -> tuple[list[str], dict[str, str]]:
+    """Unlink ``pointers`` no source references and no request claims; the caller commits.
+
+    Pointers in ``own`` (the caller's own abandoned claim) do not count as claimed.
+    """
+    # Writing first takes SQLite's write lock, held until the caller commits:
+    # no worker can add a reference or claim between this check and the unlink.
+    db.execute(
+        delete(models.Blob).where(
+            models.Blob.pointer.in_(pointers), models.Blob.refs <= 0, models.Blob.claims <= 0
+        )
+    )
+    own = set(own)
+    live = {
+        row.pointer
+        for row in db.execute(
+            select(models.Blob.pointer, models.Blob.refs, models.Blob.claims).where(models.Blob.pointer.in_(pointers))
+        )
+        if row.refs > 0 or row.claims > (1 if row.pointer in own else 0)
+    }
+    removed: list[str] = []
+    errors: dict[str, str] = {}
+    for value in pointers:
+        if value in live:
+            continue
+        try:
+            purge([value])
+        except OSError as exc:
+            errors[value] = str(exc)
+        else:
+            removed.append(value)
+    return removed, errors
+
+
+def purge_unreferenced(
+    db: Session, pointers: Iterable[str], claim: Optional[Claim] = None
+) -> tuple[list[str], dict[str, str]]:
+    """Unlink the ``pointers`` no source references and no other request claims.
+
+    Returns the pointers removed and the error of each that could not be;
+    referenced or claimed ones are left alone and appear in neither. Runs in
+    transactions of its own on ``db``'s engine, so ``db`` must not hold
+    uncommitted writes. Pointers held by ``claim`` itself (the caller's own
+    abandoned work) do not count as claimed.
+    """
+    pending = list(dict.fromkeys(pointers))
+    own = claim.pointers if claim is not None else set()
+    removed: list[str] = []
+    errors: dict[str, str] = {}
+    with Session(db.get_bind()) as session:
+        for first in range(0, len(pending), QUERY_CHUNK):
+            chunk_removed, chunk_errors = _sweep(session, pending[first : first + QUERY_CHUNK], own)
+            session.commit()
+            removed += chunk_removed
+            errors.update(chunk_errors)
+    return removed, errors
+
+
+def discard(db: Session, pointers: Iterable[Optional[str]], claim: Optional[Claim] = None) -> None:
+    """Delete blobs written for work that was abandoned, unless some source references them.
+
+    Only pointers inside the blob store are considered; older stored files are left alone.
+    """
+    counts = Counter(value for value in _counts(pointers) if value.startswith(_BLOB_PREFIX))
+    if counts:
+        purge_unreferenced(db, counts, claim)
+
+
+def purge(freed: Iterable[str]) -> None:
+    for blob_pointer in freed:
+        target = path(blob_pointer)
+        target.unlink(missing_ok=True)
+        remove_page_cache(target)
+        content_cache.forget_text(blob_pointer)
+
+
+def ensure_refcounts(engine: Engine) -> None:
+    """Seed reference counts for stored files that predate the blob store (first run only)."""
+    with Session(engine) as db:
+        if db.scalar(select(func.count()).select_from(models.Blob)):
+            return
+        db.execute(
+            text(
+                """
+                INSERT INTO blobs (pointer, refs)
+                SELECT pointer, COUNT(*) FROM (
+                    SELECT uri AS pointer FROM sources UNION ALL SELECT content_ptr FROM sources
+                ) WHERE pointer LIKE :prefix GROUP BY pointer
+                """
+            ),
+            {"prefix": f"{_STORED_PREFIX}%"},
+        )
+        db.commit()
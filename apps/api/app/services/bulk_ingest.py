@@ -0,0 +1,205 @@
+"""Batch ingestion: many files, or zip archives of them, in one request and one transaction.
+
+Unlike single uploads, which are queued for the background ingestion workers,
+a batch is processed inline so its per-file outcome can be reported in the
+response: files are staged to disk, extracted concurrently, inserted with one
+bulk ``INSERT`` and one commit, and embedded together in one pass.
+"""
+from __future__ import annotations
+
+import os
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import PurePosixPath
+from typing import BinaryIO, Optional, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import blob_store, search_index, text_store
+from .content_cache import content_cache
+from .embedding_store import embedding_store
+from .extractors import ALLOWED_EXTENSIONS, extract_pdf_pages, extract_text_from_path
+from .ingestion import ingestion_queue
+from .uploads import MAX_UPLOAD_BYTES, copy_stream
+
+BATCH_EXTRACT_WORKERS = int(os.getenv("INSIGHTFLOW_BATCH_EXTRACT_WORKERS", str(min(8, (os.cpu_count() or 1) + 2))))
+# Zip archives are small on the wire but not on disk: members per archive and
+# bytes expanded from all archives of one batch are capped separately.
+MAX_ZIP_MEMBERS = int(os.getenv("INSIGHTFLOW_MAX_ZIP_MEMBERS", "10000"))
+MAX_ZIP_EXPANDED_BYTES = int(float(os.getenv("INSIGHTFLOW_MAX_ZIP_EXPANDED_MB", "2048")) * 1024 * 1024)
+UNSUPPORTED = "Unsupported file type. Use PDF, Markdown, or TXT."
+
+
+@dataclass
+class BatchEntry:
+    """One file of a batch; ``error`` is set as soon as any stage fails for it."""
+
+    filename: str
+    source_id: str = ""
+    uri: str = ""
+    digest: str = ""
+    content_ptr: str = ""
+    text: str = ""
+    error: Optional[str] = None
+    source: Optional[models.Source] = None
+
+
+def _stage(entry: BatchEntry, stream: BinaryIO, claim: blob_store.Claim, max_bytes: int = MAX_UPLOAD_BYTES) -> int:
+    """Copy one file into the blob store; returns the bytes written (0 if it failed)."""
+    suffix = PurePosixPath(entry.filename).suffix.lower()
+    if suffix not in ALLOWED_EXTENSIONS:
+        entry.error = UNSUPPORTED
+        return 0
+    entry.source_id = str(uuid.uuid4())
+    staged = blob_store.staging_path(suffix)
+    try:
+        entry.digest, size = copy_stream(stream, staged, max_bytes)
+    except (OSError, ValueError) as exc:
+        entry.error = str(exc)
+        return 0
+    entry.uri = blob_store.store_file(staged, entry.digest, suffix, claim)
+    return size
+
+
+def stage_uploads(uploads: Sequence[tuple[str, BinaryIO]], claim: blob_store.Claim) -> list[BatchEntry]:
+    """Copy every upload, expanding ``.zip`` archives member by member, into the blob store.
+
+    Stored blobs are held in ``claim``, which must stay open until :func:`ingest_batch` has committed.
+    Archive members past ``MAX_ZIP_MEMBERS`` or the ``MAX_ZIP_EXPANDED_BYTES``
+    budget are reported as failed entries instead of being expanded.
+    """
+    entries: list[BatchEntry] = []
+    expanded_budget = MAX_ZIP_EXPANDED_BYTES
+    for filename, stream in uploads:
+        if PurePosixPath(filename).suffix.lower() != ".zip":
+            entry = BatchEntry(filename=filename)
+            _stage(entry, stream, claim)
+            entries.append(entry)
+            continue
+        try:
+            archive = zipfile.ZipFile(stream)
+        except (zipfile.BadZipFile, OSError) as exc:
+            entries.append(BatchEntry(filename=filename, error=f"Unreadable zip archive: {exc}"))
+            continue
+        with archive:
+            members = [
+                member
+                for member in archive.infolist()
+                if not member.is_dir()
+                and not PurePosixPath(member.filename).name.startswith(".")
+                and "__MACOSX" not in member.filename.split("/")
+            ]
+            for member in members[:MAX_ZIP_MEMBERS]:
+                name = member.filename
+                entry = BatchEntry(filename=f"{filename}/{name}")
+                if PurePosixPath(name).suffix.lower() not in ALLOWED_EXTENSIONS:
+                    entry.error = UNSUPPORTED
+                elif member.file_size > expanded_budget:
+                    entry.error = "Archive member exceeds what is left of the batch's uncompressed size limit"
+                else:
+                    # Members are decompressed straight to disk, never held in
+                    # memory whole, and the copy stops at the remaining budget
+                    # whatever size the archive claims.
+                    with archive.open(member) as member_stream:
+                        expanded_budget -= _stage(
+                            entry, member_stream, claim, min(MAX_UPLOAD_BYTES, expanded_budget)
+                        )
+                entries.append(entry)
+            skipped = len(members) - MAX_ZIP_MEMBERS
+            if skipped > 0:
+                error = f"Skipped {skipped} files past the {MAX_ZIP_MEMBERS}-file archive limit"
+                entries.append(BatchEntry(filename=filename, error=error))
+    return entries
+
+
+def _extract(entry: BatchEntry, claim: blob_store.Claim) -> None:
+    text_path = blob_store.path(entry.content_ptr)
+    raw_path = blob_store.path(entry.uri)
+    try:
+        if text_path.exists():
+            entry.text = text_store.read_text(text_path)
+            return
+        if raw_path.suffix.lower() == ".pdf":
+            text = extract_pdf_pages(raw_path, text_path, ingestion_queue.pdf_pool())
+        else:
+            text = extract_text_from_path(raw_path)
+        entry.text = text or ""
+        blob_store.write_text(entry.content_ptr, entry.text, claim)
+    except Exception as exc:  # noqa: BLE001 - reported per file
+        entry.error = str(exc) or exc.__class__.__name__
+
+
+def ingest_batch(
+    db: Session,
+    project_id: str,
+    entries: list[BatchEntry],
+    claim: blob_store.Claim,
+    kind: str = "document",
+    tags: Optional[list[str]] = None,
+) -> list[BatchEntry]:
+    """Extract, persist and embed staged ``entries``; failed entries keep their error and leave no new files behind."""
+    staged = [entry for entry in entries if entry.error is None]
+    # Resolve text pointers up front: content seen before reuses its text, and
+    # duplicates within the batch share the first copy's extraction.
+    owners: dict[str, BatchEntry] = {}
+    for entry in staged:
+        owner = owners.get(entry.digest)
+        if owner is not None:
+            entry.content_ptr = owner.content_ptr
+            continue
+        owners[entry.digest] = entry
+        entry.content_ptr = content_cache.text_pointer(db, entry.digest) or blob_store.text_pointer(entry.digest)
+        claim.add(entry.content_ptr)
+
+    with ThreadPoolExecutor(max_workers=BATCH_EXTRACT_WORKERS, thread_name_prefix="batch-extract") as pool:
+        list(pool.map(lambda entry: _extract(entry, claim), owners.values()))
+    for entry in staged:
+        owner = owners[entry.digest]
+        if owner is not entry:
+            entry.text, entry.error = owner.text, owner.error
+
+    ready = [entry for entry in staged if entry.error is None]
+    failed = [entry for entry in staged if entry.error is not None]
+    blob_store.discard(db, [value for entry in failed for value in (entry.uri, entry.content_ptr)], claim)
+    if not ready:
+        return entries
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": entry.source_id,
+            "project_id": project_id,
+            "kind": kind,
+            "uri": entry.uri,
+            "title": PurePosixPath(entry.filename).name,
+            "tags": list(tags or []),
+            "content_ptr": entry.content_ptr,
+            "content_hash": entry.digest,
+            "status": "ready",
+            "error": None,
+            "created_at": now,
+        }
+        for entry in ready
+    ]
+    db.execute(insert(models.Source), rows)
+    blob_store.acquire(db, [value for entry in ready for value in (entry.uri, entry.content_ptr)])
+    by_id = {
+        source.id: source
+        for source in db.scalars(select(models.Source).where(models.Source.id.in_([row["id"] for row in rows])))
+    }
+    sources = [by_id[entry.source_id] for entry in ready]
+    for entry, source in zip(ready, sources):
+        entry.source = source
+    search_index.index_new_sources(db, [(source, entry.text) for entry, source in zip(ready, sources)])
+    db.commit()
+
+    for entry in owners.values():
+        if entry.error is None:
+            content_cache.remember_text(entry.digest, entry.content_ptr)
+    embedding_store.upsert_many(sources)
+    return entries
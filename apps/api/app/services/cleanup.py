@@ -0,0 +1,148 @@
+"""Background removal of files freed by deletes.
+
+Delete routes release their blob references, delete the rows and record a
+``cleanup_jobs`` row in one transaction, then hand the job to this queue and
+return straight away, so a delete costs the same whether it frees one file or
+ten thousand. A worker unlinks the files; those that fail (a locked file, a
+flaky network mount) stay on the job and are retried with exponential backoff
+until ``CLEANUP_MAX_ATTEMPTS``. Unfinished jobs are picked up again on restart.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from . import blob_store
+
+CLEANUP_WORKERS = int(os.getenv("INSIGHTFLOW_CLEANUP_WORKERS", "1"))
+CLEANUP_MAX_ATTEMPTS = int(os.getenv("INSIGHTFLOW_CLEANUP_MAX_ATTEMPTS", "5"))
+CLEANUP_RETRY_SECONDS = float(os.getenv("INSIGHTFLOW_CLEANUP_RETRY_SECONDS", "1"))
+PENDING_STATUSES = ("queued", "running")
+
+
+class CleanupQueue:
+    """Unlinks the files of committed cleanup jobs on a small thread pool."""
+
+    def __init__(self, workers: int = CLEANUP_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._timers: set[threading.Timer] = set()
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cleanup")
+            return self._executor
+
+    def enqueue(self, db: Session, kind: str, target_id: str, pointers: Iterable[str]) -> models.CleanupJob:
+        """Record a job in the caller's transaction; :meth:`submit` it once that has committed."""
+        pointers = list(dict.fromkeys(pointers))
+        job = models.CleanupJob(kind=kind, target_id=target_id, pointers=pointers, total=len(pointers))
+        if not pointers:
+            job.status = "done"
+            job.finished_at = datetime.utcnow()
+        db.add(job)
+        db.flush()
+        return job
+
+    def submit(self, job_id: str) -> None:
+        self._pool().submit(self._run, job_id)
+
+    def resume(self, db: Session) -> int:
+        """Re-queue jobs left unfinished by a previous process; returns how many."""
+        pending = list(
+            db.scalars(select(models.CleanupJob.id).where(models.CleanupJob.status.in_(PENDING_STATUSES)))
+        )
+        for job_id in pending:
+            self.submit(job_id)
+        return len(pending)
+
+    def shutdown(self) -> None:
+        """Finish the job in hand and drop the rest; their rows stay pending and resume on restart."""
+        with self._lock:
+            executor, timers = self._executor, list(self._timers)
+            self._executor = None
+            self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _retry_later(self, job_id: str, attempts: int) -> None:
+        def fire() -> None:
+            with self._lock:
+                self._timers.discard(timer)
+                if self._executor is None:
+                    # Shut down meanwhile; the job resumes on restart.
+                    return
+            self.submit(job_id)
+
+        timer = threading.Timer(CLEANUP_RETRY_SECONDS * 2 ** (attempts - 1), fire)
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def _run(self, job_id: str) -> None:
+        try:
+            self._process(job_id)
+        except Exception as exc:  # noqa: BLE001 - a job must never be left "running"
+            self._record_failure(job_id, f"{exc.__class__.__name__}: {exc}")
+
+    def _process(self, job_id: str) -> None:
+        with SessionLocal() as db:
+            job = db.get(models.CleanupJob, job_id)
+            if job is None or job.status not in PENDING_STATUSES:
+                return
+            job.status = "running"
+            job.attempts += 1
+            db.commit()
+
+            # A file can be claimed again between the delete and this job (the
+            # same bytes uploaded anew); purge_unreferenced leaves those alone.
+            removed, errors = blob_store.purge_unreferenced(db, job.pointers)
+            job.removed += len(removed)
+            job.pointers = list(errors)
+            job.error = "; ".join(f"{pointer}: {error}" for pointer, error in errors.items()) or None
+            self._settle(job)
+            db.commit()
+            if job.status == "queued":
+                self._retry_later(job.id, job.attempts)
+
+    def _record_failure(self, job_id: str, error: str) -> None:
+        """Put a job that raised back in the queue, or fail it once it is out of attempts."""
+        with SessionLocal() as db:
+            job = db.get(models.CleanupJob, job_id)
+            if job is None or job.status not in PENDING_STATUSES:
+                return
+            if job.status == "queued":
+                # Failed before it was marked running; count the attempt here.
+                job.attempts += 1
+            job.error = error
+            self._settle(job)
+            db.commit()
+            if job.status == "queued":
+                self._retry_later(job.id, job.attempts)
+
+    @staticmethod
+    def _settle(job: models.CleanupJob) -> None:
+        if not job.pointers:
+            job.status = "done"
+        elif job.attempts >= CLEANUP_MAX_ATTEMPTS:
+            job.status = "failed"
+        else:
+            job.status = "queued"
+        if job.status != "queued":
+            job.finished_at = datetime.utcnow()
+
+
+cleanup_queue = CleanupQueue()
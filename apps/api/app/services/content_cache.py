@@ -0,0 +1,166 @@
+"""Cache of extraction and embedding results keyed by the SHA-256 of the raw upload bytes.
+
+Identical content (a re-imported vault, a duplicate PDF) reuses the extracted
+text file and the chunk embeddings of the first copy instead of extracting and
+embedding again. Entries are evicted least-recently-used once their arrays
+exceed the byte budget; the text pointers themselves are also recoverable from
+``sources.content_hash`` after a restart.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import DATA_DIR
+
+CONTENT_CACHE_BUDGET = int(float(os.getenv("INSIGHTFLOW_CONTENT_CACHE_MB", "64")) * 1024 * 1024)
+# Rough per-entry overhead of the key, pointer and Python objects.
+_ENTRY_OVERHEAD = 256
+
+
+def content_hash(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("text_ptr", "spans", "vectors")
+
+    def __init__(self) -> None:
+        self.text_ptr: Optional[str] = None
+        self.spans: Optional[np.ndarray] = None
+        self.vectors: Optional[np.ndarray] = None
+
+    @property
+    def nbytes(self) -> int:
+        arrays = 0 if self.vectors is None else self.vectors.nbytes + self.spans.nbytes  # type: ignore[union-attr]
+        return _ENTRY_OVERHEAD + arrays
+
+
+class ContentCache:
+    """Size-bounded LRU of ``digest -> (text pointer, chunk spans, chunk vectors)`` with hit/miss counters."""
+
+    def __init__(self, budget: int = CONTENT_CACHE_BUDGET):
+        self.budget = budget
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"text_hits": 0, "text_misses": 0, "vector_hits": 0, "vector_misses": 0}
+
+    def _entry(self, digest: str) -> _Entry:
+        entry = self._entries.get(digest)
+        if entry is None:
+            entry = self._entries[digest] = _Entry()
+            self._bytes += entry.nbytes
+        self._entries.move_to_end(digest)
+        return entry
+
+    def _evict(self) -> None:
+        while self._entries and self._bytes > self.budget:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.nbytes
+
+    def text_pointer(self, db: Session, digest: str) -> Optional[str]:
+        """``content_ptr`` of already-extracted text for ``digest``, or ``None`` on a miss.
+
+        Falls back to any source row with the same hash whose text file still
+        exists, so the cache survives restarts and evictions.
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+            pointer = entry.text_ptr if entry is not None else None
+        if pointer is None or not Path(DATA_DIR.parent, pointer).exists():
+            pointer = None
+            candidates = db.scalars(
+                select(models.Source.content_ptr).where(models.Source.content_hash == digest).distinct()
+            )
+            for candidate in candidates:
+                if candidate and Path(DATA_DIR.parent, candidate).exists():
+                    pointer = candidate
+                    break
+        with self._lock:
+            if pointer is None:
+                self.counters["text_misses"] += 1
+                return None
+            self.counters["text_hits"] += 1
+            self._entry(digest).text_ptr = pointer
+            self._evict()
+        return pointer
+
+    def text_pointers(self, db: Session, digests: set[str]) -> dict[str, str]:
+        """Bulk :meth:`text_pointer`: one query covers every digest the cache cannot answer."""
+        found: dict[str, str] = {}
+        with self._lock:
+            for digest in digests:
+                entry = self._entries.get(digest)
+                if entry is not None and entry.text_ptr is not None:
+                    found[digest] = entry.text_ptr
+        found = {digest: pointer for digest, pointer in found.items() if Path(DATA_DIR.parent, pointer).exists()}
+        missing = digests - found.keys()
+        if missing:
+            rows = db.execute(
+                select(models.Source.content_hash, models.Source.content_ptr)
+                .where(models.Source.content_hash.in_(missing))
+                .distinct()
+            )
+            for digest, candidate in rows:
+                if digest not in found and candidate and Path(DATA_DIR.parent, candidate).exists():
+                    found[digest] = candidate
+        with self._lock:
+            self.counters["text_hits"] += len(found)
+            self.counters["text_misses"] += len(digests) - len(found)
+            for digest, pointer in found.items():
+                self._entry(digest).text_ptr = pointer
+            self._evict()
+        return found
+
+    def remember_text(self, digest: str, text_ptr: str) -> None:
+        with self._lock:
+            self._entry(digest).text_ptr = text_ptr
+            self._evict()
+
+    def vectors(self, digest: Optional[str]) -> Optional[tuple[np.ndarray, np.ndarray]]:
+        """Cached ``(spans, vectors)`` chunk embeddings for ``digest``, counting the hit or miss."""
+        if not digest:
+            return None
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry.vectors is None:
+                self.counters["vector_misses"] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.counters["vector_hits"] += 1
+            return entry.spans, entry.vectors  # type: ignore[return-value]
+
+    def remember_vectors(self, digest: Optional[str], spans: np.ndarray, vectors: np.ndarray) -> None:
+        if not digest:
+            return
+        with self._lock:
+            entry = self._entry(digest)
+            self._bytes -= entry.nbytes
+            entry.spans = np.array(spans, dtype=np.int64)
+            entry.vectors = np.array(vectors, dtype=np.float32)
+            self._bytes += entry.nbytes
+            self._evict()
+
+    def forget_text(self, text_ptr: str) -> None:
+        """Drop pointers to a text file that is being deleted."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.text_ptr == text_ptr:
+                    entry.text_ptr = None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "budget": self.budget, **self.counters}
+
+
+content_cache = ContentCache()
@@ -1,21 +1,48 @@
 from __future__ import annotations
 
 import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Iterable, Iterator, List, Sequence, Tuple
 
 import numpy as np
 
 from .. import models
 from ..database import DATA_DIR
-
-try:
-    import faiss  # type: ignore
-except ImportError:  # pragma: no cover - optional dependency
-    faiss = None  # type: ignore
+from . import text_store
+from .content_cache import content_cache
+from .vector_index import (
+    ANN_MIN_VECTORS,
+    ANN_TRAIN_SAMPLE,
+    INDEX_MODE,
+    STORAGE_DTYPES,
+    VECTOR_STORAGE,
+    build_ann,
+    dequantize,
+    quantize,
+    score,
+)
 
 
 EMBED_DIM = 64
+MAX_TOKENS = 512
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP = 40
+EMBED_BATCH_CHUNKS = 4096
+SEARCH_OVERSAMPLE = 8
+COMPACTION_THRESHOLD = 0.25
+COMPACTION_MIN_ROWS = 256
+INDEX_DIR = DATA_DIR / "index"
+INDEX_MEMORY_BUDGET = int(float(os.getenv("INSIGHTFLOW_INDEX_MEMORY_MB", "512")) * 1024 * 1024)
+SNAPSHOT_VERSION = 3
+
+_TOKEN_PATTERN = re.compile(r"\S+")
 
 
 def _text_from_source(source: models.Source) -> str:
@@ -24,66 +51,818 @@ def _text_from_source(source: models.Source) -> str:
     file_path = Path(DATA_DIR.parent, source.content_ptr)
     if not file_path.exists():
         return ""
-    return file_path.read_text(encoding="utf-8", errors="ignore")
+    return text_store.read_text(file_path)
+
+
+def _content_fingerprint(source: models.Source) -> str:
+    """Cheap change marker for a source's extracted text (no file read)."""
+    if not source.content_ptr:
+        return ""
+    try:
+        stat = Path(DATA_DIR.parent, source.content_ptr).stat()
+    except OSError:
+        return f"{source.content_ptr}:missing"
+    return f"{source.content_ptr}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    """Embed many texts at once; returns an ``(len(texts), EMBED_DIM)`` float32 matrix.
+
+    Each distinct token is hashed once per batch and the md5 bytes are
+    accumulated per document with ``np.bincount`` instead of per-token loops.
+    """
+    matrix = np.zeros((len(texts), EMBED_DIM), dtype="float32")
+    if not texts:
+        return matrix
+    vocabulary: dict[str, int] = {}
+    token_ids: list[int] = []
+    doc_ids: list[int] = []
+    for doc, text in enumerate(texts):
+        if not text:
+            continue
+        tokens = text.lower().split()[:MAX_TOKENS]
+        token_ids.extend(vocabulary.setdefault(token, len(vocabulary)) for token in tokens)
+        doc_ids.extend([doc] * len(tokens))
+    if not token_ids:
+        return matrix
+
+    width = EMBED_DIM // 4
+    digests = np.frombuffer(
+        b"".join(hashlib.md5(token.encode("utf-8")).digest()[:width] for token in vocabulary),
+        dtype=np.uint8,
+    ).reshape(len(vocabulary), -1)
+    per_token = digests[np.asarray(token_ids, dtype=np.int64)]
+    docs = np.asarray(doc_ids, dtype=np.int64)
+
+    sums = np.zeros((len(texts), EMBED_DIM), dtype=np.float64)
+    for column in range(per_token.shape[1]):
+        sums[:, (column * 4) % EMBED_DIM] += np.bincount(docs, weights=per_token[:, column], minlength=len(texts))
+    sums /= 255.0
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    np.divide(sums, norms, out=sums, where=norms > 0)
+    matrix[:] = sums
+    return matrix
 
 
 def _hash_to_vec(text: str) -> np.ndarray:
-    if not text:
-        return np.zeros(EMBED_DIM, dtype="float32")
-    tokens = text.lower().split()
-    vec = np.zeros(EMBED_DIM, dtype="float32")
-    for token in tokens[:512]:
-        digest = hashlib.md5(token.encode("utf-8")).digest()
-        for idx, byte in enumerate(digest[: EMBED_DIM // 4]):
-            vec[(idx * 4) % EMBED_DIM] += byte / 255.0
-    norm = np.linalg.norm(vec)
-    if norm > 0:
-        vec /= norm
-    return vec.astype("float32")
+    return embed_texts([text])[0]
 
 
-class EmbeddingStore:
-    def __init__(self, dimension: int = EMBED_DIM):
+def chunk_spans(text: str) -> np.ndarray:
+    """Split ``text`` into overlapping token windows; returns ``(n, 2)`` char offsets."""
+    bounds = np.array([match.span() for match in _TOKEN_PATTERN.finditer(text)], dtype=np.int64).reshape(-1, 2)
+    if not len(bounds):
+        return np.zeros((0, 2), dtype=np.int64)
+    stride = CHUNK_TOKENS - CHUNK_OVERLAP
+    first = np.arange(0, max(len(bounds) - CHUNK_OVERLAP, 1), stride)
+    last = np.minimum(first + CHUNK_TOKENS, len(bounds)) - 1
+    return np.stack([bounds[first, 0], bounds[last, 1]], axis=1)
+
+
+class IndexPartition:
+    """Passage-level index for one project: one row per overlapping chunk of a source's text.
+
+    Vectors live in a single contiguous buffer in the ``storage`` format
+    (float32, float16 or int8 with a per-row scale, see :mod:`.vector_index`)
+    and are scored in that form; chunk metadata sits in a parallel ``(rows,
+    3)`` int64 buffer of ``(source ordinal, char_start, char_end)``. Only
+    per-source bookkeeping is kept in Python lists.
+
+    Each source keeps a stable integer ordinal for the partition's lifetime.
+    Re-adding a source tombstones its old rows and appends new ones under the
+    same ordinal; removing it tombstones its rows. Dead rows are skipped by
+    search and dropped by :meth:`compact`, which runs in the background once
+    they pass ``COMPACTION_THRESHOLD`` of the buffer.
+
+    In ``ivf``/``hnsw`` mode an approximate index is trained in the background
+    once the partition holds ``ANN_MIN_VECTORS`` live rows and retrained each
+    time it doubles; until one is ready, search stays exact.
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: Path,
+        dimension: int = EMBED_DIM,
+        mode: str = INDEX_MODE,
+        storage: str = VECTOR_STORAGE,
+    ):
         self.dimension = dimension
-        self.ids: list[str] = []
-        self.vectors: list[np.ndarray] = []
-        self.index = None
-        if faiss:
-            self.index = faiss.IndexFlatL2(dimension)  # type: ignore
+        self.snapshot_dir = snapshot_dir
+        self.mode = mode
+        self.storage = storage
+        build_ann(dimension, mode)  # validate the mode up front
+        quantize(np.zeros((0, dimension), dtype="float32"), storage)
+        self.ids: list[str | None] = []
+        self.fingerprints: list[str] = []
+        self._row_ranges: list[tuple[int, int]] = []
+        self._ordinals: dict[str, int] = {}
+        self._size = 0
+        self._dead = 0
+        self._matrix = np.zeros((0, dimension), dtype=STORAGE_DTYPES[storage])
+        self._scales = np.zeros(0, dtype=np.float32) if storage == "int8" else None
+        self._chunks = np.zeros((0, 3), dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._training = False
+        # Bumped whenever row numbers change so a background training run can
+        # tell that the rows it indexed no longer line up with the buffer.
+        self._generation = 0
+        self.ann = None
+        self.dirty = False
 
-    def rebuild(self, sources: Iterable[models.Source]) -> None:
+    @property
+    def vectors(self) -> np.ndarray:
+        """Live ``(chunks, dimension)`` view of the encoded vector buffer (tombstones included)."""
+        return self._matrix[: self._size]
+
+    @property
+    def scales(self) -> np.ndarray | None:
+        """Per-row scale factors matching :attr:`vectors`; ``None`` unless storage is ``int8``."""
+        return self._row_scales(slice(0, self._size))
+
+    @property
+    def chunks(self) -> np.ndarray:
+        """Live ``(chunks, 3)`` view of ``(source ordinal, char_start, char_end)``."""
+        return self._chunks[: self._size]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the vector and chunk buffers (including spare capacity)."""
+        scales = self._scales.nbytes if self._scales is not None else 0
+        return int(self._matrix.nbytes + scales + self._chunks.nbytes + self._alive.nbytes)
+
+    def _row_scales(self, rows) -> np.ndarray | None:
+        return self._scales[rows] if self._scales is not None else None
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.snapshot_dir / "vectors.npy"
+
+    @property
+    def _chunks_path(self) -> Path:
+        return self.snapshot_dir / "chunks.npy"
+
+    @property
+    def _scales_path(self) -> Path:
+        return self.snapshot_dir / "scales.npy"
+
+    @property
+    def _ids_path(self) -> Path:
+        return self.snapshot_dir / "ids.json"
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "sources": len(self._ordinals),
+                "live_vectors": self._size - self._dead,
+                "dead_vectors": self._dead,
+                "capacity": int(self._matrix.shape[0]),
+                "bytes": self.nbytes,
+                "ann_vectors": self.ann.ntotal if self.ann is not None else 0,
+            }
+
+    def _reset(self) -> None:
         self.ids.clear()
-        self.vectors.clear()
-        if self.index:
-            self.index.reset()  # type: ignore
+        self.fingerprints.clear()
+        self._row_ranges.clear()
+        self._ordinals.clear()
+        self._size = 0
+        self._dead = 0
+        self._matrix = np.zeros((0, self.dimension), dtype=STORAGE_DTYPES[self.storage])
+        self._scales = np.zeros(0, dtype=np.float32) if self.storage == "int8" else None
+        self._chunks = np.zeros((0, 3), dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._generation += 1
+        self.ann = None
+
+    def _reserve(self, needed: int) -> None:
+        if needed <= self._matrix.shape[0] and self._matrix.flags.writeable and self._chunks.flags.writeable:
+            return
+        # Grow geometrically so repeated small appends stay amortised O(1);
+        # this also copies a memory-mapped snapshot into writable buffers.
+        capacity = max(needed, 2 * self._size, 256)
+        matrix = np.empty((capacity, self.dimension), dtype=STORAGE_DTYPES[self.storage])
+        matrix[: self._size] = self._matrix[: self._size]
+        scales = None
+        if self._scales is not None:
+            scales = np.empty(capacity, dtype=np.float32)
+            scales[: self._size] = self._scales[: self._size]
+        chunks = np.empty((capacity, 3), dtype=np.int64)
+        chunks[: self._size] = self._chunks[: self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        self._matrix, self._scales, self._chunks, self._alive = matrix, scales, chunks, alive
+
+    def _tombstone(self, ordinal: int) -> None:
+        start, end = self._row_ranges[ordinal]
+        self._alive[start:end] = False
+        self._dead += end - start
+        self._row_ranges[ordinal] = (end, end)
+
+    def _append(
+        self,
+        ids: Sequence[str],
+        fingerprints: Sequence[str],
+        counts: Sequence[int],
+        spans: np.ndarray,
+        vectors: np.ndarray,
+        scales: np.ndarray | None = None,
+    ) -> None:
+        """Append sources whose chunks (``sum(counts)`` rows) are laid out contiguously.
+
+        ``vectors`` are float32 embeddings or rows reused from a snapshot in
+        this partition's storage; ``int8`` codes come with their ``scales``
+        and are copied as-is. Sources already
+        in the partition keep their ordinal; their old rows become tombstones.
+        """
+        if not len(ids):
+            return
+        total = int(sum(counts))
+        if scales is None:
+            vectors = np.asarray(vectors, dtype="float32").reshape(total, self.dimension)
+            codes, scales = quantize(vectors, self.storage)
+        else:
+            codes = vectors
+            vectors = dequantize(codes, scales) if self.ann is not None else codes
+        size = self._size
+        self._reserve(size + total)
+        ordinals: list[int] = []
+        row = size
+        for source_id, fingerprint, count in zip(ids, fingerprints, counts):
+            ordinal = self._ordinals.get(source_id)
+            if ordinal is None:
+                ordinal = len(self.ids)
+                self._ordinals[source_id] = ordinal
+                self.ids.append(source_id)
+                self.fingerprints.append(fingerprint)
+                self._row_ranges.append((row, row + int(count)))
+            else:
+                self._tombstone(ordinal)
+                self.fingerprints[ordinal] = fingerprint
+                self._row_ranges[ordinal] = (row, row + int(count))
+            ordinals.append(ordinal)
+            row += int(count)
+        self._matrix[size : size + total] = codes
+        if self._scales is not None:
+            self._scales[size : size + total] = scales
+        self._chunks[size : size + total, 0] = np.repeat(np.asarray(ordinals, dtype=np.int64), counts)
+        self._chunks[size : size + total, 1:] = spans
+        self._alive[size : size + total] = True
+        self._size += total
+        if self.ann is not None and total:
+            self.ann.add(vectors)
+
+    def rebuild(self, sources: Iterable[models.Source]) -> None:
+        with self._lock:
+            self._reset()
+            self.upsert_many(sources)
+
+    def upsert(self, source: models.Source) -> None:
+        self.upsert_many([source])
+
+    def upsert_many(self, sources: Iterable[models.Source]) -> None:
+        """Chunk and embed ``sources`` in batches, replacing any rows they already had.
+
+        Sources whose ``content_hash`` is in the content cache reuse its chunk
+        vectors without reading or embedding their text.
+        """
+        pending: list[tuple[models.Source, str, np.ndarray]] = []
+        pending_chunks = 0
+        cached: list[tuple[models.Source, np.ndarray, np.ndarray]] = []
         for source in sources:
-            self.add_source(source)
-
-    def add_source(self, source: models.Source) -> None:
-        text = _text_from_source(source)
-        vector = _hash_to_vec(text)
-        self.ids.append(source.id)
-        self.vectors.append(vector)
-        if self.index:
-            self.index.add(vector.reshape(1, -1))  # type: ignore
-
-    def similar(self, query_text: str, top_k: int = 5) -> List[Tuple[str, float]]:
-        if not self.ids:
-            return []
+            hit = content_cache.vectors(source.content_hash)
+            if hit is not None:
+                cached.append((source, *hit))
+                continue
+            text = _text_from_source(source)
+            spans = chunk_spans(text)
+            pending.append((source, text, spans))
+            pending_chunks += len(spans)
+            if pending_chunks >= EMBED_BATCH_CHUNKS:
+                self._embed_batch(pending)
+                pending, pending_chunks = [], 0
+        self._embed_batch(pending)
+        if cached:
+            with self._lock:
+                self._append(
+                    [source.id for source, _, _ in cached],
+                    [_content_fingerprint(source) for source, _, _ in cached],
+                    [len(spans) for _, spans, _ in cached],
+                    np.concatenate([spans for _, spans, _ in cached]).reshape(-1, 2),
+                    np.concatenate([vectors for _, _, vectors in cached]).reshape(-1, self.dimension),
+                )
+                self.dirty = True
+        self._maybe_compact()
+        self._maybe_train()
+
+    def _embed_batch(self, batch: Sequence[tuple[models.Source, str, np.ndarray]]) -> None:
+        if not batch:
+            return
+        passages = [text[start:end] for _, text, spans in batch for start, end in spans.tolist()]
+        spans = np.concatenate([spans for _, _, spans in batch]) if passages else np.zeros((0, 2), dtype=np.int64)
+        vectors = embed_texts(passages)
+        row = 0
+        for source, _, source_spans in batch:
+            content_cache.remember_vectors(source.content_hash, source_spans, vectors[row : row + len(source_spans)])
+            row += len(source_spans)
+        with self._lock:
+            self._append(
+                [source.id for source, _, _ in batch],
+                [_content_fingerprint(source) for source, _, _ in batch],
+                [len(spans) for _, _, spans in batch],
+                spans,
+                vectors,
+            )
+            self.dirty = True
+
+    def remove(self, source_id: str) -> bool:
+        """Tombstone a source's rows; returns whether it was present."""
+        with self._lock:
+            ordinal = self._ordinals.pop(source_id, None)
+            if ordinal is None:
+                return False
+            self._tombstone(ordinal)
+            self.ids[ordinal] = None
+            self.fingerprints[ordinal] = ""
+            self.dirty = True
+        self._maybe_compact()
+        return True
+
+    def _maybe_compact(self) -> None:
+        with self._lock:
+            if self._compacting or self._dead < COMPACTION_MIN_ROWS:
+                return
+            if self._dead < COMPACTION_THRESHOLD * self._size:
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact, name=f"compact-{self.snapshot_dir.name}", daemon=True).start()
+
+    def _maybe_train(self) -> None:
+        with self._lock:
+            if self.mode == "flat" or self._training or self._size - self._dead < ANN_MIN_VECTORS:
+                return
+            if self.ann is not None and 2 * self.ann.ntotal > self._size:
+                return
+            self._training = True
+        threading.Thread(target=self.train, name=f"ann-{self.snapshot_dir.name}", daemon=True).start()
+
+    def train(self) -> None:
+        """(Re)train the approximate index on the current rows and swap it in.
+
+        Training runs without the lock on a view of the buffer; rows appended
+        meanwhile are added before the swap, and a compaction or reset in the
+        meantime discards the result so the next write retries.
+        """
+        try:
+            with self._lock:
+                generation, rows = self._generation, self._size
+                matrix, scales = self._matrix[:rows], self._row_scales(slice(0, rows))
+                alive = np.flatnonzero(self._alive[:rows])
+            ann = build_ann(self.dimension, self.mode)
+            if ann is None:
+                return
+            sample = alive
+            if len(sample) > ANN_TRAIN_SAMPLE:
+                sample = np.sort(np.random.default_rng(0).choice(alive, ANN_TRAIN_SAMPLE, replace=False))
+            ann.train(dequantize(matrix[sample], scales[sample] if scales is not None else None))
+            for start in range(0, rows, EMBED_BATCH_CHUNKS):
+                end = start + EMBED_BATCH_CHUNKS
+                ann.add(dequantize(matrix[start:end], scales[start:end] if scales is not None else None))
+            with self._lock:
+                if generation != self._generation:
+                    return
+                if self._size > rows:
+                    ann.add(dequantize(self._matrix[rows : self._size], self._row_scales(slice(rows, self._size))))
+                self.ann = ann
+        finally:
+            self._training = False
+
+    def compact(self) -> None:
+        """Rewrite the buffers without tombstoned rows.
+
+        Row numbers change, so an approximate index is dropped and retrained.
+        """
+        with self._lock:
+            try:
+                if not self._dead:
+                    return
+                alive = self._alive[: self._size]
+                new_rows = np.cumsum(alive) - 1
+                matrix = np.ascontiguousarray(self._matrix[: self._size][alive])
+                scales = self._scales
+                if scales is not None:
+                    scales = np.ascontiguousarray(scales[: self._size][alive])
+                chunks = np.ascontiguousarray(self._chunks[: self._size][alive])
+                for ordinal, (start, end) in enumerate(self._row_ranges):
+                    if start == end:
+                        self._row_ranges[ordinal] = (0, 0)
+                    else:
+                        first = int(new_rows[start])
+                        self._row_ranges[ordinal] = (first, first + end - start)
+                self._matrix, self._scales, self._chunks = matrix, scales, chunks
+                self._size = matrix.shape[0]
+                self._alive = np.ones(self._size, dtype=bool)
+                self._dead = 0
+                self._generation += 1
+                self.ann = None
+                self.dirty = True
+            finally:
+                self._compacting = False
+        self._maybe_train()
+
+    def load_snapshot(
+        self,
+    ) -> tuple[list[str], list[str], list[int], np.ndarray, np.ndarray | None, np.ndarray] | None:
+        """Return ``(ids, fingerprints, counts, matrix, scales, chunks)`` with the arrays memory-mapped.
+
+        ``scales`` is only read for ``int8`` snapshots and is ``None`` otherwise.
+
+        A snapshot written with a different ``storage`` is re-encoded in memory
+        rather than re-embedded. A missing or unreadable snapshot yields
+        ``None`` so callers fall back to embedding from scratch.
+        """
+        try:
+            meta = json.loads(self._ids_path.read_text(encoding="utf-8"))
+            if meta.get("version") != SNAPSHOT_VERSION or meta.get("dimension") != self.dimension:
+                return None
+            matrix = np.load(self._vectors_path, mmap_mode="r")
+            scales = np.load(self._scales_path, mmap_mode="r") if matrix.dtype == np.int8 else None
+            chunks = np.load(self._chunks_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        ids = meta.get("ids", [])
+        fingerprints = meta.get("fingerprints", [])
+        counts = meta.get("counts", [])
+        if (
+            matrix.ndim != 2
+            or len(fingerprints) != len(ids)
+            or len(counts) != len(ids)
+            or matrix.shape[0] != sum(counts)
+            or chunks.shape != (matrix.shape[0], 3)
+            or (scales is not None and scales.shape != (matrix.shape[0],))
+        ):
+            return None
+        if matrix.dtype != STORAGE_DTYPES[self.storage]:
+            matrix, scales = quantize(dequantize(matrix, scales), self.storage)
+        return ids, fingerprints, counts, matrix, scales, chunks
+
+    def save(self) -> None:
+        """Atomically write live sources, chunk offsets and the encoded vectors with their scales.
+
+        Tombstoned rows are never persisted: the snapshot is written densely,
+        one contiguous block of rows per live source in ordinal order.
+        """
+        with self._lock:
+            live = [ordinal for ordinal, source_id in enumerate(self.ids) if source_id is not None]
+            ranges = [self._row_ranges[ordinal] for ordinal in live]
+            if ranges:
+                rows = np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in ranges])
+            else:
+                rows = np.zeros(0, dtype=np.int64)
+            chunks = self._chunks[rows]
+            chunks[:, 0] = np.repeat(np.arange(len(live), dtype=np.int64), [end - start for start, end in ranges])
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            tmp_vectors = self._vectors_path.with_suffix(".tmp.npy")
+            np.save(tmp_vectors, self._matrix[rows])
+            tmp_scales = None
+            if self._scales is not None:
+                tmp_scales = self._scales_path.with_suffix(".tmp.npy")
+                np.save(tmp_scales, self._scales[rows])
+            tmp_chunks = self._chunks_path.with_suffix(".tmp.npy")
+            np.save(tmp_chunks, chunks)
+            tmp_ids = self._ids_path.with_suffix(".tmp")
+            tmp_ids.write_text(
+                json.dumps(
+                    {
+                        "version": SNAPSHOT_VERSION,
+                        "dimension": self.dimension,
+                        "storage": self.storage,
+                        "ids": [self.ids[ordinal] for ordinal in live],
+                        "fingerprints": [self.fingerprints[ordinal] for ordinal in live],
+                        "counts": [end - start for start, end in ranges],
+                    }
+                ),
+                encoding="utf-8",
+            )
+            # Replace the arrays first: a crash in between leaves a row-count
+            # mismatch, which load_snapshot rejects instead of misreading rows.
+            os.replace(tmp_vectors, self._vectors_path)
+            if tmp_scales is not None:
+                os.replace(tmp_scales, self._scales_path)
+            else:
+                self._scales_path.unlink(missing_ok=True)
+            os.replace(tmp_chunks, self._chunks_path)
+            os.replace(tmp_ids, self._ids_path)
+            self.dirty = False
+
+    def load(self) -> None:
+        """Adopt the on-disk snapshot as-is (memory-mapped); empty if there is none."""
+        with self._lock:
+            self._reset()
+            snapshot = self.load_snapshot()
+            if snapshot:
+                self._adopt(*snapshot)
+        self._maybe_train()
+
+    def _adopt(
+        self,
+        ids: list[str],
+        fingerprints: list[str],
+        counts: list[int],
+        matrix: np.ndarray,
+        scales: np.ndarray | None,
+        chunks: np.ndarray,
+    ) -> None:
+        self._matrix, self._scales, self._chunks = matrix, scales, chunks
+        self._size = matrix.shape[0]
+        self._alive = np.ones(self._size, dtype=bool)
+        row = 0
+        for ordinal, (source_id, count) in enumerate(zip(ids, counts)):
+            self._ordinals[source_id] = ordinal
+            self._row_ranges.append((row, row + count))
+            row += count
+        self.ids.extend(ids)
+        self.fingerprints.extend(fingerprints)
+
+    def sync(self, sources: Iterable[models.Source]) -> None:
+        """Load the snapshot and re-embed only sources whose content changed since it was written."""
+        snapshot = self.load_snapshot()
+        with self._lock:
+            self._reset()
+            ordinals: dict[str, int] = {}
+            if snapshot:
+                snapshot_ids, snapshot_fingerprints, counts, matrix, scales, chunks = snapshot
+                ordinals = {source_id: ordinal for ordinal, source_id in enumerate(snapshot_ids)}
+                offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+            reused: list[int] = []
+            stale: list[models.Source] = []
+            for source in sources:
+                ordinal = ordinals.get(source.id)
+                if ordinal is not None and snapshot_fingerprints[ordinal] == _content_fingerprint(source):
+                    reused.append(ordinal)
+                else:
+                    stale.append(source)
+            if reused:
+                if reused == list(range(len(ordinals))):
+                    # Unchanged snapshot: serve straight from the mappings, no copy.
+                    self._adopt(snapshot_ids, snapshot_fingerprints, counts, matrix, scales, chunks)
+                else:
+                    rows = np.concatenate(
+                        [np.arange(offsets[ordinal], offsets[ordinal + 1]) for ordinal in reused]
+                    ).astype(np.int64)
+                    self._append(
+                        [snapshot_ids[ordinal] for ordinal in reused],
+                        [snapshot_fingerprints[ordinal] for ordinal in reused],
+                        [counts[ordinal] for ordinal in reused],
+                        chunks[rows, 1:],
+                        matrix[rows],
+                        scales[rows] if scales is not None else None,
+                    )
+            self.upsert_many(stale)
+            # A snapshot re-encoded for a different storage is no longer a memmap.
+            if len(reused) != len(ordinals) or (snapshot and not isinstance(matrix, np.memmap)):
+                self.dirty = True
+            if self.dirty:
+                self.save()
+
+    def delete_snapshot(self) -> None:
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+
+    def _search_rows(self, query_vec: np.ndarray, candidates: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top ``candidates`` chunk rows by cosine similarity, best first (may include tombstones)."""
+        candidates = min(candidates, self._size)
+        if self.ann is not None:
+            return self.ann.search(
+                lambda rows: score(self._matrix[rows], self._row_scales(rows), query_vec), query_vec, candidates
+            )
+        sims = score(self.vectors, self.scales, query_vec)
+        sims[~self._alive[: self._size]] = -np.inf
+        if candidates < self._size:
+            top = np.argpartition(-sims, candidates - 1)[:candidates]
+        else:
+            top = np.arange(self._size)
+        top = top[np.argsort(-sims[top], kind="stable")]
+        return top, sims[top]
+
+    def similar(self, query_text: str, top_k: int = 5) -> List[Tuple[str, int, int, float]]:
+        """Best-matching passage per source as ``(source_id, char_start, char_end, score)``.
+
+        ``score`` is the cosine similarity of the chunk to the query. Chunks are
+        collapsed so each source appears at most once, ranked by its best chunk.
+        """
         query_vec = _hash_to_vec(query_text)
-        matrix = np.vstack(self.vectors)
-        if self.index:
-            distances, indices = self.index.search(query_vec.reshape(1, -1), min(top_k, len(self.ids)))  # type: ignore
-            results = []
-            for dist, idx in zip(distances[0], indices[0]):
-                if idx == -1:
-                    continue
-                results.append((self.ids[idx], float(dist)))
-            return results
-        # fallback cosine similarity
-        sims = matrix @ query_vec
-        order = np.argsort(-sims)[:top_k]
-        return [(self.ids[int(i)], float(1 - sims[int(i)])) for i in order]
+        with self._lock:
+            live = self._size - self._dead
+            if not live or top_k <= 0:
+                return []
+            candidates = top_k * SEARCH_OVERSAMPLE + self._dead
+            while True:
+                rows, scores = self._search_rows(query_vec, candidates)
+                results: list[tuple[str, int, int, float]] = []
+                seen: set[int] = set()
+                for row, similarity in zip(rows.tolist(), scores.tolist()):
+                    if not self._alive[row]:
+                        continue
+                    ordinal, start, end = self._chunks[row].tolist()
+                    if ordinal in seen:
+                        continue
+                    seen.add(ordinal)
+                    results.append((self.ids[ordinal], start, end, float(similarity)))
+                    if len(results) == top_k:
+                        return results
+                # An approximate index that returns fewer rows than asked for
+                # has exhausted the lists it probes; asking for more won't help.
+                if candidates >= self._size or len(rows) < candidates:
+                    return results
+                candidates *= 4
+
+    def source_vectors(self, source_ids: Sequence[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Chunk rows of ``source_ids`` as ``(owners, spans, vectors)``.
+
+        ``owners`` holds each row's position in ``source_ids``, ``spans`` its
+        ``(char_start, char_end)`` and ``vectors`` its float32 embedding.
+        Sources that are not indexed contribute no rows.
+        """
+        with self._lock:
+            ranges = [
+                self._row_ranges[self._ordinals[source_id]] if source_id in self._ordinals else (0, 0)
+                for source_id in source_ids
+            ]
+            counts = np.array([end - start for start, end in ranges], dtype=np.int64)
+            rows = np.concatenate([np.arange(start, end) for start, end in ranges] or [np.zeros(0, dtype=np.int64)])
+            owners = np.repeat(np.arange(len(ranges)), counts)
+            return owners, self._chunks[rows, 1:], dequantize(self._matrix[rows], self._row_scales(rows))
+
+    def best_passage(self, source_id: str, query_text: str) -> tuple[int, int, float] | None:
+        """Best-matching chunk of one source as ``(char_start, char_end, score)``."""
+        query_vec = _hash_to_vec(query_text)
+        with self._lock:
+            ordinal = self._ordinals.get(source_id)
+            if ordinal is None:
+                return None
+            start_row, end_row = self._row_ranges[ordinal]
+            if start_row == end_row:
+                return None
+            sims = score(self._matrix[start_row:end_row], self._row_scales(slice(start_row, end_row)), query_vec)
+            best = int(np.argmax(sims))
+            _, char_start, char_end = self._chunks[start_row + best].tolist()
+            return char_start, char_end, float(sims[best])
+
+
+class EmbeddingStore:
+    """Embedding indexes partitioned by ``project_id``.
+
+    Partitions are persisted under ``INDEX_DIR/<project_id>``, loaded lazily on
+    first use and unloaded least-recently-used first once the loaded buffers
+    exceed ``memory_budget`` bytes, so a query only ever scans its own project.
+    """
+
+    def __init__(
+        self,
+        root: Path = INDEX_DIR,
+        memory_budget: int = INDEX_MEMORY_BUDGET,
+        dimension: int = EMBED_DIM,
+        mode: str = INDEX_MODE,
+        storage: str = VECTOR_STORAGE,
+    ):
+        self.root = root
+        self.memory_budget = memory_budget
+        self.dimension = dimension
+        self.mode = mode
+        self.storage = storage
+        self._partitions: OrderedDict[str, IndexPartition] = OrderedDict()
+        # Projects whose partition is in use by a ``lease`` block, with how many holders.
+        self._leases: dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def dirty(self) -> bool:
+        return any(partition.dirty for partition in self._partitions.values())
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(partition.nbytes for partition in self._partitions.values())
+
+    @contextmanager
+    def lease(self, project_id: str) -> Iterator[IndexPartition]:
+        """The project's partition, loaded on first use and pinned in memory until the block exits.
+
+        A leased partition is never unloaded, so writes made through it cannot
+        land on an object the store has already dropped and never saves.
+        """
+        with self._lock:
+            partition = self._partitions.get(project_id)
+            if partition is None:
+                partition = IndexPartition(self.root / project_id, self.dimension, self.mode, self.storage)
+                partition.load()
+                self._partitions[project_id] = partition
+            self._partitions.move_to_end(project_id)
+            self._leases[project_id] = self._leases.get(project_id, 0) + 1
+            self._enforce_budget()
+        try:
+            yield partition
+        finally:
+            with self._lock:
+                self._leases[project_id] -= 1
+                if not self._leases[project_id]:
+                    del self._leases[project_id]
+                self._enforce_budget()
+
+    def _enforce_budget(self) -> None:
+        # Least recently used first, skipping partitions someone still holds;
+        # those may keep the store over budget until they are released. The
+        # last partition stays loaded even if it alone exceeds the budget.
+        for project_id in list(self._partitions):
+            if len(self._partitions) <= 1 or self.loaded_bytes <= self.memory_budget:
+                return
+            if project_id in self._leases:
+                continue
+            evicted = self._partitions.pop(project_id)
+            if evicted.dirty:
+                evicted.save()
+
+    def unload(self, project_id: str) -> None:
+        with self._lock:
+            if project_id in self._leases:
+                return
+            partition = self._partitions.pop(project_id, None)
+            if partition is not None and partition.dirty:
+                partition.save()
+
+    def drop_project(self, project_id: str) -> None:
+        """Forget a project's partition and delete its snapshot."""
+        with self._lock:
+            self._partitions.pop(project_id, None)
+            IndexPartition(self.root / project_id, self.dimension).delete_snapshot()
+
+    def sync(self, sources: Iterable[models.Source]) -> None:
+        """Reconcile every project's snapshot with ``sources`` and leave partitions unloaded."""
+        by_project: dict[str, list[models.Source]] = {}
+        for source in sources:
+            by_project.setdefault(source.project_id, []).append(source)
+        with self._lock:
+            self._partitions.clear()
+            if self.root.exists():
+                # Drop partitions of deleted projects and any pre-partition snapshot files.
+                for entry in self.root.iterdir():
+                    if entry.is_dir() and entry.name not in by_project:
+                        shutil.rmtree(entry, ignore_errors=True)
+                    elif entry.is_file():
+                        entry.unlink(missing_ok=True)
+            for project_id, project_sources in by_project.items():
+                # Transient partitions: "flat" skips training an index that is dropped right away.
+                IndexPartition(self.root / project_id, self.dimension, "flat", self.storage).sync(project_sources)
+
+    def save(self) -> None:
+        with self._lock:
+            for partition in self._partitions.values():
+                if partition.dirty:
+                    partition.save()
+
+    def upsert(self, source: models.Source) -> None:
+        """Index ``source``, replacing its previous vectors if it was already indexed."""
+        with self.lease(source.project_id) as partition:
+            partition.upsert(source)
+
+    def upsert_many(self, sources: Iterable[models.Source]) -> None:
+        by_project: dict[str, list[models.Source]] = {}
+        for source in sources:
+            by_project.setdefault(source.project_id, []).append(source)
+        for project_id, project_sources in by_project.items():
+            with self.lease(project_id) as partition:
+                partition.upsert_many(project_sources)
+
+    def remove(self, project_id: str, source_id: str) -> bool:
+        """Tombstone a source's vectors; compaction reclaims them later."""
+        with self.lease(project_id) as partition:
+            return partition.remove(source_id)
+
+    def stats(self, project_id: str | None = None) -> dict:
+        """Live/dead vector counts for one project, or totals over loaded partitions."""
+        if project_id is not None:
+            with self.lease(project_id) as partition:
+                return {"project_id": project_id, **partition.stats()}
+        with self._lock:
+            partitions = list(self._partitions.values())
+        totals = {"sources": 0, "live_vectors": 0, "dead_vectors": 0, "capacity": 0, "bytes": 0, "ann_vectors": 0}
+        for partition in partitions:
+            for key, value in partition.stats().items():
+                totals[key] += value
+        return {"project_id": None, "loaded_partitions": len(partitions), **totals}
+
+    def similar(self, project_id: str, query_text: str, top_k: int = 5) -> List[Tuple[str, int, int, float]]:
+        """Search only ``project_id``'s partition; see :meth:`IndexPartition.similar`."""
+        with self.lease(project_id) as partition:
+            return partition.similar(query_text, top_k)
+
+    def best_passage(self, project_id: str, source_id: str, query_text: str) -> tuple[int, int, float] | None:
+        with self.lease(project_id) as partition:
+            return partition.best_passage(source_id, query_text)
+
+    def source_vectors(self, project_id: str, source_ids: Sequence[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with self.lease(project_id) as partition:
+            return partition.source_vectors(source_ids)
 
 
 embedding_store = EmbeddingStore()
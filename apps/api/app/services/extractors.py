@@ -1,29 +1,40 @@
-import io
+import bisect
+import json
+import os
+import shutil
+from concurrent.futures import Executor
+from functools import lru_cache
 from pathlib import Path
+from typing import BinaryIO, Optional, Sequence, Union
 
 try:
     from PyPDF2 import PdfReader
 except ImportError:  # pragma: no cover - handled at runtime
     PdfReader = None
 
+from . import text_store
+
 ALLOWED_EXTENSIONS = {".pdf", ".md", ".txt"}
+PDF_PAGES_PER_TASK = 16
 
 
-def extract_text_from_upload(filename: str, content: bytes) -> str:
-    suffix = Path(filename).suffix.lower()
+def extract_text_from_path(path: Union[str, Path]) -> str:
+    """Extract text from a file on disk; PDFs are parsed straight from the open file, not a copy in memory."""
+    path = Path(path)
+    suffix = path.suffix.lower()
     if suffix not in ALLOWED_EXTENSIONS:
         raise ValueError("Unsupported file type. Use PDF, Markdown, or TXT.")
 
     if suffix == ".pdf":
-        return _extract_pdf_text(content)
-    return content.decode("utf-8", errors="ignore")
+        with path.open("rb") as handle:
+            return _extract_pdf_text(handle)
+    return path.read_text(encoding="utf-8", errors="ignore")
 
 
-def _extract_pdf_text(raw: bytes) -> str:
+def _extract_pdf_text(stream: BinaryIO) -> str:
     if PdfReader is None:
         raise ValueError("PDF extraction unavailable; install PyPDF2.")
-    buffer = io.BytesIO(raw)
-    reader = PdfReader(buffer)
+    reader = PdfReader(stream)
     text_parts: list[str] = []
     for page in reader.pages:
         try:
@@ -33,3 +44,113 @@ def _extract_pdf_text(raw: bytes) -> str:
             continue
     extracted = "\n".join(text_parts).strip()
     return extracted
+
+
+def page_cache_paths(text_path: Path) -> tuple[Path, Path]:
+    """Per-page text directory and page offset index that sit next to a ``.txt`` snapshot."""
+    return text_path.with_suffix(".pages"), text_path.with_suffix(".pages.json")
+
+
+def _page_file(cache_dir: Path, page: int) -> Path:
+    return cache_dir / f"{page + 1:05d}.txt"
+
+
+def _failed_marker(cache_dir: Path, page: int) -> Path:
+    return cache_dir / f"{page + 1:05d}.failed"
+
+
+def _extract_pages(pdf_path: str, pages: Sequence[int], cache_dir: str) -> int:
+    """Write the text of ``pages`` (0-based) to the page cache; runs inside a worker process."""
+    with open(pdf_path, "rb") as handle:
+        reader = PdfReader(handle)
+        for page in pages:
+            try:
+                text = reader.pages[page].extract_text() or ""
+            except NotImplementedError:
+                # Some PDF pages may not support text extraction; skip gracefully,
+                # remembering so a re-extraction does not retry them.
+                _failed_marker(Path(cache_dir), page).touch()
+                continue
+            # Written atomically: a page file that exists is always complete.
+            text_store.write_text(_page_file(Path(cache_dir), page), text)
+    return len(pages)
+
+
+def extract_pdf_pages(pdf_path: Path, text_path: Path, executor: Optional[Executor] = None) -> str:
+    """Extract a PDF page by page, in parallel on ``executor`` when given, and return the joined text.
+
+    Each page's text is cached as its own compressed snapshot next to
+    ``text_path``, so a re-extraction (e.g. after a crash) only parses pages
+    that are missing. Pages whose text cannot be extracted are left out of
+    the joined text. A page offset index mapping page numbers to character
+    ranges of the joined text (empty for skipped pages) is written alongside
+    for :func:`page_number`.
+    """
+    if PdfReader is None:
+        raise ValueError("PDF extraction unavailable; install PyPDF2.")
+    cache_dir, index_path = page_cache_paths(text_path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with pdf_path.open("rb") as handle:
+        page_count = len(PdfReader(handle).pages)
+
+    missing = [
+        page
+        for page in range(page_count)
+        if not _page_file(cache_dir, page).exists() and not _failed_marker(cache_dir, page).exists()
+    ]
+    batches = [missing[start : start + PDF_PAGES_PER_TASK] for start in range(0, len(missing), PDF_PAGES_PER_TASK)]
+    if executor is not None and len(batches) > 1:
+        futures = [executor.submit(_extract_pages, str(pdf_path), batch, str(cache_dir)) for batch in batches]
+        for future in futures:
+            future.result()
+    else:
+        for batch in batches:
+            _extract_pages(str(pdf_path), batch, str(cache_dir))
+
+    parts: list[str] = []
+    spans: list[tuple[int, int]] = []
+    position = 0
+    for page in range(page_count):
+        start = position + 1 if parts else 0
+        page_file = _page_file(cache_dir, page)
+        if not page_file.exists():
+            spans.append((start, start))
+            continue
+        part = text_store.read_text(page_file)
+        parts.append(part)
+        spans.append((start, start + len(part)))
+        position = start + len(part)
+    joined = "\n".join(parts)
+    text = joined.strip()
+    lead = len(joined) - len(joined.lstrip())
+    offsets = [
+        [min(max(start - lead, 0), len(text)), min(max(end - lead, 0), len(text))] for start, end in spans
+    ]
+    tmp_index = index_path.with_suffix(".tmp")
+    tmp_index.write_text(json.dumps({"pages": offsets}), encoding="utf-8")
+    os.replace(tmp_index, index_path)
+    return text
+
+
+@lru_cache(maxsize=256)
+def _page_starts(index_path: str, mtime_ns: int) -> list[int]:
+    pages = json.loads(Path(index_path).read_text(encoding="utf-8"))["pages"]
+    return [start for start, _ in pages]
+
+
+def page_number(text_path: Path, offset: int) -> Optional[int]:
+    """1-based page containing character ``offset`` of an extracted PDF, or ``None`` without a page index."""
+    _, index_path = page_cache_paths(text_path)
+    try:
+        starts = _page_starts(str(index_path), index_path.stat().st_mtime_ns)
+    except (OSError, ValueError, KeyError):
+        return None
+    if not starts:
+        return None
+    return max(bisect.bisect_right(starts, offset), 1)
+
+
+def remove_page_cache(text_path: Path) -> None:
+    cache_dir, index_path = page_cache_paths(text_path)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    index_path.unlink(missing_ok=True)
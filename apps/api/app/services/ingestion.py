@@ -0,0 +1,194 @@
+"""Background ingestion pipeline for uploaded sources.
+
+Uploads are persisted with ``status="queued"`` and handed to a bounded thread
+pool. Each job moves its source through ``queued -> extracting -> embedding ->
+ready`` (or ``failed``), committing every transition so clients can poll
+``GET /sources/{id}``. Search passages are committed together with ``ready``,
+and a source deleted mid-job leaves neither passages nor vectors behind. PDF
+parsing is CPU-bound and runs in a separate process pool so it neither holds
+the GIL nor blocks other jobs.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import DATA_DIR, SessionLocal
+from . import blob_store, search_index, text_store
+from .content_cache import content_cache
+from .embedding_store import embedding_store
+from .extractors import extract_pdf_pages, extract_text_from_path
+
+INGEST_WORKERS = int(os.getenv("INSIGHTFLOW_INGEST_WORKERS", "2"))
+PDF_WORKERS = int(os.getenv("INSIGHTFLOW_PDF_WORKERS", str(os.cpu_count() or 1)))
+STAGES = ("queued", "extracting", "embedding")
+PENDING_STATUSES = STAGES
+
+
+class IngestionQueue:
+    """Runs extraction and embedding for queued sources and tracks per-stage timings."""
+
+    def __init__(self, workers: int = INGEST_WORKERS, pdf_workers: int = PDF_WORKERS):
+        self.workers = workers
+        self.pdf_workers = pdf_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pdf_executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._active = {stage: 0 for stage in STAGES}
+        self._timings = {stage: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0} for stage in STAGES}
+        self._completed = 0
+        self._failed = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest")
+            return self._executor
+
+    def pdf_pool(self) -> ProcessPoolExecutor:
+        """Process pool for PDF page extraction, shared with batch uploads."""
+        with self._lock:
+            if self._pdf_executor is None:
+                self._pdf_executor = ProcessPoolExecutor(max_workers=self.pdf_workers)
+            return self._pdf_executor
+
+    def submit(self, source_id: str) -> Future:
+        with self._lock:
+            self._active["queued"] += 1
+        return self._pool().submit(self._run, source_id, time.perf_counter())
+
+    def resume(self, sources: Iterable[models.Source]) -> int:
+        """Re-queue sources left unfinished by a previous process; returns how many."""
+        pending = [source.id for source in sources if source.status in PENDING_STATUSES]
+        for source_id in pending:
+            self.submit(source_id)
+        return len(pending)
+
+    def shutdown(self) -> None:
+        """Finish in-flight jobs and drop queued ones; their rows stay queued and resume on restart."""
+        with self._lock:
+            executor, pdf_executor = self._executor, self._pdf_executor
+            self._executor = self._pdf_executor = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if pdf_executor is not None:
+            pdf_executor.shutdown(wait=True, cancel_futures=True)
+
+    def _record(self, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        elapsed = now - started
+        with self._lock:
+            self._active[stage] -= 1
+            timing = self._timings[stage]
+            timing["count"] += 1
+            timing["total_seconds"] += elapsed
+            timing["max_seconds"] = max(timing["max_seconds"], elapsed)
+        return now
+
+    def _enter(self, db: Session, source: models.Source, stage: str) -> None:
+        with self._lock:
+            self._active[stage] += 1
+        source.status = stage
+        db.commit()
+
+    def _run(self, source_id: str, enqueued: float) -> None:
+        stage = "queued"
+        started = enqueued
+        project_id: Optional[str] = None
+        content_ptr: Optional[str] = None
+        embedded = False
+        with SessionLocal() as db, blob_store.Claim() as claim:
+            try:
+                source = db.get(models.Source, source_id)
+                started = self._record(stage, started)
+                if source is None:
+                    # Deleted while waiting in the queue.
+                    return
+                project_id, content_ptr = source.project_id, source.content_ptr
+                stage = "extracting"
+                self._enter(db, source, stage)
+                text = self._extract(source, claim)
+                started = self._record(stage, started)
+
+                # Deleted while extracting: nothing may be indexed for it.
+                source = db.get(models.Source, source_id, populate_existing=True)
+                if source is None:
+                    blob_store.discard(db, [content_ptr], claim)
+                    return
+                stage = "embedding"
+                self._enter(db, source, stage)
+                embedding_store.upsert(source)
+                embedded = True
+                # Passages land in the same commit as "ready"; if the source
+                # was deleted meanwhile that commit fails and takes them back.
+                search_index.index_source(db, source, text)
+                source.status = "ready"
+                db.commit()
+                started = self._record(stage, started)
+                stage = ""
+                with self._lock:
+                    self._completed += 1
+            except Exception as exc:  # noqa: BLE001 - any failure marks the source as failed
+                if stage:
+                    self._record(stage, started)
+                db.rollback()
+                if embedded:
+                    embedding_store.remove(project_id, source_id)
+                source = db.get(models.Source, source_id)
+                if source is not None:
+                    source.status = "failed"
+                    source.error = str(exc) or exc.__class__.__name__
+                    db.commit()
+                elif content_ptr is not None:
+                    blob_store.discard(db, [content_ptr], claim)
+                with self._lock:
+                    self._failed += 1
+
+    def _extract(self, source: models.Source, claim: blob_store.Claim) -> str:
+        """Extracted text for ``source``, reusing a shared text file when its content was seen before."""
+        text_path = Path(DATA_DIR.parent, source.content_ptr)
+        if text_path.exists():
+            return text_store.read_text(text_path)
+        raw_path = Path(DATA_DIR.parent, source.uri)
+        if raw_path.suffix.lower() == ".pdf":
+            # Page ranges fan out over the process pool; only paths cross the
+            # process boundary and each worker reads the file itself.
+            text = extract_pdf_pages(raw_path, text_path, self.pdf_pool())
+        else:
+            text = extract_text_from_path(raw_path)
+        blob_store.write_text(source.content_ptr, text or "", claim)
+        if source.content_hash:
+            content_cache.remember_text(source.content_hash, source.content_ptr)
+        return text or ""
+
+    def stats(self) -> dict:
+        with self._lock:
+            stages = {
+                stage: {
+                    "active": self._active[stage],
+                    "count": timing["count"],
+                    "total_seconds": round(timing["total_seconds"], 6),
+                    "avg_seconds": round(timing["total_seconds"] / timing["count"], 6) if timing["count"] else 0.0,
+                    "max_seconds": round(timing["max_seconds"], 6),
+                }
+                for stage, timing in self._timings.items()
+            }
+            return {
+                "workers": self.workers,
+                "pdf_workers": self.pdf_workers,
+                "depth": self._active["queued"],
+                "in_flight": self._active["extracting"] + self._active["embedding"],
+                "completed": self._completed,
+                "failed": self._failed,
+                "stages": stages,
+            }
+
+
+ingestion_queue = IngestionQueue()
@@ -1,76 +1,264 @@
+"""Offline theme engine: clusters a project's passages and quotes the sentences nearest each cluster.
+
+A run works in two steps. :func:`analyze_source` reads one source and keeps
+its term counts (cached by :mod:`.source_analysis`). :func:`generate_payload`
+then takes the project's chunk embeddings from the :mod:`.embedding_store`
+partition, clusters them with mini-batch k-means and turns every cluster into
+a theme:
+
+- the title and summary come from the cluster's most distinctive terms, the
+  source term counts weighted by how much of each source fell in the cluster;
+- claims are the sentences of the :mod:`.sentence_index` nearest the
+  centroid, one per source, each cited with its own offsets plus the closest
+  sentence of another source;
+- confidence grows with the cluster's coherence (the length of its mean unit
+  vector) and its size relative to the largest cluster.
+
+Everything is NumPy on the CPU and deterministic for a given project.
+"""
+import math
+import os
+import re
 import uuid
-from itertools import cycle
-from typing import Iterable, List
+from collections import Counter
+from typing import Callable, Iterable, List, Optional, Sequence
+
+import numpy as np
 
 from .. import models
+from .embedding_store import _text_from_source, chunk_spans, embed_texts, embedding_store
+from .sentence_index import location, sentence_store, sentence_text
+from .vector_index import assign, minibatch_kmeans
+
+MAX_THEMES = int(os.getenv("INSIGHTFLOW_MAX_THEMES", "8"))
+CLAIMS_PER_THEME = 3
+CITATIONS_PER_CLAIM = 2
+TERMS_PER_SOURCE = 64
+TITLE_TERMS = 3
+SUMMARY_TERMS = 6
+# Bump when ``analyze_source`` output changes so cached analyses are recomputed.
+ANALYZER = "cluster-2"
+
+_TERM_PATTERN = re.compile(r"[a-z][a-z'-]{2,}")
+_STOPWORDS = frozenset(
+    """
+    about above after again against all also among and any are aren't because been before being below between
+    both but can cannot could did didn't does doesn't doing don't down during each either else ever every few
+    for from further had has have having her here hers him his how however into its itself just least less
+    like made make many may more most much must near need neither never not now off often once only other
+    our ours out over own per rather same she should since some such than that the their theirs them then
+    there these they this those though through thus too under until upon very via was wasn't way were what
+    when where whether which while who whom whose why will with within without would yet you your yours
+    one two three across using used use new get got well still even
+    """.split()
+)
+
+
+def analyze_source(source: models.Source) -> dict:
+    """Top term counts of one source's text, used to label the clusters it falls in."""
+    text = _text_from_source(source)
+    terms = Counter(term for term in _TERM_PATTERN.findall(text.lower()) if term not in _STOPWORDS)
+    return {"terms": dict(terms.most_common(TERMS_PER_SOURCE))}
+
+
+def _unit(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+
+def _chunk_vectors(project_id: str, sources: List[models.Source]) -> tuple[np.ndarray, np.ndarray]:
+    """``(owners, vectors)`` of every chunk, embedding sources missing from the index on the fly."""
+    owners, _, vectors = embedding_store.source_vectors(project_id, [source.id for source in sources])
+    missing = np.setdiff1d(np.arange(len(sources)), owners)
+    if len(missing):
+        extra_owners: list[int] = []
+        passages: list[str] = []
+        for position in missing.tolist():
+            text = _text_from_source(sources[position])
+            for start, end in chunk_spans(text).tolist():
+                extra_owners.append(position)
+                passages.append(text[start:end])
+        owners = np.concatenate([owners, np.asarray(extra_owners, dtype=owners.dtype)])
+        vectors = np.concatenate([vectors, embed_texts(passages)])
+    return owners, vectors
+
+
+def _label_terms(weights: np.ndarray, analyses: List[dict]) -> list[list[str]]:
+    """Most distinctive terms per cluster: ``p(t|c) * log(p(t|c) / p(t))`` over weighted term counts."""
+    vocabulary: dict[str, int] = {}
+    owner_ids: list[int] = []
+    term_ids: list[int] = []
+    counts: list[float] = []
+    for position, analysis in enumerate(analyses):
+        for term, count in analysis["terms"].items():
+            owner_ids.append(position)
+            term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+    if not vocabulary:
+        return [[] for _ in range(len(weights))]
+    owner_array = np.asarray(owner_ids)
+    term_array = np.asarray(term_ids)
+    count_array = np.asarray(counts, dtype=np.float64)
+    cluster_terms = np.stack(
+        [
+            np.bincount(term_array, weights=weights[cluster, owner_array] * count_array, minlength=len(vocabulary))
+            for cluster in range(len(weights))
+        ]
+    )
+    overall = cluster_terms.sum(axis=0)
+    overall /= overall.sum()
+    totals = cluster_terms.sum(axis=1, keepdims=True)
+    within = np.divide(cluster_terms, totals, out=np.zeros_like(cluster_terms), where=totals > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.where(within > 0, within * np.log(within / overall), -np.inf)
+    words = list(vocabulary)
+    labels: list[list[str]] = []
+    for row in scores:
+        top = np.argsort(-row, kind="stable")[:SUMMARY_TERMS]
+        labels.append([words[index] for index in top.tolist() if np.isfinite(row[index])])
+    return labels
+
+
+def _title(terms: Sequence[str], fallback: str) -> str:
+    picked = list(terms[:TITLE_TERMS])
+    if not picked:
+        return fallback
+    phrase = picked[0] if len(picked) == 1 else f"{', '.join(picked[:-1])} and {picked[-1]}"
+    return phrase[:1].upper() + phrase[1:]
 
 
-def generate_mock_payload(project: models.Project, sources: Iterable[models.Source]) -> dict:
+def generate_payload(
+    project: models.Project,
+    sources: Iterable[models.Source],
+    progress: Optional[Callable[[int, int], None]] = None,
+    analyses: Optional[dict[str, dict]] = None,
+) -> dict:
+    """Cluster the project's passages into themes with claims and citations.
+
+    ``analyses`` maps source ids to :func:`analyze_source` results computed
+    earlier; other sources are analysed here, calling ``progress(done, total)``
+    after each one.
+    """
     source_list: List[models.Source] = list(sources)
-    source_cycle = cycle(source_list) if source_list else None
-
-    theme_templates = [
-        {
-            "title": "Adoption momentum is building",
-            "summary": "Teams expand pilots into production while engagement metrics trend upward.",
-            "confidence": 0.82,
-            "claims": [
-                "Expansion teams increased license counts across three regions.",
-                "Usage sessions climbed 35% quarter-over-quarter for early adopters.",
-                "Customer champions cite faster onboarding and clearer dashboards.",
-            ],
-        },
-        {
-            "title": "Enablement friction remains a risk",
-            "summary": "Operational gaps slow wider rollout and require enablement focus.",
-            "confidence": 0.74,
-            "claims": [
-                "Implementation playbooks differ between regions, creating delays.",
-                "Data integrations still rely on manual exports for weekly reporting.",
-                "Executives want clearer ROI visualization before scaling budget.",
-            ],
-        },
-    ]
-
-    themes_payload: list[dict] = []
-    for theme_template in theme_templates:
-        theme_id = str(uuid.uuid4())
-        claims_payload: list[dict] = []
-
-        for claim_text in theme_template["claims"]:
-            claim_confidence = max(theme_template["confidence"] - 0.08, 0.5)
-            citations_payload = []
-
-            # attach up to two supporting sources per claim
-            if source_cycle is not None:
-                for _ in range(min(2, len(source_list))):
-                    source = next(source_cycle)
-                    citations_payload.append(
+    analyses = dict(analyses or {})
+    pending = [source for source in source_list if source.id not in analyses]
+    for done, source in enumerate(pending, start=1):
+        analyses[source.id] = analyze_source(source)
+        if progress is not None:
+            progress(done, len(pending))
+    if not source_list:
+        return {"themes": []}
+    source_analyses = [analyses[source.id] for source in source_list]
+
+    owners, vectors = _chunk_vectors(project.id, source_list)
+    if not len(vectors):
+        return {"themes": []}
+    # Hashed embeddings are all-positive; centring spreads them out so
+    # clusters follow what separates passages rather than what they share.
+    mean = vectors.mean(axis=0)
+    vectors = _unit(vectors - mean)
+    clusters = max(1, min(MAX_THEMES, len(source_list), math.ceil(math.sqrt(len(vectors) / 2))))
+    centroids = _unit(minibatch_kmeans(vectors, clusters, seed=0))
+    labels = assign(vectors, centroids)
+    sizes = np.bincount(labels, minlength=len(centroids))
+    sums = np.zeros_like(centroids, dtype=np.float64)
+    np.add.at(sums, labels, vectors)
+    means = sums / np.maximum(sizes, 1)[:, None]
+    # Mean cosine of a cluster's unit vectors to their normalised mean.
+    coherence = np.linalg.norm(means, axis=1)
+    centroids = _unit(means).astype(np.float32)
+
+    # Share of each source's chunks that landed in each cluster.
+    weights = np.zeros((len(centroids), len(source_list)), dtype=np.float64)
+    np.add.at(weights, (labels, owners), 1.0)
+    weights /= np.maximum(weights.sum(axis=0, keepdims=True), 1.0)
+    terms = _label_terms(weights, source_analyses)
+
+    # Claims come from the project's sentence index, placed in the same centred space as the chunks.
+    with sentence_store.sync(project.id, source_list) as sentences:
+        sentence_owners, sentence_spans, raw_sentences = sentences.rows([source.id for source in source_list])
+        sentence_vectors = _unit(raw_sentences - mean).astype(np.float32)
+        sentence_clusters = (
+            assign(sentence_vectors, centroids) if len(sentence_vectors) else np.zeros(0, dtype=np.int64)
+        )
+
+        largest = max(int(sizes.max()), 1)
+        themes_payload: list[dict] = []
+        chosen: list[tuple[dict, int]] = []
+        for cluster in np.argsort(-sizes, kind="stable").tolist():
+            if not sizes[cluster]:
+                continue
+            size_factor = 0.5 + 0.5 * sizes[cluster] / largest
+            confidence = round(float(coherence[cluster] * size_factor), 2)
+            members = np.flatnonzero(sentence_clusters == cluster)
+            sims = sentence_vectors[members] @ centroids[cluster]
+            ranked = members[np.argsort(-sims, kind="stable")]
+
+            claims_payload: list[dict] = []
+            used_sources: set[int] = set()
+            used_statements: set[str] = set()
+            for index in ranked.tolist():
+                owner = int(sentence_owners[index])
+                if owner in used_sources:
+                    continue
+                source = source_list[owner]
+                start, end = (int(value) for value in sentence_spans[index])
+                statement = sentence_text(source, start, end)
+                # Copies of one document in a project would otherwise repeat a claim.
+                if not statement or statement.lower() in used_statements:
+                    continue
+                used_sources.add(owner)
+                used_statements.add(statement.lower())
+                claim = {
+                    "id": str(uuid.uuid4()),
+                    "statement": statement,
+                    "confidence": round(float(max(sentence_vectors[index] @ centroids[cluster], 0.0) * size_factor), 2),
+                    "citations": [
                         {
                             "id": str(uuid.uuid4()),
                             "source_id": source.id,
-                            "quote": f"{source.title or source.kind} reference supporting “{claim_text[:40]}...”",
-                            "location": source.uri,
+                            "quote": statement,
+                            "location": location(source, start, end),
                         }
-                    )
+                    ],
+                }
+                claims_payload.append(claim)
+                chosen.append((claim, index))
+                if len(claims_payload) == CLAIMS_PER_THEME:
+                    break
 
-            claims_payload.append(
+            cluster_sources = int(np.count_nonzero(weights[cluster]))
+            summary = f"{cluster_sources} sources, {int(sizes[cluster])} passages"
+            if terms[cluster]:
+                summary += f"; distinctive terms: {', '.join(terms[cluster])}"
+            themes_payload.append(
                 {
                     "id": str(uuid.uuid4()),
-                    "statement": claim_text,
-                    "confidence": claim_confidence,
-                    "citations": citations_payload,
+                    "title": _title(terms[cluster], f"Theme {len(themes_payload) + 1}"),
+                    "summary": f"{summary}.",
+                    "confidence": confidence,
+                    "claims": claims_payload,
                 }
             )
 
-        themes_payload.append(
-            {
-                "id": theme_id,
-                "title": theme_template["title"],
-                "summary": theme_template["summary"],
-                "confidence": theme_template["confidence"],
-                "claims": claims_payload,
-            }
-        )
+        # Best sentences of other sources back each claim up, every claim scored in one matrix multiply.
+        if chosen and CITATIONS_PER_CLAIM > 1:
+            by_id = {source.id: source for source in source_list}
+            support = sentences.search(
+                raw_sentences[[index for _, index in chosen]],
+                CITATIONS_PER_CLAIM - 1,
+                exclude=[claim["citations"][0]["source_id"] for claim, _ in chosen],
+            )
+            for (claim, _), matches in zip(chosen, support):
+                for source_id, start, end, _ in matches:
+                    source = by_id[source_id]
+                    claim["citations"].append(
+                        {
+                            "id": str(uuid.uuid4()),
+                            "source_id": source_id,
+                            "quote": sentence_text(source, start, end),
+                            "location": location(source, start, end),
+                        }
+                    )
 
     return {"themes": themes_payload}
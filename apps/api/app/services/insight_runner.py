@@ -0,0 +1,160 @@
+"""Background execution of insight runs.
+
+``POST /insight-runs`` records a run with ``status="pending"`` and hands it to
+a bounded thread pool sized by ``INSIGHTFLOW_RUN_WORKERS``. A worker moves the
+run to ``processing`` and through the stages ``collecting -> generating ->
+saving``, persisting the stage and the number of sources processed so that
+``GET /insight-runs/{id}/events`` can stream progress from any API process.
+The run ends ``completed`` or ``failed`` (with ``error``).
+
+Per-source analyses are reused from :mod:`.source_analysis` for sources whose
+content has been analysed before, so only new or changed sources are
+processed; the run records how many were reused and recomputed.
+
+Every result row is written in the run's final transaction, so a run cut off
+by a restart has left nothing behind and is simply executed again.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal
+from . import source_analysis
+from .insight_engine import generate_payload
+from .run_results import save_run_results
+
+RUN_WORKERS = int(os.getenv("INSIGHTFLOW_RUN_WORKERS", "2"))
+# Progress is committed at most this often while sources are processed.
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("INSIGHTFLOW_RUN_PROGRESS_SECONDS", "0.5"))
+STAGES = ("collecting", "generating", "saving")
+PENDING_STATUSES = ("pending", "processing")
+FINISHED_STATUSES = ("completed", "failed")
+
+
+def progress_event(run: models.InsightRun) -> dict:
+    """Snapshot of a run's progress, with an ETA extrapolated from the sources processed so far."""
+    total = run.sources_total or 0
+    done = run.sources_processed or 0
+    eta: Optional[float] = None
+    if run.stage == "generating" and run.started_at and 0 < done < total:
+        elapsed = (datetime.utcnow() - run.started_at.replace(tzinfo=None)).total_seconds()
+        eta = round(elapsed / done * (total - done), 1)
+    elif run.status in FINISHED_STATUSES:
+        eta = 0.0
+    return {
+        "id": run.id,
+        "status": run.status,
+        "stage": run.stage,
+        "sources_total": total,
+        "sources_processed": done,
+        "eta_seconds": eta,
+        "error": run.error,
+    }
+
+
+class InsightRunner:
+    """Executes pending insight runs on a bounded thread pool."""
+
+    def __init__(self, workers: int = RUN_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="insight-run")
+            return self._executor
+
+    def submit(self, run_id: str) -> Future:
+        return self._pool().submit(self._run, run_id)
+
+    def resume(self, runs: Iterable[models.InsightRun]) -> int:
+        """Re-queue runs left pending or half-done by a previous process; returns how many."""
+        pending = [run.id for run in runs if run.status in PENDING_STATUSES]
+        for run_id in pending:
+            self.submit(run_id)
+        return len(pending)
+
+    def shutdown(self) -> None:
+        """Finish in-flight runs and drop queued ones; their rows stay pending and resume on restart."""
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _stage(self, db: Session, run: models.InsightRun, stage: str) -> None:
+        run.stage = stage
+        db.commit()
+
+    def _run(self, run_id: str) -> None:
+        # Stage and progress commits must not expire the loaded sources: each
+        # would be reloaded one query at a time by the analysis that follows.
+        with SessionLocal(expire_on_commit=False) as db:
+            try:
+                run = db.get(models.InsightRun, run_id)
+                if run is None or run.status not in PENDING_STATUSES:
+                    # Deleted or already finished while waiting in the queue.
+                    return
+                run.status = "processing"
+                run.started_at = datetime.utcnow()
+                run.finished_at = None
+                run.error = None
+                self._stage(db, run, "collecting")
+
+                # Sources still queued, extracting or failed have no text to analyse yet.
+                sources = list(
+                    db.scalars(
+                        select(models.Source)
+                        .where(models.Source.project_id == run.project_id, models.Source.status == "ready")
+                        .order_by(models.Source.created_at.asc())
+                    )
+                )
+                run.sources_total = len(sources)
+                run.sources_processed = 0
+                run.sources_reused = run.sources_recomputed = None
+                self._stage(db, run, "generating")
+
+                last_commit = time.monotonic()
+
+                def progress(done: int, total: int) -> None:
+                    nonlocal last_commit
+                    run.sources_processed = done
+                    now = time.monotonic()
+                    if done == total or now - last_commit >= PROGRESS_INTERVAL_SECONDS:
+                        db.commit()
+                        last_commit = now
+
+                analyses, run.sources_reused, run.sources_recomputed = source_analysis.load_or_analyze(
+                    db, sources, progress
+                )
+                payload_data = generate_payload(run.project, sources, analyses=analyses)
+
+                self._stage(db, run, "saving")
+                save_run_results(db, run, payload_data)
+                source_analysis.prune(db)
+                run.status = "completed"
+                run.stage = None
+                run.finished_at = datetime.utcnow()
+                db.commit()
+            except Exception as exc:  # noqa: BLE001 - any failure marks the run as failed
+                db.rollback()
+                run = db.get(models.InsightRun, run_id)
+                if run is not None:
+                    run.status = "failed"
+                    run.error = str(exc) or exc.__class__.__name__
+                    run.finished_at = datetime.utcnow()
+                    db.commit()
+
+
+insight_runner = InsightRunner()
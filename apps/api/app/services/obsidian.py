@@ -0,0 +1,339 @@
+"""Incremental Obsidian vault sync driven by a per-vault manifest.
+
+Every synced note has a ``vault_notes`` row holding the ``(mtime, size,
+content hash)`` its source was built from. A sync walks the vault once with
+``os.scandir`` and compares stat results against the manifest, so unchanged
+notes are never opened; only notes whose stat changed are read and hashed,
+and only notes whose hash changed are re-extracted, re-indexed and re-embedded.
+Notes gone from disk have their sources removed.
+"""
+from __future__ import annotations
+
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import DATA_DIR
+from . import blob_store, search_index
+from .content_cache import content_cache, content_hash
+from .embedding_store import embedding_store
+
+NOTE_SUFFIX = ".md"
+VAULT_IO_WORKERS = int(os.getenv("INSIGHTFLOW_VAULT_IO_WORKERS", "8"))
+
+
+@dataclass
+class SyncResult:
+    added: list[models.Source] = field(default_factory=list)
+    modified: list[models.Source] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: int = 0
+
+
+def resolve_vault(base_path: Optional[str], folder: str) -> tuple[Path, Path]:
+    """``(vault root, folder to import)``; raises ``ValueError`` for folders outside the root or missing."""
+    base_dir = Path(base_path or (DATA_DIR / "obsidian"))
+    import_dir = (base_dir / folder).resolve()
+    try:
+        base_dir_resolved = base_dir.resolve()
+    except FileNotFoundError:
+        base_dir.mkdir(parents=True, exist_ok=True)
+        base_dir_resolved = base_dir.resolve()
+    if import_dir != base_dir_resolved and base_dir_resolved not in import_dir.parents:
+        raise ValueError("Import folder must live within the configured Obsidian root")
+    if not import_dir.is_dir():
+        raise ValueError("Folder not found for Obsidian import")
+    return base_dir, import_dir
+
+
+def scan_notes(root: Path) -> Iterator[tuple[str, os.stat_result]]:
+    """Yield ``(path relative to root, stat)`` for every note, skipping hidden folders such as ``.obsidian``.
+
+    ``DirEntry.stat`` reuses what the directory listing already returned where
+    the platform allows, so no note is opened.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    stack.append(Path(entry.path))
+                elif entry.name.endswith(NOTE_SUFFIX) and entry.is_file():
+                    yield Path(entry.path).relative_to(root).as_posix(), entry.stat()
+
+
+def _read(path: Path) -> tuple[bytes, str]:
+    raw = path.read_bytes()
+    return raw, content_hash(raw)
+
+
+def _snapshot(db: Session, digest: str, text: str, claim: blob_store.Claim) -> str:
+    """Pointer to the note's text snapshot, writing the blob unless identical content is already stored."""
+    text_ptr = content_cache.text_pointer(db, digest) or blob_store.text_pointer(digest)
+    blob_store.write_text(text_ptr, text, claim)
+    content_cache.remember_text(digest, text_ptr)
+    return text_ptr
+
+
+def sync_vault(
+    db: Session, project_id: str, base_dir: Path, import_dir: Path, claim: blob_store.Claim
+) -> SyncResult:
+    """Bring the project's sources for ``import_dir`` in line with the notes on disk.
+
+    Text snapshots are held in ``claim``; release it once this returns.
+    """
+    vault = str(import_dir)
+    result = SyncResult()
+    scanned = {path: stat for path, stat in scan_notes(import_dir)}
+    manifest = {
+        row.path: row
+        for row in db.execute(
+            select(
+                models.VaultNote.id,
+                models.VaultNote.path,
+                models.VaultNote.mtime_ns,
+                models.VaultNote.size,
+                models.VaultNote.content_hash,
+                models.VaultNote.source_id,
+            ).where(models.VaultNote.project_id == project_id, models.VaultNote.vault == vault)
+        )
+    }
+
+    def uri_for(path: str) -> str:
+        return str(Path("obsidian") / (import_dir / path).relative_to(base_dir.resolve()))
+
+    changed = []
+    for path, stat in scanned.items():
+        row = manifest.get(path)
+        if row is not None and row.mtime_ns == stat.st_mtime_ns and row.size == stat.st_size:
+            result.unchanged += 1
+        else:
+            changed.append(path)
+    removed = [row for path, row in manifest.items() if path not in scanned]
+
+    # Sources imported before the manifest existed are adopted by their uri.
+    unlisted = {uri_for(path): path for path in changed if path not in manifest}
+    adopted: dict[str, str] = {}
+    if unlisted:
+        for source_id, uri in db.execute(
+            select(models.Source.id, models.Source.uri).where(
+                models.Source.project_id == project_id,
+                models.Source.kind == "obsidian",
+                models.Source.uri.in_(list(unlisted)),
+            )
+        ):
+            adopted[unlisted[uri]] = source_id
+
+    with ThreadPoolExecutor(max_workers=VAULT_IO_WORKERS, thread_name_prefix="vault-read") as pool:
+        contents = dict(zip(changed, pool.map(lambda path: _read(import_dir / path), changed)))
+
+    touched: list[dict] = []
+    new_rows: list[dict] = []
+    new_manifest: list[dict] = []
+    to_update: dict[str, tuple[str, bytes, str]] = {}
+    texts: dict[str, str] = {}
+    freed: list[str] = []
+    now = datetime.utcnow()
+    for path in changed:
+        raw, digest = contents[path]
+        stat = scanned[path]
+        state = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "content_hash": digest}
+        row = manifest.get(path)
+        if row is not None:
+            touched.append({"id": row.id, **state})
+            if digest == row.content_hash:
+                result.unchanged += 1
+            else:
+                to_update[row.source_id] = (path, raw, digest)
+            continue
+        note = {"project_id": project_id, "vault": vault, "path": path, **state}
+        if path in adopted:
+            new_manifest.append({**note, "source_id": adopted[path]})
+            to_update[adopted[path]] = (path, raw, digest)
+            continue
+        source_id = str(uuid.uuid4())
+        texts[source_id] = raw.decode("utf-8", errors="ignore")
+        new_rows.append(
+            {
+                "id": source_id,
+                "project_id": project_id,
+                "kind": "obsidian",
+                "uri": uri_for(path),
+                "title": Path(path).stem,
+                "tags": [],
+                "content_ptr": _snapshot(db, digest, texts[source_id], claim),
+                "content_hash": digest,
+                "status": "ready",
+                "error": None,
+                "created_at": now,
+            }
+        )
+        new_manifest.append({**note, "source_id": source_id})
+
+    if to_update:
+        # Snapshots (and their claims) first: claims commit on their own
+        # connection, which must not wait on this session's writes.
+        snapshots: list[tuple[models.Source, str, str]] = []
+        for source in db.scalars(select(models.Source).where(models.Source.id.in_(list(to_update)))):
+            path, raw, digest = to_update[source.id]
+            if source.content_hash == digest:
+                # An adopted source that already matches the note only needs its manifest row.
+                result.unchanged += 1
+                continue
+            texts[source.id] = raw.decode("utf-8", errors="ignore")
+            snapshots.append((source, digest, _snapshot(db, digest, texts[source.id], claim)))
+        for source, digest, text_ptr in snapshots:
+            blob_store.acquire(db, [text_ptr])
+            freed += blob_store.release(db, [source.content_ptr])
+            source.content_ptr = text_ptr
+            source.content_hash = digest
+            result.modified.append(source)
+
+    if new_rows:
+        db.execute(insert(models.Source), new_rows)
+        blob_store.acquire(db, [row["content_ptr"] for row in new_rows])
+        result.added = list(
+            db.scalars(select(models.Source).where(models.Source.id.in_([row["id"] for row in new_rows])))
+        )
+    if new_manifest:
+        db.execute(insert(models.VaultNote), new_manifest)
+    if touched:
+        db.execute(update(models.VaultNote), touched)
+
+    if removed:
+        removed_ids = {row.source_id for row in removed}
+        db.execute(delete(models.VaultNote).where(models.VaultNote.id.in_([row.id for row in removed])))
+        for source in db.scalars(select(models.Source).where(models.Source.id.in_(removed_ids))):
+            freed += blob_store.release(db, [source.content_ptr])
+            db.delete(source)
+        search_index.remove(db, removed_ids)
+        result.removed = sorted(removed_ids)
+
+    search_index.remove(db, [source.id for source in result.modified])
+    search_index.index_new_sources(db, [(source, texts[source.id]) for source in result.modified + result.added])
+    db.commit()
+    # Snapshots this sync dropped may have been claimed meanwhile; only unreferenced ones go.
+    blob_store.purge_unreferenced(db, freed)
+
+    embedding_store.upsert_many(result.modified + result.added)
+    for source_id in result.removed:
+        embedding_store.remove(project_id, source_id)
+    return result
+
+
+def import_notes(
+    db: Session, project_id: str, base_dir: Path, import_dir: Path, limit: int, claim: blob_store.Claim
+) -> tuple[list[models.Source], dict[str, float]]:
+    """Import up to ``limit`` notes not yet in the project; returns the new sources and per-stage seconds.
+
+    Each note is read once on a thread pool; text snapshots missing from the
+    blob store are written on the same pool, every row goes in with one bulk insert and the
+    notes are embedded as one batch. Manifest rows are recorded as well, so a
+    later :func:`sync_vault` does not re-read what was imported here. Text
+    snapshots are held in ``claim``; release it once this returns.
+    """
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal started
+        now = time.perf_counter()
+        timings[stage] = now - started
+        started = now
+
+    existing_uris = set(db.scalars(select(models.Source.uri).where(models.Source.project_id == project_id)))
+    base_resolved = base_dir.resolve()
+    notes = []
+    stats = []
+    for relative, stat in sorted(scan_notes(import_dir))[:limit]:
+        path = import_dir / relative
+        uri = str(Path("obsidian") / path.relative_to(base_resolved))
+        if uri not in existing_uris:
+            notes.append((path, uri, str(uuid.uuid4())))
+            stats.append(stat)
+    lap("scan")
+
+    with ThreadPoolExecutor(max_workers=VAULT_IO_WORKERS, thread_name_prefix="vault-io") as pool:
+        contents = list(pool.map(lambda note: _read(note[0]), notes))
+        lap("read")
+
+        texts = {
+            source_id: raw.decode("utf-8", errors="ignore") for (_, _, source_id), (raw, _) in zip(notes, contents)
+        }
+        pointers = content_cache.text_pointers(db, {digest for _, digest in contents})
+        writes: dict[str, str] = {}
+        text_ptrs: list[str] = []
+        for (_, _, source_id), (_, digest) in zip(notes, contents):
+            text_ptr = pointers.get(digest)
+            if text_ptr is None:
+                # Later notes with the same bytes share this snapshot.
+                text_ptr = pointers[digest] = blob_store.text_pointer(digest)
+                writes[text_ptr] = texts[source_id]
+                content_cache.remember_text(digest, text_ptr)
+            text_ptrs.append(text_ptr)
+        claim.add(*text_ptrs)
+        list(pool.map(lambda write: blob_store.write_text(*write), writes.items()))
+        lap("write")
+
+    if notes:
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": source_id,
+                "project_id": project_id,
+                "kind": "obsidian",
+                "uri": uri,
+                "title": path.stem,
+                "tags": [],
+                "content_ptr": text_ptr,
+                "content_hash": digest,
+                "status": "ready",
+                "error": None,
+                "created_at": now,
+            }
+            for (path, uri, source_id), (_, digest), text_ptr in zip(notes, contents, text_ptrs)
+        ]
+        db.execute(insert(models.Source), rows)
+        blob_store.acquire(db, text_ptrs)
+        vault = str(import_dir)
+        db.execute(
+            insert(models.VaultNote),
+            [
+                {
+                    "project_id": project_id,
+                    "vault": vault,
+                    "path": path.relative_to(import_dir).as_posix(),
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "content_hash": digest,
+                    "source_id": source_id,
+                }
+                for (path, _, source_id), (_, digest), stat in zip(notes, contents, stats)
+            ],
+        )
+    imported = list(
+        db.scalars(
+            select(models.Source)
+            .where(models.Source.id.in_([source_id for _, _, source_id in notes]))
+            .order_by(models.Source.uri)
+        )
+    )
+    search_index.index_new_sources(db, [(source, texts[source.id]) for source in imported])
+    db.commit()
+    lap("insert")
+
+    embedding_store.upsert_many(imported)
+    lap("embed")
+    return imported, timings
@@ -0,0 +1,199 @@
+"""Persistence of an insight run's themes, claims and citations.
+
+A run's results arrive as the payload tree stored on ``InsightRun.payload``
+(themes holding claims holding citations, each with its ``id``). They are
+written with one executemany ``INSERT`` per table in the caller's
+transaction instead of one ORM object, and often one flush, per row.
+
+The rows are the source of truth: :func:`load_payload` rebuilds the tree
+from them whenever a run has any, so an edited row is never shadowed by an
+older stored copy. The payload column only duplicates them, and with
+``INSIGHTFLOW_STORE_RUN_PAYLOAD=0`` it is left NULL; run listings use
+:func:`run_summaries`, which never touches it.
+"""
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, literal_column, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from . import search_index
+
+STORE_PAYLOAD = os.getenv("INSIGHTFLOW_STORE_RUN_PAYLOAD", "1").lower() not in ("0", "false", "no")
+
+
+def _rows(run_id: str, payload: dict) -> tuple[list[dict], list[dict], list[dict]]:
+    themes: list[dict] = []
+    claims: list[dict] = []
+    citations: list[dict] = []
+    for theme in payload.get("themes", []):
+        themes.append(
+            {
+                "id": theme["id"],
+                "insight_run_id": run_id,
+                "title": theme["title"],
+                "summary": theme.get("summary"),
+                "confidence": theme.get("confidence", 0.0),
+            }
+        )
+        for claim in theme.get("claims", []):
+            claims.append(
+                {
+                    "id": claim["id"],
+                    "theme_id": theme["id"],
+                    "statement": claim["statement"],
+                    "confidence": claim.get("confidence", 0.0),
+                }
+            )
+            for citation in claim.get("citations", []):
+                if not citation.get("source_id"):
+                    continue
+                citations.append(
+                    {
+                        "id": citation["id"],
+                        "claim_id": claim["id"],
+                        "source_id": citation["source_id"],
+                        "quote": citation.get("quote"),
+                        "location": citation.get("location"),
+                    }
+                )
+    return themes, claims, citations
+
+
+def clear_run_results(db: Session, run: models.InsightRun) -> None:
+    """Delete whatever results ``run`` already has, with their search passages."""
+    theme_ids = list(db.scalars(select(models.Theme.id).where(models.Theme.insight_run_id == run.id)))
+    if not theme_ids:
+        return
+    claim_ids = list(db.scalars(select(models.Claim.id).where(models.Claim.theme_id.in_(theme_ids))))
+    search_index.remove(db, theme_ids + claim_ids)
+    db.execute(delete(models.Citation).where(models.Citation.claim_id.in_(claim_ids)))
+    db.execute(delete(models.Claim).where(models.Claim.id.in_(claim_ids)))
+    db.execute(delete(models.Theme).where(models.Theme.id.in_(theme_ids)))
+
+
+def save_run_results(db: Session, run: models.InsightRun, payload: dict) -> None:
+    """Store ``payload`` as ``run``'s results, replacing any it had, and index them for search.
+
+    ``run`` must have been flushed so its id exists. Citations without a
+    ``source_id`` stay in the stored payload but get no row, so a rebuilt
+    payload lacks them.
+    """
+    clear_run_results(db, run)
+    themes, claims, citations = _rows(run.id, payload)
+    for model, rows in ((models.Theme, themes), (models.Claim, claims), (models.Citation, citations)):
+        if rows:
+            db.execute(insert(model), rows)
+    run.payload = payload if STORE_PAYLOAD else None
+    # The rows bypassed the session; a loaded ``run.themes`` would be stale.
+    db.expire(run, ["themes"])
+    search_index.index_run_payload(db, run.project_id, payload)
+
+
+def load_payload(db: Session, run: models.InsightRun) -> Optional[dict]:
+    """``run``'s payload, rebuilt from its theme, claim and citation rows.
+
+    Rows come back in insertion order (SQLite ``rowid``), which is the order
+    of the payload they were written from. The stored column is only used for
+    a run without rows.
+    """
+    themes = db.execute(
+        select(models.Theme.id, models.Theme.title, models.Theme.summary, models.Theme.confidence)
+        .where(models.Theme.insight_run_id == run.id)
+        .order_by(literal_column("themes.rowid"))
+    ).all()
+    if not themes:
+        if run.payload is not None:
+            return run.payload
+        return {"themes": []} if run.status == "completed" else None
+    claims = db.execute(
+        select(models.Claim.id, models.Claim.theme_id, models.Claim.statement, models.Claim.confidence)
+        .join(models.Theme, models.Claim.theme_id == models.Theme.id)
+        .where(models.Theme.insight_run_id == run.id)
+        .order_by(literal_column("claims.rowid"))
+    ).all()
+    citations = db.execute(
+        select(
+            models.Citation.id,
+            models.Citation.claim_id,
+            models.Citation.source_id,
+            models.Citation.quote,
+            models.Citation.location,
+        )
+        .join(models.Claim, models.Citation.claim_id == models.Claim.id)
+        .join(models.Theme, models.Claim.theme_id == models.Theme.id)
+        .where(models.Theme.insight_run_id == run.id)
+        .order_by(literal_column("citations.rowid"))
+    ).all()
+
+    citations_by_claim: dict[str, list[dict]] = {}
+    for citation in citations:
+        citations_by_claim.setdefault(citation.claim_id, []).append(
+            {
+                "id": citation.id,
+                "source_id": citation.source_id,
+                "quote": citation.quote,
+                "location": citation.location,
+            }
+        )
+    claims_by_theme: dict[str, list[dict]] = {}
+    for claim in claims:
+        claims_by_theme.setdefault(claim.theme_id, []).append(
+            {
+                "id": claim.id,
+                "statement": claim.statement,
+                "confidence": claim.confidence,
+                "citations": citations_by_claim.get(claim.id, []),
+            }
+        )
+    return {
+        "themes": [
+            {
+                "id": theme.id,
+                "title": theme.title,
+                "summary": theme.summary,
+                "confidence": theme.confidence,
+                "claims": claims_by_theme.get(theme.id, []),
+            }
+            for theme in themes
+        ]
+    }
+
+
+def run_summaries(db: Session, project_id: Optional[str] = None) -> list[dict]:
+    """Runs newest first with theme, claim and citation counts, without loading any payload."""
+    theme_count = (
+        select(func.count(models.Theme.id))
+        .where(models.Theme.insight_run_id == models.InsightRun.id)
+        .scalar_subquery()
+    )
+    claim_count = (
+        select(func.count(models.Claim.id))
+        .join(models.Theme, models.Claim.theme_id == models.Theme.id)
+        .where(models.Theme.insight_run_id == models.InsightRun.id)
+        .scalar_subquery()
+    )
+    citation_count = (
+        select(func.count(models.Citation.id))
+        .join(models.Claim, models.Citation.claim_id == models.Claim.id)
+        .join(models.Theme, models.Claim.theme_id == models.Theme.id)
+        .where(models.Theme.insight_run_id == models.InsightRun.id)
+        .scalar_subquery()
+    )
+    query = select(
+        models.InsightRun.id,
+        models.InsightRun.project_id,
+        models.InsightRun.status,
+        models.InsightRun.stage,
+        models.InsightRun.created_at,
+        models.InsightRun.finished_at,
+        theme_count.label("theme_count"),
+        claim_count.label("claim_count"),
+        citation_count.label("citation_count"),
+    ).order_by(models.InsightRun.created_at.desc())
+    if project_id:
+        query = query.where(models.InsightRun.project_id == project_id)
+    return [dict(row._mapping) for row in db.execute(query)]
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, delete, func, insert, or_, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .. import models
+from .embedding_store import _text_from_source, chunk_spans, embedding_store
+
+RRF_K = 60
+SNIPPET_TOKENS = 16
+# Terms found in more than this share of the project's passages carry little
+# BM25 weight but force FTS5 to score nearly every row, so they are left to the
+# vector leg. Terms in fewer passages than the floor are cheap to score and kept.
+MAX_TERM_DOC_RATIO = 0.2
+MIN_PRUNED_TERM_DOCS = 5000
+
+_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        title, body, content='search_passages', content_rowid='id', tokenize='unicode61'
+    )
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_vocab USING fts5vocab(search_fts, 'row')",
+    """
+    CREATE TRIGGER IF NOT EXISTS search_passages_ai AFTER INSERT ON search_passages BEGIN
+        INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_passages_ad AFTER DELETE ON search_passages BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_passages_au AFTER UPDATE ON search_passages BEGIN
+        INSERT INTO search_fts(search_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def ensure_schema(engine: Engine) -> None:
+    """Create the FTS5 mirror of ``search_passages`` and backfill it on first run."""
+    with engine.begin() as conn:
+        for statement in _FTS_DDL:
+            conn.execute(text(statement))
+    with Session(engine) as db:
+        if db.scalar(select(func.count()).select_from(models.SearchPassage)):
+            return
+        for source in db.query(models.Source).all():
+            index_source(db, source)
+        for run in db.query(models.InsightRun).all():
+            index_run(db, run)
+        for decision in db.query(models.Decision).all():
+            index_decision(db, decision)
+        db.commit()
+
+
+def _insert(db: Session, rows: list[dict]) -> None:
+    if rows:
+        db.execute(insert(models.SearchPassage), rows)
+
+
+def remove(db: Session, ref_ids: Iterable[str]) -> None:
+    ids = list(ref_ids)
+    if ids:
+        db.execute(delete(models.SearchPassage).where(models.SearchPassage.ref_id.in_(ids)))
+
+
+def remove_project(db: Session, project_id: str) -> None:
+    db.execute(delete(models.SearchPassage).where(models.SearchPassage.project_id == project_id))
+
+
+def _source_rows(source: models.Source, body: str) -> list[dict]:
+    return [
+        {
+            "project_id": source.project_id,
+            "kind": "source",
+            "ref_id": source.id,
+            "char_start": start,
+            "char_end": end,
+            "title": source.title,
+            "body": body[start:end],
+        }
+        for start, end in chunk_spans(body).tolist()
+    ]
+
+
+def index_source(db: Session, source: models.Source, extracted_text: Optional[str] = None) -> None:
+    """(Re)index a source's extracted text as the same passages the vector index uses."""
+    remove(db, [source.id])
+    body = _text_from_source(source) if extracted_text is None else extracted_text
+    _insert(db, _source_rows(source, body))
+
+
+def index_new_sources(db: Session, sources: Iterable[tuple[models.Source, str]]) -> None:
+    """Index freshly created ``(source, extracted_text)`` pairs with a single passage insert."""
+    _insert(db, [row for source, body in sources for row in _source_rows(source, body)])
+
+
+def retitle_source(db: Session, source: models.Source) -> None:
+    db.execute(
+        update(models.SearchPassage).where(models.SearchPassage.ref_id == source.id).values(title=source.title)
+    )
+
+
+def _run_rows(project_id: str, themes: Iterable[tuple[str, str, Optional[str], Iterable[tuple[str, str]]]]) -> list[dict]:
+    rows: list[dict] = []
+    for theme_id, title, summary, claims in themes:
+        rows.append(
+            {
+                "project_id": project_id,
+                "kind": "theme",
+                "ref_id": theme_id,
+                "title": title,
+                "body": summary or title,
+            }
+        )
+        for claim_id, statement in claims:
+            rows.append(
+                {
+                    "project_id": project_id,
+                    "kind": "claim",
+                    "ref_id": claim_id,
+                    "title": title,
+                    "body": statement,
+                }
+            )
+    return rows
+
+
+def index_run(db: Session, run: models.InsightRun) -> None:
+    rows = _run_rows(
+        run.project_id,
+        (
+            (theme.id, theme.title, theme.summary, ((claim.id, claim.statement) for claim in theme.claims))
+            for theme in run.themes
+        ),
+    )
+    remove(db, [row["ref_id"] for row in rows])
+    _insert(db, rows)
+
+
+def index_run_payload(db: Session, project_id: str, payload: dict) -> None:
+    """Index a run from its payload tree, for results written without ORM objects."""
+    rows = _run_rows(
+        project_id,
+        (
+            (
+                theme["id"],
+                theme["title"],
+                theme.get("summary"),
+                ((claim["id"], claim["statement"]) for claim in theme.get("claims", [])),
+            )
+            for theme in payload.get("themes", [])
+        ),
+    )
+    remove(db, [row["ref_id"] for row in rows])
+    _insert(db, rows)
+
+
+def remove_run(db: Session, run: models.InsightRun) -> None:
+    remove(db, [theme.id for theme in run.themes] + [claim.id for theme in run.themes for claim in theme.claims])
+
+
+def index_decision(db: Session, decision: models.Decision) -> None:
+    remove(db, [decision.id])
+    parts = [decision.rationale, decision.pros, decision.cons, decision.risks]
+    _insert(
+        db,
+        [
+            {
+                "project_id": decision.project_id,
+                "kind": "decision",
+                "ref_id": decision.id,
+                "title": decision.title,
+                "body": "\n".join(part for part in parts if part) or decision.title,
+            }
+        ],
+    )
+
+
+def _match_expression(db: Session, project_id: str, query: str) -> str:
+    words = list(dict.fromkeys(word.lower() for word in _WORD_PATTERN.findall(query)))
+    if not words:
+        return ""
+    placeholders = ", ".join(f":w{position}" for position in range(len(words)))
+    doc_counts = dict(
+        db.execute(
+            text(f"SELECT term, doc FROM search_vocab WHERE term IN ({placeholders})"),
+            {f"w{position}": word for position, word in enumerate(words)},
+        ).all()
+    )
+    # search_vocab counts passages across every project, which is also what
+    # FTS5 has to walk to score a term; the share is taken of this project's
+    # passages so another project's size never sets the cutoff.
+    total = db.scalar(select(func.count(models.SearchPassage.id)).where(models.SearchPassage.project_id == project_id))
+    cutoff = max(MAX_TERM_DOC_RATIO * (total or 0), MIN_PRUNED_TERM_DOCS)
+    # A query made only of common terms is still matched on all of them.
+    selective = [word for word in words if doc_counts.get(word, 0) <= cutoff] or words
+    # Quote every word so user input can never be parsed as FTS5 syntax.
+    return " OR ".join(f'"{word}"' for word in selective)
+
+
+def _bm25_hits(db: Session, project_id: str, query: str, limit: int) -> list[dict]:
+    expression = _match_expression(db, project_id, query)
+    if not expression:
+        return []
+    rows = db.execute(
+        text(
+            """
+            SELECT p.kind, p.ref_id, p.title, p.char_start, p.char_end,
+                   snippet(search_fts, 1, '**', '**', '…', :tokens) AS snippet
+            FROM search_fts
+            JOIN search_passages AS p ON p.id = search_fts.rowid
+            WHERE search_fts MATCH :expression AND p.project_id = :project_id
+            ORDER BY bm25(search_fts)
+            LIMIT :limit
+            """
+        ),
+        {"expression": expression, "project_id": project_id, "limit": limit, "tokens": SNIPPET_TOKENS},
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def _passages(db: Session, keys: list[tuple[str, int]]) -> dict[tuple[str, int], models.SearchPassage]:
+    if not keys:
+        return {}
+    rows = db.scalars(
+        select(models.SearchPassage).where(
+            or_(
+                *(
+                    and_(models.SearchPassage.ref_id == ref_id, models.SearchPassage.char_start == char_start)
+                    for ref_id, char_start in keys
+                )
+            )
+        )
+    )
+    return {(row.ref_id, row.char_start): row for row in rows}
+
+
+def hybrid_search(db: Session, project_id: str, query: str, limit: int = 20) -> list[dict]:
+    """Merge BM25 and vector hits with reciprocal-rank fusion.
+
+    Passage hits from the same source collapse into one result that keeps the
+    source's best-ranked passage.
+    """
+    fused: dict[tuple[str, str], dict] = {}
+
+    def _entry(kind: str, ref_id: str, defaults: dict) -> dict:
+        return fused.setdefault(
+            (kind, ref_id),
+            {"kind": kind, "ref_id": ref_id, "score": 0.0, "bm25_rank": None, "vector_rank": None, **defaults},
+        )
+
+    bm25_rank = 0
+    for hit in _bm25_hits(db, project_id, query, limit * 4):
+        key = (hit["kind"], hit["ref_id"])
+        if key in fused:
+            continue
+        bm25_rank += 1
+        entry = _entry(hit["kind"], hit["ref_id"], {k: hit[k] for k in ("title", "snippet", "char_start", "char_end")})
+        entry["bm25_rank"] = bm25_rank
+        entry["score"] += 1.0 / (RRF_K + bm25_rank)
+
+    vector_hits = embedding_store.similar(project_id, query, limit)
+    passages = _passages(
+        db, [(source_id, start) for source_id, start, _, _ in vector_hits if ("source", source_id) not in fused]
+    )
+    for vector_rank, (source_id, char_start, char_end, _) in enumerate(vector_hits, start=1):
+        entry = fused.get(("source", source_id))
+        if entry is None:
+            passage = passages.get((source_id, char_start))
+            if passage is None:
+                continue
+            entry = _entry(
+                "source",
+                source_id,
+                {
+                    "title": passage.title,
+                    "snippet": passage.body[: SNIPPET_TOKENS * 8],
+                    "char_start": char_start,
+                    "char_end": char_end,
+                },
+            )
+        entry["vector_rank"] = vector_rank
+        entry["score"] += 1.0 / (RRF_K + vector_rank)
+
+    return sorted(fused.values(), key=lambda item: item["score"], reverse=True)[:limit]
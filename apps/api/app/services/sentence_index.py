@@ -0,0 +1,364 @@
+"""Sentence-level evidence index: one embedding per sentence of every ready source.
+
+Each project has a :class:`SentencePartition` holding its sentences in three
+contiguous arrays: ``(rows, EMBED_DIM)`` float32 vectors, ``(rows, 2)`` char
+offsets and the owning source of each row. Any number of statements are
+matched against a whole project with a single matrix multiply, which is how
+the insight engine picks supporting quotes and how ``GET
+/claims/{id}/evidence`` answers.
+
+Scores are cosine similarities after subtracting the partition's mean vector:
+the hashed embeddings are all-positive, so raw cosines crowd together and
+centring is what separates a relevant sentence from a merely similar one.
+``(V - m) . q`` is computed as ``V . q - m . q`` with row norms precomputed a
+block at a time, so the matrix itself is never copied.
+
+Insight runs bring a project's partition up to date (:meth:`SentenceStore.sync`):
+only sources that are new or whose content changed are split and embedded.
+Readers such as the evidence endpoint only lease and search it. Partitions
+are persisted under ``DATA_DIR/sentences/<project_id>``, memory-mapped on load
+and unloaded least-recently-used beyond ``INSIGHTFLOW_SENTENCE_INDEX_MB``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from .. import models
+from ..database import DATA_DIR
+from . import text_store
+from .embedding_store import EMBED_DIM, _content_fingerprint, _text_from_source, embed_texts
+from .extractors import page_number
+
+SENTENCE_DIR = DATA_DIR / "sentences"
+SENTENCE_INDEX_BUDGET = int(float(os.getenv("INSIGHTFLOW_SENTENCE_INDEX_MB", "256")) * 1024 * 1024)
+SNAPSHOT_VERSION = 1
+MIN_SENTENCE_CHARS = 20
+MIN_SENTENCE_WORDS = 4
+MAX_SENTENCE_CHARS = 400
+# Sentences longer than MAX_SENTENCE_CHARS (or unpunctuated text) are cut into windows of this many words.
+WINDOW_WORDS = 40
+EMBED_BATCH_SENTENCES = 50000
+NORM_BLOCK_ROWS = 65536
+
+_SENTENCE_PATTERN = re.compile(r"[^.!?\n]+(?:[.!?]+|$)")
+_WORD_PATTERN = re.compile(r"\S+")
+
+
+def split_sentences(text: str) -> np.ndarray:
+    """Sentence boundaries of ``text`` as ``(n, 2)`` char offsets, surrounding whitespace excluded."""
+    spans: list[tuple[int, int]] = []
+    for match in _SENTENCE_PATTERN.finditer(text):
+        words = [word.span() for word in _WORD_PATTERN.finditer(match.group())]
+        if len(words) < MIN_SENTENCE_WORDS:
+            continue
+        offset = match.start()
+        if words[-1][1] - words[0][0] <= MAX_SENTENCE_CHARS:
+            windows = [words]
+        else:
+            windows = [words[first : first + WINDOW_WORDS] for first in range(0, len(words), WINDOW_WORDS)]
+        for window in windows:
+            start, end = offset + window[0][0], offset + window[-1][1]
+            if end - start >= MIN_SENTENCE_CHARS and len(window) >= MIN_SENTENCE_WORDS:
+                spans.append((start, end))
+    return np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+
+
+def sentence_text(source: models.Source, start: int, end: int) -> str:
+    """Text of one indexed sentence, read from the source's snapshot blocks."""
+    if not source.content_ptr:
+        return ""
+    return text_store.read_range(Path(DATA_DIR.parent, source.content_ptr), start, end)
+
+
+def location(source: models.Source, start: Optional[int] = None, end: Optional[int] = None) -> str:
+    """Citation location: char offsets (with the PDF page when known), or the source URI without them."""
+    if start is None or end is None:
+        return source.uri
+    label = f"offset {start}-{end}"
+    page = page_number(Path(DATA_DIR.parent, source.content_ptr), start) if source.content_ptr else None
+    return f"p. {page}, {label}" if page else label
+
+
+def _fingerprint(source: models.Source) -> str:
+    return source.content_hash or _content_fingerprint(source)
+
+
+class SentencePartition:
+    """Sentence vectors, offsets and owners of one project's ready sources."""
+
+    def __init__(self, snapshot_dir: Path, dimension: int = EMBED_DIM):
+        self.snapshot_dir = snapshot_dir
+        self.dimension = dimension
+        self.ids: list[str] = []
+        self.fingerprints: list[str] = []
+        self._positions: dict[str, int] = {}
+        self._row_ranges: list[tuple[int, int]] = []
+        self.vectors = np.zeros((0, dimension), dtype=np.float32)
+        self.spans = np.zeros((0, 2), dtype=np.int64)
+        self.owners = np.zeros(0, dtype=np.int64)
+        self.mean = np.zeros(dimension, dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._lock = threading.RLock()
+        self.dirty = False
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.vectors.nbytes + self.spans.nbytes + self.owners.nbytes + self._norms.nbytes)
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.snapshot_dir / "vectors.npy"
+
+    @property
+    def _spans_path(self) -> Path:
+        return self.snapshot_dir / "spans.npy"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.snapshot_dir / "sources.json"
+
+    def _adopt(
+        self,
+        ids: list[str],
+        fingerprints: list[str],
+        counts: Sequence[int],
+        vectors: np.ndarray,
+        spans: np.ndarray,
+    ) -> None:
+        self.ids, self.fingerprints = list(ids), list(fingerprints)
+        self._positions = {source_id: position for position, source_id in enumerate(self.ids)}
+        ends = np.cumsum(np.asarray(counts, dtype=np.int64))
+        self._row_ranges = list(zip((ends - np.asarray(counts, dtype=np.int64)).tolist(), ends.tolist()))
+        self.vectors, self.spans = vectors, spans
+        self.owners = np.repeat(np.arange(len(self.ids), dtype=np.int64), counts)
+        self.mean = vectors.mean(axis=0).astype(np.float32) if len(vectors) else np.zeros(self.dimension, np.float32)
+        self._norms = np.empty(len(vectors), dtype=np.float32)
+        for first in range(0, len(vectors), NORM_BLOCK_ROWS):
+            block = np.asarray(vectors[first : first + NORM_BLOCK_ROWS], dtype=np.float32)
+            self._norms[first : first + len(block)] = np.linalg.norm(block - self.mean, axis=1)
+
+    def load(self) -> None:
+        """Adopt the on-disk snapshot (memory-mapped); empty if there is none or it does not fit."""
+        try:
+            meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+            if meta.get("version") != SNAPSHOT_VERSION or meta.get("dimension") != self.dimension:
+                return
+            vectors = np.load(self._vectors_path, mmap_mode="r")
+            spans = np.load(self._spans_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return
+        counts = meta.get("counts", [])
+        ids = meta.get("ids", [])
+        if len(counts) != len(ids) or vectors.shape[0] != sum(counts) or spans.shape != (vectors.shape[0], 2):
+            return
+        with self._lock:
+            self._adopt(ids, meta.get("fingerprints", []), counts, vectors, spans)
+
+    def save(self) -> None:
+        with self._lock:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            tmp_vectors = self._vectors_path.with_suffix(".tmp.npy")
+            np.save(tmp_vectors, np.asarray(self.vectors))
+            tmp_spans = self._spans_path.with_suffix(".tmp.npy")
+            np.save(tmp_spans, np.asarray(self.spans))
+            tmp_meta = self._meta_path.with_suffix(".tmp")
+            tmp_meta.write_text(
+                json.dumps(
+                    {
+                        "version": SNAPSHOT_VERSION,
+                        "dimension": self.dimension,
+                        "ids": self.ids,
+                        "fingerprints": self.fingerprints,
+                        "counts": [end - start for start, end in self._row_ranges],
+                    }
+                ),
+                encoding="utf-8",
+            )
+            # As with the embedding index, a crash between the replaces leaves
+            # a row-count mismatch that load() rejects.
+            os.replace(tmp_vectors, self._vectors_path)
+            os.replace(tmp_spans, self._spans_path)
+            os.replace(tmp_meta, self._meta_path)
+            self.dirty = False
+
+    def delete_snapshot(self) -> None:
+        shutil.rmtree(self.snapshot_dir, ignore_errors=True)
+
+    def sync(self, sources: Iterable[models.Source]) -> bool:
+        """Index exactly the ready ``sources``, re-splitting only new or changed ones; returns whether anything changed."""
+        wanted = {source.id: source for source in sources if source.status == "ready"}
+        with self._lock:
+            kept = [
+                position
+                for position, source_id in enumerate(self.ids)
+                if source_id in wanted and self.fingerprints[position] == _fingerprint(wanted[source_id])
+            ]
+            kept_ids = {self.ids[position] for position in kept}
+            fresh = [source for source_id, source in wanted.items() if source_id not in kept_ids]
+            if len(kept) == len(self.ids) and not fresh:
+                return False
+
+            ids = [self.ids[position] for position in kept]
+            fingerprints = [self.fingerprints[position] for position in kept]
+            counts = [self._row_ranges[position][1] - self._row_ranges[position][0] for position in kept]
+            rows = np.concatenate(
+                [np.arange(*self._row_ranges[position]) for position in kept] or [np.zeros(0, dtype=np.int64)]
+            )
+            vector_parts = [np.asarray(self.vectors[rows], dtype=np.float32)]
+            span_parts = [np.asarray(self.spans[rows], dtype=np.int64)]
+
+            sentences: list[str] = []
+            for source in fresh:
+                text = _text_from_source(source)
+                spans = split_sentences(text)
+                ids.append(source.id)
+                fingerprints.append(_fingerprint(source))
+                counts.append(len(spans))
+                span_parts.append(spans)
+                sentences.extend(text[start:end] for start, end in spans.tolist())
+            for first in range(0, len(sentences), EMBED_BATCH_SENTENCES):
+                vector_parts.append(embed_texts(sentences[first : first + EMBED_BATCH_SENTENCES]))
+
+            self._adopt(
+                ids,
+                fingerprints,
+                counts,
+                np.concatenate(vector_parts).reshape(-1, self.dimension),
+                np.concatenate(span_parts).reshape(-1, 2),
+            )
+            self.dirty = True
+            return True
+
+    def indexed(self, source: models.Source) -> bool:
+        """Whether ``source``'s sentences are indexed from its current content."""
+        with self._lock:
+            position = self._positions.get(source.id)
+            return position is not None and self.fingerprints[position] == _fingerprint(source)
+
+    def rows(self, source_ids: Sequence[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sentence rows of ``source_ids`` as ``(owners, spans, vectors)``, owners being positions in ``source_ids``."""
+        with self._lock:
+            ranges = [
+                self._row_ranges[self._positions[source_id]] if source_id in self._positions else (0, 0)
+                for source_id in source_ids
+            ]
+            counts = np.array([end - start for start, end in ranges], dtype=np.int64)
+            rows = np.concatenate([np.arange(start, end) for start, end in ranges] or [np.zeros(0, dtype=np.int64)])
+            owners = np.repeat(np.arange(len(ranges)), counts)
+            return owners, np.asarray(self.spans[rows]), np.asarray(self.vectors[rows], dtype=np.float32)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        top_k: int = 5,
+        exclude: Optional[Sequence[Optional[str]]] = None,
+    ) -> list[list[tuple[str, int, int, float]]]:
+        """Top sentences for every query row as ``(source_id, start, end, score)``, best first.
+
+        All queries are scored in one ``(queries, sentences)`` matrix multiply.
+        ``exclude[i]`` names a source whose sentences query ``i`` must skip.
+        """
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dimension)
+        with self._lock:
+            if not len(self.vectors) or top_k <= 0:
+                return [[] for _ in range(len(queries))]
+            centred = queries - self.mean
+            centred /= np.maximum(np.linalg.norm(centred, axis=1, keepdims=True), 1e-12)
+            sims = np.asarray(self.vectors) @ centred.T - self.mean @ centred.T
+            sims /= np.maximum(self._norms, 1e-12)[:, None]
+            sims = sims.T
+            results: list[list[tuple[str, int, int, float]]] = []
+            for index, row in enumerate(sims):
+                if exclude is not None and exclude[index] in self._positions:
+                    row[self.owners == self._positions[exclude[index]]] = -np.inf
+                count = min(top_k, len(row))
+                top = np.argpartition(-row, count - 1)[:count]
+                top = top[np.argsort(-row[top], kind="stable")]
+                results.append(
+                    [
+                        (self.ids[self.owners[best]], int(self.spans[best, 0]), int(self.spans[best, 1]), float(row[best]))
+                        for best in top.tolist()
+                        if np.isfinite(row[best])
+                    ]
+                )
+            return results
+
+
+class SentenceStore:
+    """Sentence partitions by ``project_id``, loaded lazily and unloaded least-recently-used."""
+
+    def __init__(self, root: Path = SENTENCE_DIR, memory_budget: int = SENTENCE_INDEX_BUDGET):
+        self.root = root
+        self.memory_budget = memory_budget
+        self._partitions: OrderedDict[str, SentencePartition] = OrderedDict()
+        self._leases: dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def lease(self, project_id: str) -> Iterator[SentencePartition]:
+        """The project's partition, pinned in memory until the block exits (see ``EmbeddingStore.lease``)."""
+        with self._lock:
+            partition = self._partitions.get(project_id)
+            if partition is None:
+                partition = SentencePartition(self.root / project_id)
+                partition.load()
+                self._partitions[project_id] = partition
+            self._partitions.move_to_end(project_id)
+            self._leases[project_id] = self._leases.get(project_id, 0) + 1
+            self._enforce_budget()
+        try:
+            yield partition
+        finally:
+            with self._lock:
+                self._leases[project_id] -= 1
+                if not self._leases[project_id]:
+                    del self._leases[project_id]
+                self._enforce_budget()
+
+    def _enforce_budget(self) -> None:
+        # Leased partitions stay, as does the last one even if it alone exceeds the budget.
+        for project_id in list(self._partitions):
+            if len(self._partitions) <= 1 or sum(p.nbytes for p in self._partitions.values()) <= self.memory_budget:
+                return
+            if project_id in self._leases:
+                continue
+            evicted = self._partitions.pop(project_id)
+            if evicted.dirty:
+                evicted.save()
+
+    @contextmanager
+    def sync(self, project_id: str, sources: Iterable[models.Source]) -> Iterator[SentencePartition]:
+        """Lease the project's partition, updated to ``sources`` (all of its sources) and saved if it changed."""
+        with self.lease(project_id) as partition:
+            if partition.sync(sources):
+                partition.save()
+            yield partition
+
+    def drop_project(self, project_id: str) -> None:
+        with self._lock:
+            self._partitions.pop(project_id, None)
+            SentencePartition(self.root / project_id).delete_snapshot()
+
+    def sweep(self, project_ids: Iterable[str]) -> None:
+        """Delete snapshots of projects not in ``project_ids``, e.g. ones removed outside the API."""
+        keep = set(project_ids)
+        with self._lock:
+            if not self.root.exists():
+                return
+            for entry in self.root.iterdir():
+                if entry.is_dir() and entry.name not in keep:
+                    self._partitions.pop(entry.name, None)
+                    shutil.rmtree(entry, ignore_errors=True)
+
+
+sentence_store = SentenceStore()
@@ -0,0 +1,90 @@
+"""Cache of per-source insight-engine analyses keyed by content hash.
+
+An insight run analyses each source (:func:`.insight_engine.analyze_source`)
+and then merges the analyses into themes. The analysis depends only on the
+source's text, so it is stored in ``source_analyses`` under the source's
+``content_hash`` and the engine's ``ANALYZER`` version. A later run over the
+same project, or any project holding the same document, reuses it and only
+analyses sources that are new or changed. Chunk embeddings are already shared
+the same way by :mod:`.content_cache`.
+
+Sources without a content hash (fixtures, older rows) and sources still being
+ingested are analysed every time and never cached.
+"""
+from __future__ import annotations
+
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .. import models
+from .insight_engine import ANALYZER, analyze_source
+
+
+def _cacheable(source: models.Source) -> bool:
+    return bool(source.content_hash) and source.status == "ready"
+
+
+def load_or_analyze(
+    db: Session,
+    sources: Iterable[models.Source],
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> tuple[dict[str, dict], int, int]:
+    """Analyses of ``sources`` by source id, plus how many were reused and recomputed.
+
+    Cached analyses are loaded with one query and count as processed straight
+    away; the rest are computed, calling ``progress(done, total)`` after each,
+    and stored in the caller's transaction.
+    """
+    source_list = list(sources)
+    digests = {source.content_hash for source in source_list if _cacheable(source)}
+    cached: dict[str, dict] = {}
+    if digests:
+        rows = db.execute(
+            select(models.SourceAnalysis.content_hash, models.SourceAnalysis.result).where(
+                models.SourceAnalysis.analyzer == ANALYZER, models.SourceAnalysis.content_hash.in_(digests)
+            )
+        )
+        cached = {digest: result for digest, result in rows}
+
+    analyses: dict[str, dict] = {}
+    pending: list[models.Source] = []
+    for source in source_list:
+        result = cached.get(source.content_hash) if _cacheable(source) else None
+        if result is None:
+            pending.append(source)
+        else:
+            analyses[source.id] = result
+    reused = len(analyses)
+    total = len(source_list)
+    if progress is not None and reused:
+        progress(reused, total)
+
+    fresh: dict[str, dict] = {}
+    for done, source in enumerate(pending, start=reused + 1):
+        analyses[source.id] = analyze_source(source)
+        if _cacheable(source):
+            fresh[source.content_hash] = analyses[source.id]
+        if progress is not None:
+            progress(done, total)
+
+    if fresh:
+        db.execute(
+            sqlite_insert(models.SourceAnalysis).on_conflict_do_nothing(index_elements=["content_hash", "analyzer"]),
+            [{"content_hash": digest, "analyzer": ANALYZER, "result": result} for digest, result in fresh.items()],
+        )
+    return analyses, reused, len(pending)
+
+
+def prune(db: Session) -> None:
+    """Drop analyses of an older analyzer or of content no source holds any more."""
+    db.execute(
+        delete(models.SourceAnalysis).where(
+            (models.SourceAnalysis.analyzer != ANALYZER)
+            | models.SourceAnalysis.content_hash.not_in(
+                select(models.Source.content_hash).where(models.Source.content_hash.is_not(None))
+            )
+        )
+    )
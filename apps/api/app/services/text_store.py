@@ -0,0 +1,281 @@
+"""Compressed, seekable storage for extracted text snapshots.
+
+A snapshot is split into blocks of ``TEXT_BLOCK_CHARS`` characters, each
+compressed on its own (zstd when ``zstandard`` is installed, zlib otherwise)::
+
+    header   magic b"IFTZ", version u8, codec u8, block count u32, total chars u64
+    index    per block: file offset u64, compressed bytes u32, characters u32,
+             UTF-8 bytes u32 (version 2)
+    blocks   compressed UTF-8
+
+so a character or UTF-8 byte range only decompresses the blocks it overlaps. Decompressed
+blocks are kept in a byte-bounded LRU shared by all snapshots; snapshots are
+immutable once written, so ``(path, mtime)`` is a safe cache key. Files
+without the magic are plain UTF-8 snapshots written before compression and
+are read as-is, through ``mmap`` so a window never loads the whole file.
+Every reader of ``Source.content_ptr`` goes through here.
+"""
+from __future__ import annotations
+
+import bisect
+import codecs
+import mmap
+import os
+import struct
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+MAGIC = b"IFTZ"
+FORMAT_VERSION = 2
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+TEXT_BLOCK_CHARS = 32768
+TEXT_BLOCK_CACHE_BUDGET = int(float(os.getenv("INSIGHTFLOW_TEXT_BLOCK_CACHE_MB", "16")) * 1024 * 1024)
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 6
+
+_HEADER = struct.Struct("<4sBBIQ")
+_INDEX_ENTRY = struct.Struct("<QIII")
+_INDEX_ENTRY_V1 = struct.Struct("<QII")
+_PLAIN_STEP = 1 << 20
+
+
+class _Layout:
+    __slots__ = ("codec", "offsets", "lengths", "starts", "byte_starts", "total_chars")
+
+    def __init__(self, codec: int, entries: list[tuple[int, ...]], total_chars: int):
+        self.codec = codec
+        self.offsets = [entry[0] for entry in entries]
+        self.lengths = [entry[1] for entry in entries]
+        # starts[i] is the character offset of block i; starts[-1] == total_chars.
+        self.starts = [0]
+        for entry in entries:
+            self.starts.append(self.starts[-1] + entry[2])
+        # Same for UTF-8 bytes; version 1 snapshots did not record them.
+        self.byte_starts: Optional[list[int]] = None
+        if all(len(entry) > 3 for entry in entries):
+            self.byte_starts = [0]
+            for entry in entries:
+                self.byte_starts.append(self.byte_starts[-1] + entry[3])
+        self.total_chars = total_chars
+
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Text snapshot is zstd-compressed; install zstandard to read it.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def write_text(path: Path, text: str) -> None:
+    """Write ``text`` as a compressed snapshot; the file appears atomically."""
+    codec = CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+    blocks = [text[start : start + TEXT_BLOCK_CHARS] for start in range(0, len(text), TEXT_BLOCK_CHARS)]
+    encoded = [block.encode("utf-8") for block in blocks]
+    payloads = [_compress(codec, data) for data in encoded]
+    offset = _HEADER.size + _INDEX_ENTRY.size * len(blocks)
+    index = bytearray()
+    for block, data, payload in zip(blocks, encoded, payloads):
+        index += _INDEX_ENTRY.pack(offset, len(payload), len(block), len(data))
+        offset += len(payload)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    with tmp.open("wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, FORMAT_VERSION, codec, len(blocks), len(text)))
+        handle.write(index)
+        for payload in payloads:
+            handle.write(payload)
+    os.replace(tmp, path)
+
+
+@lru_cache(maxsize=1024)
+def _layout(path: str, mtime_ns: int) -> Optional[_Layout]:
+    """Block index of a compressed snapshot, or ``None`` for a plain UTF-8 file."""
+    with open(path, "rb") as handle:
+        header = handle.read(_HEADER.size)
+        if len(header) < _HEADER.size or header[:4] != MAGIC:
+            return None
+        _, version, codec, count, total_chars = _HEADER.unpack(header)
+        if version not in (1, FORMAT_VERSION):
+            raise ValueError(f"Unsupported text snapshot version {version}")
+        entry = _INDEX_ENTRY if version == FORMAT_VERSION else _INDEX_ENTRY_V1
+        raw_index = handle.read(entry.size * count)
+    entries = [entry.unpack_from(raw_index, position * entry.size) for position in range(count)]
+    return _Layout(codec, entries, total_chars)
+
+
+class BlockCache:
+    """Byte-bounded LRU of decompressed blocks keyed by ``(path, mtime, block)``."""
+
+    def __init__(self, budget: int = TEXT_BLOCK_CACHE_BUDGET):
+        self.budget = budget
+        self._blocks: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, int, int]) -> Optional[str]:
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None:
+                self.misses += 1
+                return None
+            self._blocks.move_to_end(key)
+            self.hits += 1
+            return block
+
+    def put(self, key: tuple[str, int, int], block: str) -> None:
+        size = len(block) * 2
+        if size > self.budget:
+            return
+        with self._lock:
+            if key in self._blocks:
+                return
+            self._blocks[key] = block
+            self._bytes += size
+            while self._bytes > self.budget:
+                _, evicted = self._blocks.popitem(last=False)
+                self._bytes -= len(evicted) * 2
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "blocks": len(self._blocks),
+                "bytes": self._bytes,
+                "budget": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+block_cache = BlockCache()
+
+
+def _stat_key(path: Path) -> tuple[str, int]:
+    return str(path), path.stat().st_mtime_ns
+
+
+def _blocks(path: str, mtime_ns: int, layout: _Layout, first: int, last: int, keep: bool = True) -> list[str]:
+    """Decompressed blocks ``first..last`` inclusive, reading only the ones not cached.
+
+    ``keep=False`` (whole-document reads) uses cached blocks without adding new
+    ones, so one large document does not evict everyone's working set.
+    """
+    found: list[Optional[str]] = [block_cache.get((path, mtime_ns, block)) for block in range(first, last + 1)]
+    if any(block is None for block in found):
+        with open(path, "rb") as handle:
+            for position, block in enumerate(found):
+                if block is not None:
+                    continue
+                number = first + position
+                handle.seek(layout.offsets[number])
+                text = _decompress(layout.codec, handle.read(layout.lengths[number])).decode("utf-8")
+                if keep:
+                    block_cache.put((path, mtime_ns, number), text)
+                found[position] = text
+    return found  # type: ignore[return-value]
+
+
+def read_text(path: Union[str, Path]) -> str:
+    """Full text of a snapshot (compressed or plain)."""
+    key = _stat_key(Path(path))
+    layout = _layout(*key)
+    if layout is None:
+        return Path(path).read_text(encoding="utf-8", errors="ignore")
+    if not layout.offsets:
+        return ""
+    return "".join(_blocks(*key, layout, 0, len(layout.offsets) - 1, keep=False))
+
+
+def _plain_range(path: Path, start: int, end: int) -> str:
+    """Characters ``start:end`` of a plain snapshot, decoding only the prefix of the file they need."""
+    size = path.stat().st_size
+    if not size or start >= end:
+        return ""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parts: list[str] = []
+    seen = 0
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for position in range(0, size, _PLAIN_STEP):
+            chunk = decoder.decode(mapped[position : position + _PLAIN_STEP], position + _PLAIN_STEP >= size)
+            if seen + len(chunk) > start:
+                parts.append(chunk[max(start - seen, 0) : end - seen])
+            seen += len(chunk)
+            if seen >= end:
+                break
+    return "".join(parts)
+
+
+def read_range(path: Union[str, Path], start: int, end: int) -> str:
+    """Characters ``start:end`` of a snapshot, decompressing only the blocks they fall in."""
+    key = _stat_key(Path(path))
+    layout = _layout(*key)
+    if layout is None:
+        return _plain_range(Path(path), max(start, 0), end)
+    start, end = max(start, 0), min(end, layout.total_chars)
+    if start >= end:
+        return ""
+    first = bisect.bisect_right(layout.starts, start) - 1
+    last = bisect.bisect_right(layout.starts, end - 1) - 1
+    joined = "".join(_blocks(*key, layout, first, last))
+    offset = layout.starts[first]
+    return joined[start - offset : end - offset]
+
+
+def read_bytes(path: Union[str, Path], start: int, end: int) -> bytes:
+    """Bytes ``start:end`` of the snapshot's UTF-8 text (may split a multi-byte character at either end)."""
+    key = _stat_key(Path(path))
+    layout = _layout(*key)
+    if layout is None:
+        size = Path(path).stat().st_size
+        start, end = max(start, 0), min(end, size)
+        if start >= end:
+            return b""
+        with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[start:end]
+    if layout.byte_starts is None:
+        return read_text(path).encode("utf-8")[start:end]
+    start, end = max(start, 0), min(end, layout.byte_starts[-1])
+    if start >= end:
+        return b""
+    first = bisect.bisect_right(layout.byte_starts, start) - 1
+    last = bisect.bisect_right(layout.byte_starts, end - 1) - 1
+    joined = "".join(_blocks(*key, layout, first, last)).encode("utf-8")
+    offset = layout.byte_starts[first]
+    return joined[start - offset : end - offset]
+
+
+def char_length(path: Union[str, Path]) -> int:
+    key = _stat_key(Path(path))
+    layout = _layout(*key)
+    if layout is None:
+        return len(Path(path).read_text(encoding="utf-8", errors="ignore"))
+    return layout.total_chars
+
+
+def byte_length(path: Union[str, Path]) -> int:
+    """Size of the snapshot's text encoded as UTF-8."""
+    key = _stat_key(Path(path))
+    layout = _layout(*key)
+    if layout is None:
+        return Path(path).stat().st_size
+    if layout.byte_starts is None:
+        return len(read_text(path).encode("utf-8"))
+    return layout.byte_starts[-1]
@@ -0,0 +1,61 @@
+"""Streaming upload persistence: bounded-memory copy to disk with on-the-fly hashing."""
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import BinaryIO
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("INSIGHTFLOW_MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+# Whole-request cap for POST /sources/batch; each file still obeys MAX_UPLOAD_BYTES.
+MAX_BATCH_UPLOAD_BYTES = int(float(os.getenv("INSIGHTFLOW_MAX_BATCH_UPLOAD_MB", "1024")) * 1024 * 1024)
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+def too_large(max_bytes: int = MAX_UPLOAD_BYTES) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+
+
+def copy_stream(stream: BinaryIO, destination: Path, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[str, int]:
+    """Blocking counterpart of :func:`save_upload` for worker threads; oversize raises ``ValueError``."""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with destination.open("wb") as handle:
+            while chunk := stream.read(UPLOAD_CHUNK_BYTES):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ValueError(f"File exceeds the {max_bytes // (1024 * 1024)} MB limit")
+                digest.update(chunk)
+                handle.write(chunk)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+    return digest.hexdigest(), size
+
+
+async def save_upload(file: UploadFile, destination: Path, max_bytes: int = MAX_UPLOAD_BYTES) -> tuple[str, int]:
+    """Copy ``file`` to ``destination`` in fixed-size chunks; returns ``(sha256 hex digest, size)``.
+
+    Only one chunk is held in memory at a time. Exceeding ``max_bytes``
+    removes the partial file and raises a 413.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    handle = await run_in_threadpool(destination.open, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise too_large(max_bytes)
+            digest.update(chunk)
+            await run_in_threadpool(handle.write, chunk)
+    except BaseException:
+        handle.close()
+        destination.unlink(missing_ok=True)
+        raise
+    handle.close()
+    return digest.hexdigest(), size
@@ -0,0 +1,241 @@
+"""Vector storage formats and approximate nearest-neighbour structures used by :mod:`.embedding_store`.
+
+Vectors are stored as ``codes`` (float32, float16 or int8), plus a float32
+per-row ``scales`` array for ``int8``, and scored directly from that compact form.
+
+Every index here maps a query to *row numbers* of the partition's contiguous
+vector buffer, scored by inner product (cosine for unit vectors). Rows are
+added in order, so index ids and buffer rows always agree. Indexes hold row
+numbers only and score candidates from that buffer, so vectors are never
+stored twice.
+"""
+from __future__ import annotations
+
+import math
+import os
+from typing import Callable, Optional
+
+import numpy as np
+
+try:
+    import faiss  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    faiss = None  # type: ignore
+
+
+ANN_MODES = {"flat", "ivf", "hnsw"}
+INDEX_MODE = os.getenv("INSIGHTFLOW_INDEX_MODE", "flat").lower()
+# Below this many vectors an exact scan is already fast, so no ANN is trained.
+ANN_MIN_VECTORS = int(os.getenv("INSIGHTFLOW_ANN_MIN_VECTORS", "20000"))
+ANN_TRAIN_SAMPLE = 262144
+HNSW_NEIGHBORS = 32
+
+STORAGE_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+VECTOR_STORAGE = os.getenv("INSIGHTFLOW_VECTOR_STORAGE", "float32").lower()
+SCORE_BLOCK_ROWS = 65536
+INT8_LEVELS = 127.0
+
+
+def quantize(vectors: np.ndarray, storage: str) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Encode float32 rows as ``(codes, scales)``; only ``int8`` has (symmetric, per-row) scales."""
+    if storage not in STORAGE_DTYPES:
+        raise ValueError(f"Unknown vector storage '{storage}'. Choose from {sorted(STORAGE_DTYPES)}.")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if storage != "int8":
+        return vectors.astype(STORAGE_DTYPES[storage], copy=False), None
+    scales = np.abs(vectors).max(axis=1) / INT8_LEVELS if vectors.size else np.zeros(len(vectors), np.float32)
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+    if codes.dtype == np.float32:
+        return np.asarray(codes)
+    decoded = np.asarray(codes, dtype=np.float32)
+    if codes.dtype == np.int8:
+        decoded *= np.asarray(scales)[:, None]
+    return decoded
+
+
+def score(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """Inner products of ``query`` with every encoded row, decoding at most one block at a time."""
+    if codes.dtype == np.float32:
+        return codes @ query
+    sims = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+        block = np.asarray(codes[start : start + SCORE_BLOCK_ROWS], dtype=np.float32)
+        sims[start : start + len(block)] = block @ query
+    if codes.dtype == np.int8:
+        sims *= scales
+    return sims
+
+
+def ivf_lists(count: int) -> int:
+    return int(min(max(math.sqrt(count), 16), 4096))
+
+
+def ivf_probes(lists: int) -> int:
+    return max(4, lists // 16)
+
+
+def minibatch_kmeans(
+    data: np.ndarray,
+    clusters: int,
+    iterations: int = 25,
+    batch_size: int = 4096,
+    seed: int = 0,
+) -> np.ndarray:
+    """Mini-batch k-means (Sculley 2010) on the rows of ``data``; returns ``(clusters, dim)`` centroids.
+
+    Distances are computed as ``|c|^2 - 2 x.c`` in one matrix multiply per
+    batch and centroid updates use per-centre learning rates via ``np.add.at``.
+    """
+    rng = np.random.default_rng(seed)
+    data = np.asarray(data, dtype="float32")
+    clusters = min(clusters, len(data))
+    centroids = data[rng.choice(len(data), clusters, replace=False)].copy()
+    counts = np.zeros(clusters, dtype=np.float64)
+    for _ in range(iterations):
+        batch = data[rng.choice(len(data), min(batch_size, len(data)), replace=False)]
+        nearest = assign(batch, centroids)
+        hits = np.bincount(nearest, minlength=clusters).astype(np.float64)
+        counts += hits
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, nearest, batch)
+        touched = hits > 0
+        rate = (hits[touched] / counts[touched])[:, None]
+        centroids[touched] = (1 - rate) * centroids[touched] + rate * (sums[touched] / hits[touched, None])
+    return centroids
+
+
+def assign(data: np.ndarray, centroids: np.ndarray, block: int = 65536) -> np.ndarray:
+    """Index of the nearest centroid (L2) for every row, in bounded-memory blocks."""
+    norms = (centroids.astype(np.float32) ** 2).sum(axis=1)
+    out = np.empty(len(data), dtype=np.int64)
+    for start in range(0, len(data), block):
+        rows = np.asarray(data[start : start + block], dtype=np.float32)
+        out[start : start + len(rows)] = np.argmin(norms[None, :] - 2.0 * rows @ centroids.T, axis=1)
+    return out
+
+
+class NumpyIVF:
+    """Inverted-file index in pure NumPy: k-means coarse quantiser plus per-list row arrays."""
+
+    name = "numpy-ivf"
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.centroids: Optional[np.ndarray] = None
+        self.nprobe = 1
+        self._lists: list[list[np.ndarray]] = []
+        self.ntotal = 0
+
+    def train(self, matrix: np.ndarray) -> None:
+        lists = ivf_lists(len(matrix))
+        sample = matrix
+        if len(matrix) > 64 * lists:
+            sample = matrix[np.random.default_rng(0).choice(len(matrix), 64 * lists, replace=False)]
+        self.centroids = self._cluster(np.asarray(sample, dtype="float32"), lists)
+        self.nprobe = ivf_probes(len(self.centroids))
+        self.reset()
+
+    def _cluster(self, sample: np.ndarray, lists: int) -> np.ndarray:
+        return minibatch_kmeans(sample, lists)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return assign(vectors, self.centroids)
+
+    def _probes(self, query: np.ndarray) -> np.ndarray:
+        return np.argsort(-(self.centroids @ query))[: self.nprobe]
+
+    def reset(self) -> None:
+        self._lists = [[] for _ in range(0 if self.centroids is None else len(self.centroids))]
+        self.ntotal = 0
+
+    def add(self, vectors: np.ndarray) -> None:
+        nearest = self._assign(vectors)
+        order = np.argsort(nearest, kind="stable")
+        bounds = np.searchsorted(nearest[order], np.arange(len(self.centroids) + 1))
+        rows = order + self.ntotal
+        for cluster in np.flatnonzero(np.diff(bounds)):
+            self._lists[cluster].append(rows[bounds[cluster] : bounds[cluster + 1]])
+        self.ntotal += len(vectors)
+
+    def _rows(self, cluster: int) -> np.ndarray:
+        parts = self._lists[cluster]
+        if len(parts) > 1:
+            # Merge appended fragments lazily, only for lists that get probed.
+            parts[:] = [np.concatenate(parts)]
+        return parts[0] if parts else np.zeros(0, dtype=np.int64)
+
+    def search(
+        self, score_rows: Callable[[np.ndarray], np.ndarray], query: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Top ``k`` rows among the probed lists; ``score_rows`` scores buffer rows against ``query``."""
+        probes = self._probes(query)
+        rows = np.concatenate([self._rows(int(cluster)) for cluster in probes])
+        if not len(rows):
+            return rows, np.zeros(0, dtype=np.float32)
+        scores = score_rows(rows)
+        if k < len(rows):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return rows[top], scores[top]
+
+
+class FaissIVF(NumpyIVF):
+    """:class:`NumpyIVF` with FAISS doing the k-means, list assignment and centroid probing.
+
+    Only the centroids live in FAISS; the lists keep row numbers and
+    candidates are scored from the partition's buffer in whatever storage it
+    uses. In ``hnsw`` mode the centroids are probed through an HNSW graph
+    rather than a flat scan.
+    """
+
+    def __init__(self, dimension: int, mode: str):
+        super().__init__(dimension)
+        self.mode = mode
+        self.name = f"faiss-{mode}"
+        self._assigner = None
+        self._prober = None
+
+    def _cluster(self, sample: np.ndarray, lists: int) -> np.ndarray:
+        kmeans = faiss.Kmeans(  # type: ignore
+            self.dimension, min(lists, len(sample)), niter=25, seed=0, min_points_per_centroid=1
+        )
+        kmeans.train(np.ascontiguousarray(sample))
+        centroids = np.ascontiguousarray(kmeans.centroids, dtype="float32")
+        self._assigner = faiss.IndexFlatL2(self.dimension)  # type: ignore
+        self._assigner.add(centroids)
+        if self.mode == "hnsw":
+            self._prober = faiss.IndexHNSWFlat(self.dimension, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)  # type: ignore
+            self._prober.hnsw.efSearch = max(64, ivf_probes(len(centroids)))
+        else:
+            self._prober = faiss.IndexFlatIP(self.dimension)  # type: ignore
+        self._prober.add(centroids)
+        return centroids
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        _, nearest = self._assigner.search(np.ascontiguousarray(vectors, dtype="float32"), 1)  # type: ignore
+        return nearest[:, 0]
+
+    def _probes(self, query: np.ndarray) -> np.ndarray:
+        _, probes = self._prober.search(query.reshape(1, -1).astype("float32"), self.nprobe)  # type: ignore
+        return probes[0][probes[0] >= 0]
+
+
+def build_ann(dimension: int, mode: str = INDEX_MODE):
+    """Return an untrained ANN structure for ``mode``, or ``None`` for exact search.
+
+    Without faiss both ``ivf`` and ``hnsw`` fall back to :class:`NumpyIVF`.
+    """
+    if mode not in ANN_MODES:
+        raise ValueError(f"Unknown index mode '{mode}'. Choose from {sorted(ANN_MODES)}.")
+    if mode == "flat":
+        return None
+    if faiss is not None:
+        return FaissIVF(dimension, mode)
+    return NumpyIVF(dimension)
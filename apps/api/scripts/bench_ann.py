@@ -0,0 +1,103 @@
+"""
+Recall and throughput benchmark for vector storage formats and approximate index modes.
+
+For synthetic clustered unit vectors it reports, against exact float32 search:
+
+* bytes per vector, recall@k and QPS of exact search over each storage
+  format (float32, float16, int8 with per-vector scale);
+* build time, recall@k and QPS of each available ANN structure (FAISS
+  IVF, and IVF probed through an HNSW graph, when faiss is installed,
+  plus the NumPy IVF fallback), all scoring candidates from ``--storage``.
+
+Usage:
+    python -m scripts.bench_ann [--sizes 10000 100000 1000000] [--queries 200] [--k 10]
+        [--storage float32]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.services.embedding_store import EMBED_DIM
+from app.services.vector_index import STORAGE_DTYPES, NumpyIVF, build_ann, dequantize, quantize, score
+
+
+def make_vectors(count: int, clusters: int = 256, seed: int = 11) -> np.ndarray:
+    """Unit vectors drawn around random centres, loosely mimicking topical passages."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, EMBED_DIM)).astype("float32")
+    vectors = centres[rng.integers(0, clusters, count)]
+    vectors += 0.6 * rng.standard_normal((count, EMBED_DIM)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def top_k(sims: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-sims, k - 1)[:k]
+    return top[np.argsort(-sims[top])]
+
+
+def recall(found: list[np.ndarray], truth: list[np.ndarray], k: int) -> float:
+    return float(np.mean([len(np.intersect1d(hit, expected)) / k for hit, expected in zip(found, truth)]))
+
+
+def run(size: int, queries: int, k: int, storage: str) -> None:
+    vectors = make_vectors(size + queries)
+    matrix, probes = vectors[:size], vectors[size:]
+    truth = [top_k(matrix @ query, k) for query in probes]
+
+    exact_qps = 0.0
+    for name in STORAGE_DTYPES:
+        codes, scales = quantize(matrix, name)
+        started = time.perf_counter()
+        found = [top_k(score(codes, scales, query), k) for query in probes]
+        qps = queries / (time.perf_counter() - started)
+        exact_qps = exact_qps or qps
+        per_vector = (codes.nbytes + (scales.nbytes if scales is not None else 0)) / size
+        print(
+            f"{size:>9,} vectors  {'exact-' + name:<18} {per_vector:>4.0f} B/vec  recall@{k} {recall(found, truth, k):.3f}"
+            f"  {qps:>9,.0f} qps"
+        )
+
+    codes, scales = quantize(matrix, storage)
+    stored = dequantize(codes, scales)
+    seen: set[str] = set()
+    for ann in (build_ann(EMBED_DIM, "ivf"), build_ann(EMBED_DIM, "hnsw"), NumpyIVF(EMBED_DIM)):
+        if ann.name in seen:
+            continue
+        seen.add(ann.name)
+        started = time.perf_counter()
+        ann.train(stored)
+        ann.add(stored)
+        build_seconds = time.perf_counter() - started
+
+        def score_rows(rows: np.ndarray) -> np.ndarray:
+            return score(codes[rows], scales[rows] if scales is not None else None, query)
+
+        started = time.perf_counter()
+        found = []
+        for query in probes:
+            found.append(ann.search(score_rows, query, k)[0])
+        qps = queries / (time.perf_counter() - started)
+        print(
+            f"{size:>9,} vectors  {ann.name:<18} build {build_seconds:>5.1f}s  recall@{k} {recall(found, truth, k):.3f}"
+            f"  {qps:>9,.0f} qps  ({qps / exact_qps:.1f}x exact)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark approximate vector search.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Index sizes.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of timed queries per size.")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query.")
+    parser.add_argument("--storage", choices=sorted(STORAGE_DTYPES), default="float32", help="Storage the ANN candidates are scored from.")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.queries, args.k, args.storage)
+
+
+if __name__ == "__main__":
+    main()
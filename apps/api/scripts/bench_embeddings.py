@@ -0,0 +1,74 @@
+"""
+Micro-benchmark for the batched hash embedder.
+
+Compares the original per-token loop against ``embed_texts`` on synthetic
+documents and checks both produce the same vectors.
+
+Usage:
+    python -m scripts.bench_embeddings [--docs 10000] [--tokens 400]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import random
+import string
+import time
+
+import numpy as np
+
+from app.services.embedding_store import EMBED_DIM, MAX_TOKENS, embed_texts
+
+
+def reference_hash_to_vec(text: str) -> np.ndarray:
+    """The original one-token-at-a-time implementation, kept as the baseline."""
+    if not text:
+        return np.zeros(EMBED_DIM, dtype="float32")
+    tokens = text.lower().split()
+    vec = np.zeros(EMBED_DIM, dtype="float32")
+    for token in tokens[:MAX_TOKENS]:
+        digest = hashlib.md5(token.encode("utf-8")).digest()
+        for idx, byte in enumerate(digest[: EMBED_DIM // 4]):
+            vec[(idx * 4) % EMBED_DIM] += byte / 255.0
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    return vec.astype("float32")
+
+
+def make_corpus(docs: int, tokens: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(20000)]
+    # Zipf-like reuse so the vocabulary looks like natural text.
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    return [" ".join(rng.choices(vocabulary, weights=weights, k=tokens)) for _ in range(docs)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batched embeddings.")
+    parser.add_argument("--docs", type=int, default=10000, help="Number of synthetic documents.")
+    parser.add_argument("--tokens", type=int, default=400, help="Tokens per document.")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs, args.tokens)
+
+    started = time.perf_counter()
+    reference = np.vstack([reference_hash_to_vec(text) for text in corpus])
+    loop_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batched = embed_texts(corpus)
+    batch_seconds = time.perf_counter() - started
+
+    max_error = float(np.abs(reference - batched).max()) if len(corpus) else 0.0
+    print(f"documents:        {len(corpus)} x {args.tokens} tokens")
+    print(f"per-token loop:   {loop_seconds:.2f}s ({len(corpus) / loop_seconds:,.0f} docs/s)")
+    print(f"embed_texts:      {batch_seconds:.2f}s ({len(corpus) / batch_seconds:,.0f} docs/s)")
+    print(f"speedup:          {loop_seconds / batch_seconds:.1f}x")
+    print(f"max abs error:    {max_error:.2e}")
+    if not np.allclose(reference, batched, atol=1e-6):
+        raise SystemExit("Batched vectors diverge from the reference implementation")
+
+
+if __name__ == "__main__":
+    main()
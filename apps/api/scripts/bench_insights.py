@@ -0,0 +1,112 @@
+"""
+Timing benchmark for the clustering insight engine.
+
+Creates a throwaway project of ``--sources`` synthetic documents written
+around ``--topics`` vocabularies, indexes them, then times a cold run (every
+source analysed and split into sentences) and a warm run (analyses reused
+from ``source_analyses``, sentence vectors from the project's sentence
+index), and removes the project afterwards. Point ``INSIGHTFLOW_DATA_DIR`` at
+a scratch directory to keep the benchmark data out of your working database.
+
+Usage:
+    python -m scripts.bench_insights [--sources 5000] [--sentences 60] [--topics 6]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import time
+import uuid
+
+from app import models
+from app.database import SessionLocal, engine
+from app.services import blob_store, source_analysis
+from app.services.content_cache import content_hash
+from app.services.embedding_store import embedding_store
+from app.services.insight_engine import generate_payload
+from app.services.sentence_index import sentence_store
+
+
+def make_documents(sources: int, sentences: int, topics: int, seed: int = 5) -> list[str]:
+    rng = random.Random(seed)
+    shared = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(400)]
+    vocabularies = [
+        ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(150)] for _ in range(topics)
+    ]
+    documents = []
+    for _ in range(sources):
+        topic = vocabularies[rng.randrange(topics)]
+        body = []
+        for _ in range(sentences):
+            words = [rng.choice(topic) if rng.random() < 0.4 else rng.choice(shared) for _ in range(rng.randint(8, 20))]
+            body.append(" ".join(words).capitalize() + ".")
+        documents.append(" ".join(body))
+    return documents
+
+
+def timed_run(db, project: models.Project, sources: list[models.Source]) -> tuple[float, int, int, dict]:
+    started = time.perf_counter()
+    analyses, reused, recomputed = source_analysis.load_or_analyze(db, sources)
+    db.flush()
+    payload = generate_payload(project, sources, analyses=analyses)
+    return time.perf_counter() - started, reused, recomputed, payload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the insight engine.")
+    parser.add_argument("--sources", type=int, default=5000, help="Synthetic sources in the project.")
+    parser.add_argument("--sentences", type=int, default=60, help="Sentences per source.")
+    parser.add_argument("--topics", type=int, default=6, help="Distinct vocabularies the sources are drawn from.")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    documents = make_documents(args.sources, args.sentences, args.topics)
+
+    with SessionLocal() as db:
+        project = models.Project(name="Insight benchmark")
+        db.add(project)
+        db.flush()
+        started = time.perf_counter()
+        sources: list[models.Source] = []
+        pointers: list[str] = []
+        for position, body in enumerate(documents):
+            digest = content_hash(body.encode("utf-8"))
+            pointer = blob_store.text_pointer(digest)
+            blob_store.write_text(pointer, body)
+            pointers.append(pointer)
+            source = models.Source(
+                id=str(uuid.uuid4()),
+                project_id=project.id,
+                kind="document",
+                uri=pointer,
+                title=f"Benchmark source {position}",
+                tags=[],
+                content_ptr=pointer,
+                content_hash=digest,
+            )
+            db.add(source)
+            sources.append(source)
+        db.commit()
+        embedding_store.upsert_many(sources)
+        passages = embedding_store.stats(project.id)["live_vectors"]
+        print(f"indexed {args.sources:,} sources, {passages:,} passages in {time.perf_counter() - started:.1f}s")
+
+        try:
+            for label in ("cold run", "warm run"):
+                seconds, reused, recomputed, payload = timed_run(db, project, sources)
+                print(f"{label}: {seconds:.1f}s ({reused:,} reused, {recomputed:,} analysed)")
+            for theme in payload["themes"]:
+                print(f"  {theme['confidence']:.2f}  {theme['title']}  ({theme['summary']})")
+        finally:
+            db.rollback()
+            db.query(models.Source).filter(models.Source.project_id == project.id).delete()
+            db.delete(project)
+            db.commit()
+            blob_store.purge(pointers)
+            embedding_store.drop_project(project.id)
+            sentence_store.drop_project(project.id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Throughput benchmark for page-parallel PDF extraction.
+
+Writes a synthetic text PDF, then extracts it serially and with the page
+cache spread over a process pool (cold cache each time), and once more with
+a warm cache to show that cached pages are skipped.
+
+Usage:
+    python -m scripts.bench_pdf [--pages 500] [--workers 4]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from app.services.extractors import extract_pdf_pages, page_number, remove_page_cache
+
+
+def make_pdf(path: Path, pages: int, lines_per_page: int = 40, seed: int = 5) -> None:
+    """Write a minimal uncompressed PDF with ``pages`` pages of Helvetica text."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(2000)]
+    objects: list[bytes] = [b"", b""]  # catalog and page tree are filled in last
+    font = len(objects) + 1
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids: list[int] = []
+    for page in range(pages):
+        lines = [f"Page {page + 1}"] + [" ".join(rng.choices(words, k=12)) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1"))
+        content = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {content} 0 R "
+            f"/Resources << /Font << /F1 {font} 0 R >> >> >>".encode()
+        )
+        kids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Count {pages} /Kids [{' '.join(f'{kid} 0 R' for kid in kids)}] >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark page-parallel PDF extraction.")
+    parser.add_argument("--pages", type=int, default=500, help="Pages in the synthetic PDF.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Extraction processes.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        pdf_path = Path(scratch) / "bench.pdf"
+        text_path = Path(scratch) / "bench.txt"
+        make_pdf(pdf_path, args.pages)
+
+        started = time.perf_counter()
+        serial = extract_pdf_pages(pdf_path, text_path)
+        serial_seconds = time.perf_counter() - started
+        remove_page_cache(text_path)
+
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            started = time.perf_counter()
+            parallel = extract_pdf_pages(pdf_path, text_path, pool)
+            parallel_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            extract_pdf_pages(pdf_path, text_path, pool)
+            cached_seconds = time.perf_counter() - started
+
+        last_page = page_number(text_path, serial.rfind("Page "))
+        print(f"pages:            {args.pages} ({pdf_path.stat().st_size / 1e6:.1f} MB, {len(serial):,} chars)")
+        print(f"serial:           {serial_seconds:.2f}s ({args.pages / serial_seconds:,.0f} pages/s)")
+        print(f"{args.workers} workers:        {parallel_seconds:.2f}s ({args.pages / parallel_seconds:,.0f} pages/s)")
+        print(f"speedup:          {serial_seconds / parallel_seconds:.1f}x")
+        print(f"warm page cache:  {cached_seconds:.2f}s")
+        print(f"page of last hit: {last_page}")
+        if parallel != serial or last_page != args.pages:
+            raise SystemExit("Parallel extraction diverged from serial extraction")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Throughput benchmark for persisting insight-run results.
+
+Builds a synthetic run payload (``--themes`` themes, ``--claims`` claims per
+theme, ``--citations`` citations per claim) and writes it twice into a
+throwaway project: once the way runs used to be stored, one ORM object per
+row with a flush after every theme and claim, and once with
+``save_run_results``. Both include search indexing and each is rolled back
+afterwards. Point ``INSIGHTFLOW_DATA_DIR`` at a scratch directory to keep the
+benchmark out of your working database.
+
+Usage:
+    python -m scripts.bench_run_persist [--themes 200] [--claims 25] [--citations 4]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import uuid
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import SessionLocal, engine
+from app.services import search_index
+from app.services.run_results import save_run_results
+
+
+def make_payload(source_ids: list[str], themes: int, claims: int, citations: int) -> dict:
+    cursor = 0
+    payload_themes = []
+    for theme_index in range(themes):
+        payload_claims = []
+        for claim_index in range(claims):
+            payload_citations = []
+            for _ in range(citations):
+                payload_citations.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "source_id": source_ids[cursor % len(source_ids)],
+                        "quote": f"quote {cursor}",
+                        "location": f"offset {cursor}-{cursor + 80}",
+                    }
+                )
+                cursor += 1
+            payload_claims.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "statement": f"Claim {claim_index} of theme {theme_index}",
+                    "confidence": 0.7,
+                    "citations": payload_citations,
+                }
+            )
+        payload_themes.append(
+            {
+                "id": str(uuid.uuid4()),
+                "title": f"Theme {theme_index}",
+                "summary": f"Summary of theme {theme_index}",
+                "confidence": 0.8,
+                "claims": payload_claims,
+            }
+        )
+    return {"themes": payload_themes}
+
+
+def reference_save(db: Session, run: models.InsightRun, payload: dict) -> None:
+    """The previous per-object path, kept as the baseline."""
+    for theme_entry in payload["themes"]:
+        theme = models.Theme(
+            id=theme_entry["id"],
+            insight_run_id=run.id,
+            title=theme_entry["title"],
+            summary=theme_entry.get("summary"),
+            confidence=theme_entry.get("confidence", 0.0),
+        )
+        db.add(theme)
+        db.flush()
+        for claim_entry in theme_entry["claims"]:
+            claim = models.Claim(
+                id=claim_entry["id"],
+                theme_id=theme.id,
+                statement=claim_entry["statement"],
+                confidence=claim_entry.get("confidence", 0.0),
+            )
+            db.add(claim)
+            db.flush()
+            for citation_entry in claim_entry["citations"]:
+                db.add(
+                    models.Citation(
+                        id=citation_entry["id"],
+                        claim_id=claim.id,
+                        source_id=citation_entry["source_id"],
+                        quote=citation_entry.get("quote"),
+                        location=citation_entry.get("location"),
+                    )
+                )
+    run.payload = payload
+    db.flush()
+    search_index.index_run(db, run)
+
+
+def timed(
+    label: str,
+    save: Callable[[Session, models.InsightRun, dict], None],
+    args: argparse.Namespace,
+) -> float:
+    with SessionLocal() as db:
+        project = models.Project(name=f"bench-run-persist-{uuid.uuid4().hex[:8]}")
+        db.add(project)
+        db.flush()
+        sources = [
+            models.Source(
+                project_id=project.id,
+                title=f"Source {index}",
+                uri=f"bench/{index}.txt",
+                content_ptr=f"bench/{index}.txt",
+                kind="document",
+            )
+            for index in range(args.sources)
+        ]
+        db.add_all(sources)
+        run = models.InsightRun(project_id=project.id, status="completed")
+        db.add(run)
+        db.flush()
+        payload = make_payload([source.id for source in sources], args.themes, args.claims, args.citations)
+
+        started = time.perf_counter()
+        save(db, run, payload)
+        db.flush()
+        elapsed = time.perf_counter() - started
+        db.rollback()
+
+    rows = args.themes * (1 + args.claims * (1 + args.citations))
+    print(f"{label:<18}{elapsed:8.2f}s {rows / elapsed:12,.0f} rows/s")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark insight-run result persistence.")
+    parser.add_argument("--themes", type=int, default=200, help="Themes per run.")
+    parser.add_argument("--claims", type=int, default=25, help="Claims per theme.")
+    parser.add_argument("--citations", type=int, default=4, help="Citations per claim.")
+    parser.add_argument("--sources", type=int, default=100, help="Sources the citations point at.")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    search_index.ensure_schema(engine)
+
+    claims = args.themes * args.claims
+    print(f"run:              {args.themes} themes, {claims} claims, {claims * args.citations} citations")
+    baseline = timed("per-object:", reference_save, args)
+    bulk = timed("save_run_results:", save_run_results, args)
+    print(f"speedup:          {baseline / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Latency benchmark for hybrid search (FTS5 BM25 + vector, fused with RRF).
+
+Creates a throwaway project with synthetic sources totalling ``--passages``
+indexed passages, times ``hybrid_search`` for a set of queries and removes
+the project afterwards. Point ``INSIGHTFLOW_DATA_DIR`` at a scratch
+directory to keep the benchmark data out of your working database.
+
+Usage:
+    python -m scripts.bench_search [--passages 100000] [--queries 50]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from app import models
+from app.database import DATA_DIR, SessionLocal, engine
+from app.services import search_index
+from app.services.embedding_store import CHUNK_OVERLAP, CHUNK_TOKENS, embedding_store
+from scripts.bench_embeddings import make_corpus
+
+UPLOAD_DIR = DATA_DIR / "uploads"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark hybrid search latency.")
+    parser.add_argument("--passages", type=int, default=100000, help="Approximate passages to index.")
+    parser.add_argument("--per-source", type=int, default=100, help="Passages per synthetic source.")
+    parser.add_argument("--queries", type=int, default=50, help="Number of timed queries.")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    search_index.ensure_schema(engine)
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+    tokens_per_source = args.per_source * (CHUNK_TOKENS - CHUNK_OVERLAP) + CHUNK_OVERLAP
+    source_count = max(1, args.passages // args.per_source)
+    corpus = make_corpus(source_count, tokens_per_source)
+
+    with SessionLocal() as db:
+        project = models.Project(name="Search benchmark")
+        db.add(project)
+        db.flush()
+        started = time.perf_counter()
+        sources: list[models.Source] = []
+        for position, body in enumerate(corpus):
+            source = models.Source(
+                id=str(uuid.uuid4()),
+                project_id=project.id,
+                kind="document",
+                uri=f"bench-{position}",
+                title=f"Benchmark source {position}",
+                tags=[],
+                content_ptr=f"data/uploads/bench-{project.id}-{position}.txt",
+            )
+            (UPLOAD_DIR / f"bench-{project.id}-{position}.txt").write_text(body, encoding="utf-8")
+            db.add(source)
+            search_index.index_source(db, source, body)
+            sources.append(source)
+        db.commit()
+        embedding_store.upsert_many(sources)
+        print(f"indexed {embedding_store.stats(project.id)['live_vectors']:,} passages in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(11)
+        # Sample distinct words so queries mix rare and common terms the way
+        # typed queries do, rather than mostly repeating the top stop words.
+        vocabulary = sorted(set(corpus[0].split()))
+        latencies: list[float] = []
+        try:
+            for _ in range(args.queries):
+                query = " ".join(rng.sample(vocabulary, 3))
+                started = time.perf_counter()
+                search_index.hybrid_search(db, project.id, query, 20)
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            search_index.remove_project(db, project.id)
+            for position in range(len(sources)):
+                (UPLOAD_DIR / f"bench-{project.id}-{position}.txt").unlink(missing_ok=True)
+            db.delete(project)
+            db.commit()
+            embedding_store.drop_project(project.id)
+
+    latencies.sort()
+    print(f"queries: {len(latencies)}")
+    print(f"p50: {statistics.median(latencies):.1f} ms")
+    print(f"p95: {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms")
+    print(f"max: {latencies[-1]:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Drop stored insight-run payloads that duplicate their theme, claim and citation rows.
+
+Meant for databases switched to ``INSIGHTFLOW_STORE_RUN_PAYLOAD=0``: the
+payload of every run with result rows is set to NULL (``GET
+/insight-runs/{id}`` rebuilds it from the rows) and the file is vacuumed.
+Runs whose payload has no rows behind it keep it.
+
+Usage:
+    python -m scripts.compact_run_payloads [--dry-run]
+"""
+from __future__ import annotations
+
+import argparse
+
+from sqlalchemy import String, cast, exists, func, null, select, text, update
+
+from app import models
+from app.database import DATA_DIR, SessionLocal, engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drop insight-run payloads that duplicate result rows.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many runs would be compacted.")
+    args = parser.parse_args()
+
+    database = DATA_DIR / "app.db"
+    before = database.stat().st_size
+    # A payload set to None through the ORM is stored as JSON 'null', not SQL NULL.
+    stored = (
+        models.InsightRun.payload.is_not(None),
+        cast(models.InsightRun.payload, String) != "null",
+        exists(select(models.Theme.id).where(models.Theme.insight_run_id == models.InsightRun.id)),
+    )
+    with SessionLocal() as db:
+        if args.dry_run:
+            count = db.scalar(select(func.count(models.InsightRun.id)).where(*stored))
+            print(f"{count} runs would be compacted")
+            return
+        result = db.execute(
+            update(models.InsightRun)
+            .where(*stored)
+            .values(payload=null())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+    after = database.stat().st_size
+    print(f"compacted {result.rowcount} runs; app.db {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
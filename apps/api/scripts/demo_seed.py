@@ -18,7 +18,6 @@ from __future__ import annotations
 
 import argparse
 import json
-import shutil
 import uuid
 from pathlib import Path
 from typing import Iterable, List
@@ -27,10 +26,12 @@ from sqlalchemy.orm import Session
 
 from app import models
 from app.database import DATA_DIR, SessionLocal
+from app.services import blob_store, search_index, text_store
+from app.services.content_cache import content_hash
+from app.services.run_results import save_run_results
 
 FIXTURE_DIR = DATA_DIR / "demo" / "fixtures"
 SOURCE_DIR = DATA_DIR / "demo" / "sources"
-UPLOAD_DIR = DATA_DIR / "uploads"
 
 SCENARIOS = {
     "scenario1_market_scan": {
@@ -70,15 +71,15 @@ def resolve_scenarios(selection: str) -> List[str]:
     return [selection]
 
 
-def remove_project(session: Session, project: models.Project) -> None:
-    for source in list(project.sources):
-        for path_value in (source.uri, source.content_ptr):
-            if not path_value:
-                continue
-            file_path = Path(DATA_DIR.parent, path_value)
-            if file_path.exists():
-                file_path.unlink(missing_ok=True)
+def remove_project(session: Session, project: models.Project) -> list[str]:
+    """Delete the project's rows; returns the freed blob pointers to purge once the session has committed."""
+    freed = blob_store.release(
+        session, [value for source in project.sources for value in (source.uri, source.content_ptr)]
+    )
+    search_index.remove_project(session, project.id)
     session.delete(project)
+    session.flush()
+    return freed
 
 
 def cleanup(session: Session, scenario_ids: Iterable[str]) -> None:
@@ -94,9 +95,11 @@ def cleanup(session: Session, scenario_ids: Iterable[str]) -> None:
         print("No matching demo projects found to clean up.")
         return
 
+    freed: list[str] = []
     for project in projects:
-        remove_project(session, project)
+        freed += remove_project(session, project)
     session.commit()
+    blob_store.purge_unreferenced(session, freed)
     print(f"Removed {len(projects)} demo project(s).")
 
 
@@ -108,25 +111,25 @@ def load_fixture(scenario_id: str) -> dict:
 
 
 def copy_source_files(source_map: dict[str, str]) -> dict[str, models.Source]:
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
     sources: dict[str, models.Source] = {}
     for source_id, filename in source_map.items():
         source_path = SOURCE_DIR / filename
         if not source_path.exists():
             raise FileNotFoundError(f"Missing demo source file: {source_path}")
 
-        dest_file = UPLOAD_DIR / f"{source_id}{source_path.suffix.lower()}"
-        shutil.copyfile(source_path, dest_file)
-
-        text_path = UPLOAD_DIR / f"{source_id}.txt"
-        text_path.write_text(source_path.read_text(encoding="utf-8"), encoding="utf-8")
+        raw = source_path.read_bytes()
+        digest = content_hash(raw)
+        uri = blob_store.store_copy(source_path, digest, source_path.suffix)
+        content_ptr = blob_store.text_pointer(digest)
+        blob_store.write_text(content_ptr, raw.decode("utf-8"))
 
         sources[source_id] = models.Source(
             id=source_id,
             kind="document",
             title=filename.replace("_", " ").replace(".md", ""),
-            uri=str(dest_file.relative_to(DATA_DIR.parent)),
-            content_ptr=str(text_path.relative_to(DATA_DIR.parent)),
+            uri=uri,
+            content_ptr=content_ptr,
+            content_hash=digest,
             tags=[],
         )
     return sources
@@ -141,8 +144,9 @@ def load_scenario(session: Session, scenario_id: str) -> None:
         .first()
     )
     if existing:
-        remove_project(session, existing)
+        freed = remove_project(session, existing)
         session.commit()
+        blob_store.purge_unreferenced(session, freed)
 
     project = models.Project(name=config["project_name"], description=config["description"])
     session.add(project)
@@ -152,6 +156,8 @@ def load_scenario(session: Session, scenario_id: str) -> None:
     for source in source_models.values():
         source.project_id = project.id
         session.add(source)
+        blob_store.acquire(session, [source.uri, source.content_ptr])
+        search_index.index_source(session, source)
     session.flush()
 
     fixture = load_fixture(scenario_id)
@@ -162,30 +168,8 @@ def load_scenario(session: Session, scenario_id: str) -> None:
     payload_themes: list[dict] = []
 
     for theme_entry in fixture.get("themes", []):
-        theme_id = str(uuid.uuid4())
-        theme = models.Theme(
-            id=theme_id,
-            insight_run_id=run.id,
-            title=theme_entry.get("title", "Theme"),
-            summary=theme_entry.get("summary"),
-            confidence=theme_entry.get("confidence", 0.0),
-        )
-        session.add(theme)
-        session.flush()
-
         payload_claims: list[dict] = []
         for claim_entry in theme_entry.get("claims", []):
-            claim_id = str(uuid.uuid4())
-            statement = claim_entry.get("statement") or claim_entry.get("text") or ""
-            claim = models.Claim(
-                id=claim_id,
-                theme_id=theme.id,
-                statement=statement,
-                confidence=claim_entry.get("confidence", 0.0),
-            )
-            session.add(claim)
-            session.flush()
-
             citation_payloads: list[dict] = []
             for citation_entry in claim_entry.get("citations", []):
                 source_key = citation_entry.get("source_id")
@@ -197,30 +181,21 @@ def load_scenario(session: Session, scenario_id: str) -> None:
                 end = citation_entry.get("end")
                 content_path = Path(DATA_DIR.parent, source_model.content_ptr)
                 if content_path.exists() and isinstance(start, int) and isinstance(end, int):
-                    text = content_path.read_text(encoding="utf-8")
-                    if 0 <= start < end <= len(text):
-                        quote = text[start:end]
-                citation = models.Citation(
-                    id=str(uuid.uuid4()),
-                    claim_id=claim.id,
-                    source_id=source_model.id,
-                    quote=quote,
-                    location=(f"offset {start}-{end}" if isinstance(start, int) and isinstance(end, int) else None),
-                )
-                session.add(citation)
+                    if 0 <= start < end <= text_store.char_length(content_path):
+                        quote = text_store.read_range(content_path, start, end)
                 citation_payloads.append(
                     {
-                        "id": citation.id,
-                        "source_id": citation.source_id,
+                        "id": str(uuid.uuid4()),
+                        "source_id": source_model.id,
                         "quote": quote,
-                        "location": citation.location,
+                        "location": (f"offset {start}-{end}" if isinstance(start, int) and isinstance(end, int) else None),
                     }
                 )
 
             payload_claims.append(
                 {
-                    "id": claim_id,
-                    "statement": statement,
+                    "id": str(uuid.uuid4()),
+                    "statement": claim_entry.get("statement") or claim_entry.get("text") or "",
                     "confidence": claim_entry.get("confidence", 0.0),
                     "citations": citation_payloads,
                 }
@@ -228,7 +203,7 @@ def load_scenario(session: Session, scenario_id: str) -> None:
 
         payload_themes.append(
             {
-                "id": theme_id,
+                "id": str(uuid.uuid4()),
                 "title": theme_entry.get("title", "Theme"),
                 "summary": theme_entry.get("summary"),
                 "confidence": theme_entry.get("confidence", 0.0),
@@ -236,8 +211,7 @@ def load_scenario(session: Session, scenario_id: str) -> None:
             }
         )
 
-    run.payload = {"themes": payload_themes}
-    session.add(run)
+    save_run_results(session, run, {"themes": payload_themes})
     session.commit()
     print(f"Loaded demo scenario '{scenario_id}' into project '{project.name}'.")
 
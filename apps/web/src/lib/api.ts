@@ -1,9 +1,17 @@
 import type {
+  BatchUploadResponse,
   Claim,
+  CleanupJob,
   Decision,
+  Evidence,
   InsightRun,
+  InsightRunProgress,
+  InsightRunSummary,
+  ObsidianSyncResult,
   Project,
+  SearchResult,
   Source,
+  SourceTextWindow,
   Task,
   Theme,
 } from "./types";
@@ -48,11 +56,12 @@ export const api = {
       body: JSON.stringify(payload),
     }),
   deleteProject: (projectId: string) =>
-    request<void>(`/projects/${projectId}`, {
+    request<CleanupJob>(`/projects/${projectId}`, {
       method: "DELETE",
     }),
   getSources: (projectId?: string) =>
     request<Source[]>(`/sources/${projectId ? `?project_id=${projectId}` : ""}`),
+  getSource: (sourceId: string) => request<Source>(`/sources/${sourceId}`),
   uploadSource: async (payload: {
     projectId: string;
     file: File;
@@ -77,13 +86,61 @@ export const api = {
     }
     return (await response.json()) as Source;
   },
+  uploadSources: async (payload: { projectId: string; files: File[]; kind?: string; tags?: string[] }) => {
+    const form = new FormData();
+    form.append("project_id", payload.projectId);
+    payload.files.forEach((file) => form.append("files", file));
+    if (payload.kind) form.append("kind", payload.kind);
+    if (payload.tags?.length) form.append("tags", JSON.stringify(payload.tags));
+
+    const response = await fetch(`${API_BASE_URL}/sources/batch`, {
+      method: "POST",
+      body: form,
+    });
+    if (!response.ok) {
+      const text = await response.text();
+      throw new Error(text || "Failed to upload sources");
+    }
+    return (await response.json()) as BatchUploadResponse;
+  },
+  getSourceText: async (sourceId: string, window: { offset?: number; length?: number } = {}) => {
+    const params = new URLSearchParams();
+    if (window.offset !== undefined) params.set("offset", String(window.offset));
+    if (window.length !== undefined) params.set("length", String(window.length));
+    const query = params.toString();
+    const response = await fetch(`${API_BASE_URL}/sources/${sourceId}/text${query ? `?${query}` : ""}`);
+    if (!response.ok) {
+      const text = await response.text();
+      throw new Error(text || "Failed to load source text");
+    }
+    return {
+      text: await response.text(),
+      offset: Number(response.headers.get("X-Text-Offset") ?? 0),
+      total: Number(response.headers.get("X-Text-Total") ?? 0),
+      etag: response.headers.get("ETag"),
+    } as SourceTextWindow;
+  },
   deleteSource: (sourceId: string) =>
-    request<void>(`/sources/${sourceId}`, {
+    request<CleanupJob>(`/sources/${sourceId}`, {
       method: "DELETE",
     }),
+  getJob: (jobId: string) => request<CleanupJob>(`/jobs/${jobId}`),
   getInsightRuns: (projectId?: string) =>
-    request<InsightRun[]>(`/insight-runs/${projectId ? `?project_id=${projectId}` : ""}`),
+    request<InsightRunSummary[]>(`/insight-runs/${projectId ? `?project_id=${projectId}` : ""}`),
   getInsightRun: (runId: string) => request<InsightRun>(`/insight-runs/${runId}`),
+  watchInsightRun: (
+    runId: string,
+    onProgress: (progress: InsightRunProgress) => void,
+    onDone: (progress: InsightRunProgress) => void,
+  ) => {
+    const source = new EventSource(`${API_BASE_URL}/insight-runs/${runId}/events`);
+    source.addEventListener("progress", (event) => onProgress(JSON.parse((event as MessageEvent).data)));
+    source.addEventListener("done", (event) => {
+      source.close();
+      onDone(JSON.parse((event as MessageEvent).data));
+    });
+    return () => source.close();
+  },
   createInsightRun: (payload: { project_id: string; prompt?: string }) =>
     request<InsightRun>("/insight-runs/", {
       method: "POST",
@@ -100,6 +157,8 @@ export const api = {
     }),
   getThemes: (runId: string) => request<Theme[]>(`/themes/?run_id=${runId}`),
   getClaims: (themeId: string) => request<Claim[]>(`/claims/?theme_id=${themeId}`),
+  getClaimEvidence: (claimId: string, limit = 5) =>
+    request<Evidence[]>(`/claims/${claimId}/evidence?limit=${limit}`),
   getDecisions: (projectId?: string) =>
     request<Decision[]>(`/decisions/${projectId ? `?project_id=${projectId}` : ""}`),
   createDecision: (payload: {
@@ -176,9 +235,18 @@ export const api = {
   exportProjectMarkdown: (projectId: string) => request<string>(`/export/${projectId}.md`),
   getDailyDigest: (projectId: string, date?: string) =>
     request<string>(`/digest/${projectId}.md${date ? `?date=${date}` : ""}`),
+  search: (projectId: string, query: string, limit = 20) =>
+    request<SearchResult[]>(
+      `/search/?project_id=${projectId}&q=${encodeURIComponent(query)}&limit=${limit}`,
+    ),
   importObsidian: (payload: { project_id: string; folder?: string; base_path?: string | null; limit?: number }) =>
     request<Source[]>("/sources/import/obsidian", {
       method: "POST",
       body: JSON.stringify(payload),
     }),
+  syncObsidian: (payload: { project_id: string; folder?: string; base_path?: string | null }) =>
+    request<ObsidianSyncResult>("/sources/sync/obsidian", {
+      method: "POST",
+      body: JSON.stringify(payload),
+    }),
 };
@@ -7,6 +7,8 @@ export interface Project {
   created_at: string;
 }
 
+export type SourceStatus = "queued" | "extracting" | "embedding" | "ready" | "failed";
+
 export interface Source {
   id: UUID;
   project_id: UUID;
@@ -15,9 +17,51 @@ export interface Source {
   title?: string | null;
   tags: string[];
   content_ptr: string;
+  content_hash?: string | null;
+  status: SourceStatus;
+  error?: string | null;
   created_at: string;
 }
 
+export interface BatchUploadResult {
+  filename: string;
+  source?: Source | null;
+  error?: string | null;
+}
+
+export interface BatchUploadResponse {
+  created: number;
+  failed: number;
+  results: BatchUploadResult[];
+}
+
+export interface ObsidianSyncResult {
+  added: Source[];
+  modified: Source[];
+  removed: UUID[];
+  unchanged: number;
+}
+
+export interface CleanupJob {
+  id: UUID;
+  kind: "source" | "project";
+  target_id: UUID;
+  status: "queued" | "running" | "done" | "failed";
+  total: number;
+  removed: number;
+  attempts: number;
+  error?: string | null;
+  created_at: string;
+  finished_at?: string | null;
+}
+
+export interface SourceTextWindow {
+  text: string;
+  offset: number;
+  total: number;
+  etag: string | null;
+}
+
 export interface CitationSnippet {
   id: UUID;
   source_id: UUID;
@@ -33,6 +77,16 @@ export interface Claim {
   citations?: CitationSnippet[];
 }
 
+export interface Evidence {
+  source_id: UUID;
+  source_title: string;
+  quote: string;
+  start: number;
+  end: number;
+  score: number;
+  location: string;
+}
+
 export interface Theme {
   id: UUID;
   insight_run_id: UUID;
@@ -42,6 +96,18 @@ export interface Theme {
   claims?: Claim[];
 }
 
+export interface InsightRunSummary {
+  id: UUID;
+  project_id: UUID;
+  status: string;
+  stage?: string | null;
+  created_at: string;
+  finished_at?: string | null;
+  theme_count: number;
+  claim_count: number;
+  citation_count: number;
+}
+
 export interface InsightRun {
   id: UUID;
   project_id: UUID;
@@ -50,6 +116,36 @@ export interface InsightRun {
   payload?: {
     themes?: Theme[];
   } | null;
+  stage?: string | null;
+  sources_total?: number | null;
+  sources_processed?: number | null;
+  sources_reused?: number | null;
+  sources_recomputed?: number | null;
+  error?: string | null;
+  started_at?: string | null;
+  finished_at?: string | null;
+}
+
+export interface InsightRunProgress {
+  id: UUID;
+  status: string;
+  stage: string | null;
+  sources_total: number;
+  sources_processed: number;
+  eta_seconds: number | null;
+  error: string | null;
+}
+
+export interface SearchResult {
+  kind: "source" | "theme" | "claim" | "decision";
+  ref_id: UUID;
+  title?: string | null;
+  snippet?: string | null;
+  char_start?: number | null;
+  char_end?: number | null;
+  score: number;
+  bm25_rank?: number | null;
+  vector_rank?: number | null;
 }
 
 export interface Decision {
@@ -18,7 +18,7 @@ import {
 } from "../components/ui/drawer";
 import { Separator } from "../components/ui/separator";
 import { api } from "../lib/api";
-import type { InsightRun, Theme, Claim, CitationSnippet } from "../lib/types";
+import type { InsightRun, InsightRunProgress, Theme, Claim, CitationSnippet } from "../lib/types";
 import { formatDate } from "../lib/utils";
 import { useUIStore } from "../state/uiStore";
 
@@ -31,6 +31,7 @@ export function InsightRunViewerPage() {
   const decisionDraft = useUIStore((state) => state.decisionDraft);
   const [selectedClaim, setSelectedClaim] = useState<Claim | null>(null);
   const [drawerOpen, setDrawerOpen] = useState(false);
+  const [progress, setProgress] = useState<InsightRunProgress | null>(null);
   const queryClient = useQueryClient();
 
   const { data: run, isLoading } = useQuery<InsightRun>({
@@ -40,6 +41,19 @@ export function InsightRunViewerPage() {
     staleTime: 0,
   });
 
+  const runActive = run?.status === "pending" || run?.status === "processing";
+  useEffect(() => {
+    if (!id || !runActive) return;
+    return api.watchInsightRun(id, setProgress, (final) => {
+      setProgress(null);
+      if (final.status === "failed") {
+        toast.error(final.error ?? "Insight run failed");
+      }
+      queryClient.invalidateQueries({ queryKey: ["runs", id] });
+      queryClient.invalidateQueries({ queryKey: ["insight-runs"] });
+    });
+  }, [id, runActive, queryClient]);
+
   const payloadThemes = (run?.payload?.themes as Theme[] | undefined) ?? [];
   const { data: fallbackThemes } = useQuery<Theme[]>({
     queryKey: ["themes", run?.id],
@@ -166,9 +180,20 @@ export function InsightRunViewerPage() {
                 <Badge className="uppercase">{run.status}</Badge>
                 <span>Started {formatDate(run.created_at)}</span>
               </div>
+              {progress && (
+                <div className="mt-3 text-xs text-foreground/60">
+                  {progress.stage ?? "queued"}: {progress.sources_processed}/{progress.sources_total} sources
+                  {progress.eta_seconds != null && ` · about ${Math.ceil(progress.eta_seconds)}s left`}
+                </div>
+              )}
+              {run.status === "failed" && run.error && (
+                <div className="mt-3 text-xs text-red-500">{run.error}</div>
+              )}
               {themes.length > 0 && (
                 <div className="mt-3 text-xs text-foreground/60">
                   Generated {themes.length} themes. Claims: {claims.length}.
+                  {run.sources_reused != null &&
+                    ` Sources: ${run.sources_reused} reused, ${run.sources_recomputed ?? 0} analysed.`}
                 </div>
               )}
             </div>
@@ -9,7 +9,7 @@ import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card"
 import { Separator } from "../components/ui/separator";
 import { api } from "../lib/api";
 import { formatDate } from "../lib/utils";
-import type { InsightRun } from "../lib/types";
+import type { InsightRunSummary } from "../lib/types";
 import { useUIStore } from "../state/uiStore";
 
 export function InsightRunsPage() {
@@ -18,7 +18,7 @@ export function InsightRunsPage() {
   const openDialog = useUIStore((state) => state.openDialog);
   const queryClient = useQueryClient();
 
-  const { data: runs, isLoading } = useQuery<InsightRun[]>({
+  const { data: runs, isLoading } = useQuery<InsightRunSummary[]>({
     queryKey: ["insight-runs", selectedProjectId ?? "all"],
     queryFn: () => api.getInsightRuns(selectedProjectId ?? undefined),
     enabled: Boolean(selectedProjectId),
@@ -86,6 +86,11 @@ export function InsightRunsPage() {
               <span className="text-xs text-foreground/60">
                 Started {formatDate(run.created_at)}
               </span>
+              {run.status === "completed" && (
+                <span className="text-xs text-foreground/60">
+                  {run.theme_count} themes · {run.claim_count} claims · {run.citation_count} citations
+                </span>
+              )}
             </CardHeader>
             <CardContent className="flex items-center justify-between gap-2">
               <Button variant="ghost" onClick={() => navigate(`/runs/${run.id}`)}>